@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""Benchmark graph-core traversal on a synthetic graph (default 10M edges)."""
+import os, sys, json, time, random, tempfile
+from array import array
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "services", "graph-core"))
+from graph_store import GraphStore
+from graph_traversal import EdgeFilter, traverse, shortest_path, k_hop_subgraph
+
+OUT = "reports"
+EDGES = int(os.getenv("BENCH_EDGES", "10000000"))
+NODES = int(os.getenv("BENCH_NODES", str(max(EDGES // 10, 10))))
+QUERIES = int(os.getenv("BENCH_QUERIES", "200"))
+TENANTS = ["tenant-a", "tenant-b"]
+RELATIONS = ["feeds", "derives", "owns"]
+
+def percentile(samples, pct):
+  ordered = sorted(samples)
+  return round(ordered[min(len(ordered) - 1, int(len(ordered) * pct))] * 1000, 3)
+
+def timed(fn):
+  samples = []
+  for _ in range(QUERIES):
+    t0 = time.perf_counter()
+    fn()
+    samples.append(time.perf_counter() - t0)
+  return {"p50_ms": percentile(samples, 0.5), "p95_ms": percentile(samples, 0.95), "p99_ms": percentile(samples, 0.99)}
+
+random.seed(11)
+data_dir = tempfile.mkdtemp(prefix="graph-bench-")
+
+t0 = time.perf_counter()
+with open(os.path.join(data_dir, "nodes.jsonl"), "w") as f:
+  for i in range(NODES):
+    f.write(json.dumps({"id": f"n-{i}", "type": "dataset", "data": {}, "meta": {}, "tenant": TENANTS[i % 2],
+                        "hash": "", "created_at": "2024-01-15T10:30:00Z"}) + "\n")
+store = GraphStore(data_dir, compact_threshold=EDGES + 1)
+for name in RELATIONS:
+  store.relations.code(name)
+for name in TENANTS:
+  store.tenants.code(name)
+
+# Edges stay within a tenant (same node parity) so tenant-filtered walks see real neighborhoods
+half = NODES // 2
+rand = random.randrange
+edges = store.edges
+edges.delta_src = array("i", (rand(NODES) for _ in range(EDGES)))
+edges.delta_dst = array("i", ((rand(half) * 2 + (s & 1)) % NODES for s in edges.delta_src))
+edges.delta_rel = array("i", (rand(len(RELATIONS)) for _ in range(EDGES)))
+edges.delta_tenant = array("i", (s & 1 for s in edges.delta_src))
+edges.delta_conf = array("f", (random.random() for _ in range(EDGES)))
+generate_s = time.perf_counter() - t0
+
+t0 = time.perf_counter()
+store.compact()
+compact_s = time.perf_counter() - t0
+
+def start():
+  return f"n-{rand(NODES)}"
+
+unfiltered = EdgeFilter(store, direction="out")
+tenant_filter = EdgeFilter(store, relations=["feeds", "derives"], min_confidence=0.3, tenant="tenant-a", direction="out")
+both = EdgeFilter(store, direction="both")
+
+def tenant_start():
+  return f"n-{rand(half) * 2}"
+
+results = {
+  "timestamp": datetime.utcnow().isoformat() + "Z",
+  "nodes": store.node_count(),
+  "edges": store.edge_count(),
+  "generate_s": round(generate_s, 2),
+  "compact_s": round(compact_s, 2),
+  "neighbors_1hop": timed(lambda: sum(1 for _ in store.out_edges(rand(NODES)))),
+  "bfs_depth2": timed(lambda: sum(1 for _ in traverse(store, start(), unfiltered, max_depth=2))),
+  "bfs_depth3_tenant_filtered": timed(lambda: sum(1 for _ in traverse(store, tenant_start(), tenant_filter, max_depth=3))),
+  "dfs_depth3_first_1000": timed(lambda: sum(1 for _ in traverse(store, start(), unfiltered, mode="dfs", max_depth=3, max_nodes=1000))),
+  "shortest_path": timed(lambda: shortest_path(store, start(), start(), unfiltered, max_depth=8)),
+  "k_hop_2_subgraph": timed(lambda: sum(1 for _ in k_hop_subgraph(store, start(), both, k=2, max_nodes=5000)))
+}
+store.close()
+os.makedirs(OUT, exist_ok=True)
+with open(os.path.join(OUT, "graph_traversal_bench.json"), "w") as fh:
+  json.dump(results, fh, indent=2)
+print(json.dumps(results, indent=2))
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""Benchmark proposal-composer PII redaction: per-pattern re.sub passes vs the compiled engine."""
+import os, sys, re, json, time, random
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "services", "proposal-composer"))
+from pii_redaction import RedactionEngine, PII_PATTERNS
+
+OUT = "reports"
+SIGNALS = int(os.getenv("BENCH_SIGNALS", "200000"))
+STREAM_MB = int(os.getenv("BENCH_STREAM_MB", "50"))
+ROUNDS = int(os.getenv("BENCH_ROUNDS", "3"))
+
+def legacy_redact(obj):
+  """The previous redact_pii: four re.sub passes per string, patterns looked up per call."""
+  if isinstance(obj, dict):
+    return {k: legacy_redact(v) for k, v in obj.items()}
+  if isinstance(obj, list):
+    return [legacy_redact(item) for item in obj]
+  if isinstance(obj, str):
+    for pii_type, pattern in PII_PATTERNS.items():
+      obj = re.sub(pattern, f"<REDACTED_{pii_type.upper()}>", obj)
+  return obj
+
+def timed(fn):
+  best = None
+  for _ in range(ROUNDS):
+    t0 = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - t0
+    best = elapsed if best is None else min(best, elapsed)
+  return round(best * 1000, 1)
+
+random.seed(13)
+WORDS = ["latency", "cost", "region", "scale", "cpu", "queue", "backlog", "error", "budget", "tenant"]
+def clean_text():
+  return " ".join(random.choice(WORDS) for _ in range(random.randint(3, 12)))
+def pii_text():
+  return random.choice([
+    f"contact {random.choice(WORDS)}.{random.randint(1, 999)}@example.com",
+    f"call {random.randint(200, 999)}-{random.randint(200, 999)}-{random.randint(1000, 9999)}",
+    f"ssn {random.randint(100, 999)}-{random.randint(10, 99)}-{random.randint(1000, 9999)}",
+    f"from 10.{random.randint(0, 255)}.{random.randint(0, 255)}.{random.randint(1, 254)}"
+  ])
+
+def signals(pii_ratio):
+  return {"signals": [
+    {"name": clean_text(), "detail": pii_text() if random.random() < pii_ratio else clean_text(), "value": random.random()}
+    for _ in range(SIGNALS)
+  ]}
+
+engine = RedactionEngine()
+results = {"timestamp": datetime.utcnow().isoformat() + "Z", "signals": SIGNALS, "rounds": ROUNDS}
+for label, ratio in (("clean", 0.0), ("pii_5pct", 0.05), ("pii_50pct", 0.5)):
+  payload = signals(ratio)
+  assert engine.redact(payload) == legacy_redact(payload)
+  legacy_ms = timed(lambda: legacy_redact(payload))
+  engine_ms = timed(lambda: engine.redact(payload))
+  results[label] = {"legacy_ms": legacy_ms, "engine_ms": engine_ms, "speedup": round(legacy_ms / engine_ms, 2)}
+
+# Large document redacted as a stream of 64 KB chunks
+line = json.dumps(signals(0.05)["signals"][:1000])
+document_chunks = (line[i:i + 65536] for _ in range(STREAM_MB * 1024 * 1024 // len(line)) for i in range(0, len(line), 65536))
+t0 = time.perf_counter()
+redacted_bytes = sum(len(part) for part in engine.redact_stream(document_chunks))
+elapsed = time.perf_counter() - t0
+# Legacy throughput on the same text, whole document in memory
+sample = line * max(1, 5 * 1024 * 1024 // len(line))
+t0 = time.perf_counter()
+legacy_redact(sample)
+legacy_mb_per_sec = len(sample) / (1024 * 1024) / (time.perf_counter() - t0)
+results["stream"] = {"megabytes": STREAM_MB, "elapsed_s": round(elapsed, 3), "mb_per_sec": round(STREAM_MB / elapsed, 1),
+                     "legacy_mb_per_sec": round(legacy_mb_per_sec, 1), "redacted_bytes": redacted_bytes}
+
+os.makedirs(OUT, exist_ok=True)
+with open(os.path.join(OUT, "pii_redaction_bench.json"), "w") as fh:
+  json.dump(results, fh, indent=2)
+print(json.dumps(results, indent=2))
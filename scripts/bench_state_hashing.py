@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""Benchmark Merkle state hashing against full json.dumps + SHA-256 on ~1 MB manifests."""
+import os, sys, json, time, random, hashlib, tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "services", "decision-coordinator"))
+from state_hashing import StateHasher, state_hash, subtree_digest
+
+OUT = "reports"
+MANIFEST_BYTES = int(os.getenv("BENCH_MANIFEST_BYTES", str(1024 * 1024)))
+ROUNDS = int(os.getenv("BENCH_ROUNDS", "20"))
+
+def full_hash(state):
+  return hashlib.sha256(json.dumps(state, sort_keys=True).encode()).hexdigest()
+
+def canonical_hash(value):
+  return hashlib.sha256(json.dumps(value, sort_keys=True, separators=(",", ":")).encode()).hexdigest()
+
+def timed(fn):
+  t0 = time.perf_counter()
+  for _ in range(ROUNDS):
+    fn()
+  return (time.perf_counter() - t0) / ROUNDS
+
+def peak_bytes(fn):
+  tracemalloc.start()
+  fn()
+  peak = tracemalloc.get_traced_memory()[1]
+  tracemalloc.stop()
+  return peak
+
+random.seed(5)
+resources = []
+while len(json.dumps(resources)) < MANIFEST_BYTES:
+  n = len(resources)
+  resources.extend({
+    "id": f"res-{n + i}", "type": random.choice(["vm", "db", "lb"]), "replicas": random.randint(1, 9),
+    "labels": {"team": f"team-{random.randint(0, 40)}", "zone": random.choice(["a", "b", "c"])},
+    "ports": [random.randint(1000, 9000) for _ in range(3)]
+  } for i in range(500))
+manifest = {"action": "scale_up", "target": "compute_instances", "impact_level": "medium", "parameters": {"resources": resources}}
+large_manifest = dict(manifest, parameters={"resources": resources * 4})
+assert subtree_digest(large_manifest) == canonical_hash(large_manifest)
+
+# Submission + enactment as the coordinator does them: pre-state, then post-state over the same manifest
+def baseline_lifecycle():
+  full_hash({"timestamp": "t0", "manifest": manifest})
+  full_hash({"timestamp": "t1", "enacted_manifest": manifest, "approver": "a", "justification": "j"})
+
+def merkle_lifecycle():
+  manifest_hash = subtree_digest(manifest)
+  state_hash({"timestamp": "t0", "manifest": manifest}, {"manifest": manifest_hash})
+  state_hash({"timestamp": "t1", "enacted_manifest": manifest, "approver": "a", "justification": "j"},
+             {"enacted_manifest": manifest_hash})
+
+# A state with several large subtrees where one small key changes per update
+state = {f"component-{i}": manifest["parameters"]["resources"][i::8] for i in range(8)}
+state["status"] = "pending"
+hasher = StateHasher(state)
+
+def baseline_update():
+  state["status"] = random.choice(["pending", "running", "done"])
+  full_hash(state)
+
+def merkle_update():
+  hasher.update({"status": random.choice(["pending", "running", "done"])}).hexdigest()
+
+results = {
+  "timestamp": datetime.utcnow().isoformat() + "Z",
+  "manifest_bytes": len(json.dumps(manifest)),
+  "rounds": ROUNDS,
+  "lifecycle_baseline_ms": round(timed(baseline_lifecycle) * 1000, 2),
+  "lifecycle_merkle_ms": round(timed(merkle_lifecycle) * 1000, 2),
+  "update_baseline_ms": round(timed(baseline_update) * 1000, 3),
+  "update_merkle_ms": round(timed(merkle_update) * 1000, 3),
+  # One subtree hashed from scratch, against one json.dumps of the same canonical form
+  "one_shot_baseline_ms": round(timed(lambda: canonical_hash(manifest)) * 1000, 2),
+  "one_shot_streamed_ms": round(timed(lambda: subtree_digest(manifest)) * 1000, 2),
+  "one_shot_4x_baseline_ms": round(timed(lambda: canonical_hash(large_manifest)) * 1000, 2),
+  "one_shot_4x_streamed_ms": round(timed(lambda: subtree_digest(large_manifest)) * 1000, 2),
+  "single_hash_peak_bytes_baseline": peak_bytes(lambda: full_hash(manifest)),
+  "single_hash_peak_bytes_streamed": peak_bytes(lambda: subtree_digest(manifest))
+}
+results["lifecycle_speedup"] = round(results["lifecycle_baseline_ms"] / results["lifecycle_merkle_ms"], 2)
+results["one_shot_overhead"] = round(results["one_shot_streamed_ms"] / results["one_shot_baseline_ms"], 2)
+results["one_shot_4x_overhead"] = round(results["one_shot_4x_streamed_ms"] / results["one_shot_4x_baseline_ms"], 2)
+results["update_speedup"] = round(results["update_baseline_ms"] / max(results["update_merkle_ms"], 1e-6), 1)
+os.makedirs(OUT, exist_ok=True)
+with open(os.path.join(OUT, "state_hashing_bench.json"), "w") as fh:
+  json.dump(results, fh, indent=2)
+print(json.dumps(results, indent=2))
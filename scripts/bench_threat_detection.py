@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""Benchmark the threat-detection state engine (target: 50k events/sec)."""
+import os, sys, json, time, random, platform
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "services", "threat-detection"))
+from detection_state import SlidingWindowCounter, CIDRBlocklist, ThreatIndex
+
+OUT = "reports"
+TARGET_EPS = 50000
+EVENTS = int(os.getenv("BENCH_EVENTS", "500000"))
+
+random.seed(7)
+blocklist = CIDRBlocklist()
+for i in range(1000):
+  blocklist.add(f"10.{i % 256}.{i // 256}.0/24", ttl=3600)
+failed = SlidingWindowCounter(300)
+burst = SlidingWindowCounter(10, buckets=10)
+index = ThreatIndex(10000)
+
+ips = [f"{random.choice([10, 172, 192])}.{random.randint(0, 255)}.{random.randint(0, 255)}.{random.randint(1, 254)}" for _ in range(50000)]
+types = ["failed_login", "login", "query", "upload"]
+events = [(random.choice(ips), random.choice(types)) for _ in range(EVENTS)]
+
+t0 = time.perf_counter()
+now = time.time()
+for n, (ip, event_type) in enumerate(events):
+  ts = now + n / TARGET_EPS
+  blocked = blocklist.match(ip, ts)
+  rate = burst.add(ip, ts)
+  if event_type == "failed_login" and failed.add(ip, ts) >= 5 or blocked or rate >= 100:
+    index.add({"id": f"threat-{n}", "severity": "high", "source_ip": ip}, ts)
+elapsed = time.perf_counter() - t0
+
+results = {
+  "timestamp": datetime.utcnow().isoformat() + "Z",
+  "python": platform.python_version(),
+  "machine": platform.processor() or platform.machine(),
+  "cpus": os.cpu_count(),
+  "events": EVENTS,
+  "elapsed_s": round(elapsed, 3),
+  "events_per_sec": round(EVENTS / elapsed),
+  "target_events_per_sec": TARGET_EPS,
+  "meets_target": EVENTS / elapsed >= TARGET_EPS,
+  "tracked_ips": len(burst),
+  "retained_threats": len(index)
+}
+os.makedirs(OUT, exist_ok=True)
+with open(os.path.join(OUT, "threat_detection_bench.json"), "w") as fh:
+  json.dump(results, fh, indent=2)
+print(json.dumps(results, indent=2))
@@ -6,15 +6,24 @@ Produces confidence, risk, cost tradeoff metrics and explanation text
 
 import os
 import json
+import asyncio
 import math
 from datetime import datetime
 from typing import Dict, Any, List, Optional
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 import logging
 from prometheus_client import Counter, Histogram, generate_latest
 
+from scoring_engine import (
+    ACTION_CONFIDENCE, DEFAULT_ACTION_CONFIDENCE, TARGET_COMPLEXITY, DEFAULT_TARGET_COMPLEXITY,
+    IMPACT_RISK, DEFAULT_IMPACT_RISK, ACTION_RISK, DEFAULT_ACTION_RISK,
+    ACTION_COSTS, DEFAULT_ACTION_COST, INSTANCE_TYPE_MULTIPLIERS,
+    EXPLANATIONS, ScoringEngine, encode_batch, paused_gc, rounded_column
+)
+from outcome_store import OutcomeStore
+
 # Metrics
 SCORES_TOTAL = Counter('confidence_scores_total', 'Total confidence scores generated')
 SCORING_DURATION = Histogram('scoring_duration_seconds', 'Scoring processing time')
@@ -27,11 +36,33 @@ logger = logging.getLogger(__name__)
 SIMULATION_MODE = os.getenv('SIMULATION_MODE', 'true').lower() == 'true'
 NEURAL_FABRIC_URL = os.getenv('NEURAL_FABRIC_URL', 'http://localhost:8080')
 
+# Historical outcome store: decay half-life, prior strength and snapshot location
+HISTORY_HALF_LIFE_SECONDS = float(os.getenv('HISTORY_HALF_LIFE_SECONDS', str(7 * 86400)))
+HISTORY_PRIOR_WEIGHT = float(os.getenv('HISTORY_PRIOR_WEIGHT', '5'))
+HISTORY_SNAPSHOT_PATH = os.getenv('HISTORY_SNAPSHOT_PATH', '/tmp/confidence-scorer/history.npz')
+HISTORY_SNAPSHOT_INTERVAL = int(os.getenv('HISTORY_SNAPSHOT_INTERVAL', '60'))
+
+outcome_store = OutcomeStore(
+    half_life_seconds=HISTORY_HALF_LIFE_SECONDS,
+    prior_weight=HISTORY_PRIOR_WEIGHT,
+    snapshot_path=HISTORY_SNAPSHOT_PATH
+)
+
+# Lookup tables shared by batch scoring
+scoring_engine = ScoringEngine(outcome_store)
+
 class ScoreRequest(BaseModel):
     proposal_id: str
     manifest: Optional[Dict[str, Any]] = {}
     historical_context: Optional[Dict[str, Any]] = {}
 
+class EnactmentOutcome(BaseModel):
+    action: str
+    target: str = "system"
+    success: bool
+    duration_seconds: Optional[float] = None
+    completed_at: Optional[datetime] = None
+
 class ConfidenceScore(BaseModel):
     confidence: float  # 0.0 to 1.0
     risk: float       # 0.0 to 1.0
@@ -42,29 +73,10 @@ class ConfidenceScore(BaseModel):
 
 def calculate_action_confidence(action: str, target: str) -> float:
     """Calculate confidence based on action type and target"""
-    action_confidence_map = {
-        "scale_up": 0.85,
-        "scale_down": 0.75,
-        "security_patch": 0.90,
-        "update_config": 0.80,
-        "restart_service": 0.70,
-        "deploy_new": 0.60,
-        "delete": 0.40,
-        "emergency_action": 0.50
-    }
-    
-    base_confidence = action_confidence_map.get(action, 0.65)
+    base_confidence = ACTION_CONFIDENCE.get(action, DEFAULT_ACTION_CONFIDENCE)
     
     # Adjust based on target complexity
-    target_complexity = {
-        "compute_instances": 0.9,
-        "database": 0.7,
-        "network_config": 0.6,
-        "security_groups": 0.8,
-        "load_balancer": 0.85
-    }
-    
-    complexity_factor = target_complexity.get(target, 0.75)
+    complexity_factor = TARGET_COMPLEXITY.get(target, DEFAULT_TARGET_COMPLEXITY)
     return min(base_confidence * complexity_factor, 1.0)
 
 def calculate_risk_score(manifest: Dict[str, Any]) -> float:
@@ -73,26 +85,11 @@ def calculate_risk_score(manifest: Dict[str, Any]) -> float:
     
     # Risk factors
     impact_level = manifest.get('impact_level', 'medium')
-    impact_risk = {
-        'low': 0.1,
-        'medium': 0.3,
-        'high': 0.7,
-        'critical': 0.9
-    }
-    
     action = manifest.get('action', '')
-    action_risk = {
-        'scale_up': 0.2,
-        'scale_down': 0.4,
-        'security_patch': 0.3,
-        'delete': 0.8,
-        'emergency_action': 0.9,
-        'restart_service': 0.5
-    }
     
     # Calculate composite risk
-    risk = impact_risk.get(impact_level, 0.3)
-    risk += action_risk.get(action, 0.3)
+    risk = IMPACT_RISK.get(impact_level, DEFAULT_IMPACT_RISK)
+    risk += ACTION_RISK.get(action, DEFAULT_ACTION_RISK)
     
     # Additional risk factors
     if not manifest.get('rollback_plan', False):
@@ -109,16 +106,7 @@ def estimate_cost_impact(manifest: Dict[str, Any]) -> float:
     parameters = manifest.get('parameters', {})
     
     # Base cost estimates (in USD)
-    action_costs = {
-        'scale_up': 100.0,
-        'scale_down': -50.0,
-        'security_patch': 25.0,
-        'deploy_new': 200.0,
-        'restart_service': 10.0,
-        'update_config': 5.0
-    }
-    
-    base_cost = action_costs.get(action, 50.0)
+    base_cost = ACTION_COSTS.get(action, DEFAULT_ACTION_COST)
     
     # Adjust based on parameters
     if 'target_count' in parameters:
@@ -127,30 +115,13 @@ def estimate_cost_impact(manifest: Dict[str, Any]) -> float:
     
     if 'instance_type' in parameters:
         instance_type = parameters['instance_type']
-        type_multipliers = {
-            't3.micro': 0.5,
-            't3.small': 0.7,
-            't3.medium': 1.0,
-            'c5.large': 1.5,
-            'c5.xlarge': 2.0,
-            'm5.large': 1.3
-        }
-        base_cost *= type_multipliers.get(instance_type, 1.0)
+        base_cost *= INSTANCE_TYPE_MULTIPLIERS.get(instance_type, 1.0)
     
     return round(base_cost, 2)
 
 def get_historical_performance(action: str, target: str) -> Dict[str, float]:
-    """Get simulated historical performance metrics"""
-    # Simulate historical success rates
-    historical_data = {
-        ("scale_up", "compute_instances"): {"success_rate": 0.92, "avg_duration": 300},
-        ("scale_down", "compute_instances"): {"success_rate": 0.88, "avg_duration": 180},
-        ("security_patch", "system"): {"success_rate": 0.95, "avg_duration": 600},
-        ("restart_service", "application"): {"success_rate": 0.85, "avg_duration": 120}
-    }
-    
-    key = (action, target)
-    return historical_data.get(key, {"success_rate": 0.75, "avg_duration": 240})
+    """Get learned historical performance metrics (O(1) table lookup)"""
+    return outcome_store.lookup(action, target)
 
 def generate_explanation(confidence: float, risk: float, factors: Dict[str, Any]) -> str:
     """Generate human-readable explanation"""
@@ -214,7 +185,9 @@ async def score_proposal(request: ScoreRequest):
         'target_system': target,
         'impact_level': manifest.get('impact_level', 'medium'),
         'historical_success_rate': historical['success_rate'],
-        'estimated_duration': historical['avg_duration'],
+        'estimated_duration': round(historical['avg_duration'], 1),
+        'historical_confidence_interval': [round(historical['ci_low'], 4), round(historical['ci_high'], 4)],
+        'historical_samples': round(historical['samples'], 3),
         'rollback_available': manifest.get('rollback_plan', False),
         'approval_required': manifest.get('approval_required', False),
         'safety_checks': len(manifest.get('safety_checks', [])),
@@ -243,27 +216,128 @@ async def score_proposal(request: ScoreRequest):
     }
 
 @app.post("/batch_score")
-async def batch_score_proposals(proposals: List[ScoreRequest]):
-    """Score multiple proposals in batch"""
-    results = []
-    
-    for proposal in proposals:
-        try:
-            score_result = await score_proposal(proposal)
-            results.append(score_result)
-        except Exception as e:
-            results.append({
+async def batch_score_proposals(
+    proposals: List[ScoreRequest],
+    explain: bool = Query(False, description="Include explanation text and factors per proposal")
+):
+    """Score multiple proposals in batch with columnar lookup-table scoring"""
+    started = datetime.utcnow()
+    timestamp = started.isoformat()
+    
+    with paused_gc():
+        # Encode once into category codes, then score every proposal in one pass
+        manifests = [proposal.manifest for proposal in proposals]
+        batch = encode_batch(manifests, outcome_store.index)
+        scores = scoring_engine.score(batch)
+        
+        confidence = rounded_column(scores["confidence"], 3)
+        risk = rounded_column(scores["risk"], 3)
+        cost = rounded_column(scores["cost"], 2)
+        
+        results = [
+            {
                 "proposal_id": proposal.proposal_id,
-                "error": str(e),
-                "timestamp": datetime.utcnow().isoformat()
-            })
+                "score": {
+                    "confidence": row_confidence,
+                    "risk": row_risk,
+                    "cost_estimate": row_cost,
+                    "model_version": "1.0.0"
+                },
+                "timestamp": timestamp,
+                "model_version": "1.0.0"
+            }
+            for proposal, row_confidence, row_risk, row_cost in zip(proposals, confidence, risk, cost)
+        ]
+        
+        # Explanations and factors are only built on request
+        if explain:
+            explanation_codes = scoring_engine.explanation_codes(batch, scores).tolist()
+            success_rate = scores["success_rate"].tolist()
+            avg_duration = scores["avg_duration"].tolist()
+            ci_low = scores["ci_low"].tolist()
+            ci_high = scores["ci_high"].tolist()
+            samples = scores["samples"].tolist()
+            for row, result in enumerate(results):
+                manifest = manifests[row] or {}
+                result["score"]["explanation"] = EXPLANATIONS[explanation_codes[row]]
+                result["score"]["factors"] = {
+                    'action_type': manifest.get('action', 'unknown'),
+                    'target_system': manifest.get('target', 'system'),
+                    'impact_level': manifest.get('impact_level', 'medium'),
+                    'historical_success_rate': success_rate[row],
+                    'estimated_duration': round(avg_duration[row], 1),
+                    'historical_confidence_interval': [round(ci_low[row], 4), round(ci_high[row], 4)],
+                    'historical_samples': round(samples[row], 3),
+                    'rollback_available': manifest.get('rollback_plan', False),
+                    'approval_required': manifest.get('approval_required', False),
+                    'safety_checks': len(manifest.get('safety_checks', [])),
+                    'parameters_complexity': len(manifest.get('parameters', {}))
+                }
+        
+        for row, error in batch.errors.items():
+            results[row] = {
+                "proposal_id": proposals[row].proposal_id,
+                "error": error,
+                "timestamp": timestamp
+            }
+    
+    SCORES_TOTAL.inc(len(proposals) - len(batch.errors))
+    SCORING_DURATION.observe((datetime.utcnow() - started).total_seconds())
     
     return {
         "batch_results": results,
         "total_processed": len(results),
+        "timestamp": timestamp
+    }
+
+@app.post("/outcomes")
+async def ingest_outcomes(outcomes: List[EnactmentOutcome]):
+    """Ingest enactment results into the historical outcome store"""
+    for outcome in outcomes:
+        outcome_store.record(
+            outcome.action,
+            outcome.target,
+            outcome.success,
+            duration_seconds=outcome.duration_seconds,
+            timestamp=outcome.completed_at.timestamp() if outcome.completed_at else None
+        )
+    
+    return {
+        "status": "ingested",
+        "ingested": len(outcomes),
+        "tracked_keys": outcome_store.stats()["keys"],
         "timestamp": datetime.utcnow().isoformat()
     }
 
+@app.get("/history")
+async def get_history():
+    """Learned per-(action, target) success rates with 95% confidence intervals"""
+    return {
+        "entries": outcome_store.entries(),
+        "store": outcome_store.stats(),
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+@app.get("/history/{action}/{target}")
+async def get_history_entry(action: str, target: str):
+    """Historical performance used when scoring one (action, target)"""
+    historical = get_historical_performance(action, target)
+    return {
+        "action": action,
+        "target": target,
+        "success_rate": round(historical["success_rate"], 4),
+        "avg_duration": round(historical["avg_duration"], 1),
+        "confidence_interval": [round(historical["ci_low"], 4), round(historical["ci_high"], 4)],
+        "effective_samples": round(historical["samples"], 3),
+        "learned": outcome_store.row(action, target) != 0
+    }
+
+@app.post("/history/snapshot")
+async def snapshot_history():
+    """Write the outcome table to disk now"""
+    result = await asyncio.to_thread(outcome_store.snapshot)
+    return {"status": "snapshotted", **result}
+
 @app.get("/models")
 async def list_scoring_models():
     """List available scoring models and their capabilities"""
@@ -303,6 +377,25 @@ async def metrics():
         media_type="text/plain"
     )
 
+async def snapshot_periodically():
+    """Persist the outcome table whenever it has changed since the last snapshot."""
+    while True:
+        await asyncio.sleep(HISTORY_SNAPSHOT_INTERVAL)
+        if outcome_store.dirty:
+            try:
+                await asyncio.to_thread(outcome_store.snapshot)
+            except Exception as e:
+                logger.error(f"Outcome store snapshot failed: {e}")
+
+@app.on_event("startup")
+async def startup():
+    asyncio.create_task(snapshot_periodically())
+
+@app.on_event("shutdown")
+async def shutdown():
+    if outcome_store.dirty:
+        outcome_store.snapshot()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=9204)
\ No newline at end of file
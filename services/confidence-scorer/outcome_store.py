@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Learned historical performance for the Confidence Scorer.
+
+Enactment outcomes are folded into per-(action, target) exponentially decayed
+counters (successes, attempts, total duration) held in flat NumPy columns, one
+row per key. Reads decay the counters to "now" and blend them with a prior
+(the static historical defaults), so a key with no recent evidence drifts
+back to its prior and its confidence interval widens. The table is
+snapshotted to a single .npz file and restored on startup.
+"""
+
+import os
+import time
+import threading
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+from scoring_engine import HISTORICAL_PERFORMANCE, DEFAULT_HISTORICAL
+
+Z_95 = 1.959964
+
+class OutcomeStore:
+    """Decayed success/duration counters per (action, target), one table row per key."""
+    
+    COLUMNS = ("prior_rate", "prior_duration", "successes", "attempts", "duration", "updated_at")
+    
+    def __init__(self, half_life_seconds: float = 7 * 86400, prior_weight: float = 5.0,
+                 snapshot_path: Optional[str] = None, capacity: int = 1024):
+        self.half_life_seconds = half_life_seconds
+        self.prior_weight = prior_weight
+        self.snapshot_path = snapshot_path
+        self.lock = threading.Lock()
+        self.index: Dict[Tuple[str, str], int] = {}
+        self.keys: List[Tuple[str, str]] = []
+        self.columns = {name: np.zeros(capacity, dtype=np.float64) for name in self.COLUMNS}
+        self.size = 0
+        self.outcomes_ingested = 0
+        self.dirty = False
+        self.last_snapshot_at = None
+        # Row 0: prior-only defaults for keys that have never been seen
+        self._append(("", ""), DEFAULT_HISTORICAL["success_rate"], DEFAULT_HISTORICAL["avg_duration"])
+        for key, stats in HISTORICAL_PERFORMANCE.items():
+            self._append(key, stats["success_rate"], stats["avg_duration"])
+        if snapshot_path and os.path.exists(snapshot_path):
+            self.load(snapshot_path)
+    
+    def _append(self, key: Tuple[str, str], prior_rate: float, prior_duration: float) -> int:
+        if self.size == len(self.columns["attempts"]):
+            for name, column in self.columns.items():
+                grown = np.zeros(len(column) * 2, dtype=np.float64)
+                grown[:self.size] = column[:self.size]
+                self.columns[name] = grown
+        row = self.size
+        self.columns["prior_rate"][row] = prior_rate
+        self.columns["prior_duration"][row] = prior_duration
+        self.size += 1
+        self.keys.append(key)
+        if row:
+            self.index[key] = row
+        return row
+    
+    def row(self, action: str, target: str) -> int:
+        """Table row for a key; 0 (defaults) when it has no history."""
+        return self.index.get((action, target), 0)
+    
+    def record(self, action: str, target: str, success: bool, duration_seconds: Optional[float] = None,
+               timestamp: Optional[float] = None):
+        """Fold one enactment outcome into the key's decayed counters."""
+        now = time.time() if timestamp is None else timestamp
+        with self.lock:
+            row = self.index.get((action, target))
+            if row is None:
+                row = self._append((action, target), DEFAULT_HISTORICAL["success_rate"], DEFAULT_HISTORICAL["avg_duration"])
+            columns = self.columns
+            updated_at = columns["updated_at"][row]
+            if columns["attempts"][row] and now < updated_at:
+                # Late outcome: weight it by its age instead of rewinding the counters
+                weight = 0.5 ** ((updated_at - now) / self.half_life_seconds)
+            else:
+                if columns["attempts"][row]:
+                    decay = 0.5 ** ((now - updated_at) / self.half_life_seconds)
+                    columns["successes"][row] *= decay
+                    columns["attempts"][row] *= decay
+                    columns["duration"][row] *= decay
+                columns["updated_at"][row] = now
+                weight = 1.0
+            if duration_seconds is None:
+                duration_seconds = self._estimate(np.array([row]), now)["avg_duration"][0]
+            columns["successes"][row] += weight * bool(success)
+            columns["attempts"][row] += weight
+            columns["duration"][row] += weight * duration_seconds
+            self.outcomes_ingested += 1
+            self.dirty = True
+    
+    def _estimate(self, rows: np.ndarray, now: float) -> Dict[str, np.ndarray]:
+        columns = self.columns
+        attempts = columns["attempts"][rows]
+        decay = np.where(
+            attempts > 0,
+            0.5 ** (np.maximum(now - columns["updated_at"][rows], 0.0) / self.half_life_seconds),
+            0.0
+        )
+        samples = attempts * decay
+        prior_rate = columns["prior_rate"][rows]
+        prior_duration = columns["prior_duration"][rows]
+        weight = samples + self.prior_weight
+        # Prior blended with evidence; exactly the prior when there is none
+        success_rate = prior_rate + (columns["successes"][rows] * decay - prior_rate * samples) / weight
+        avg_duration = prior_duration + (columns["duration"][rows] * decay - prior_duration * samples) / weight
+        # Wilson score interval over evidence plus prior pseudo-observations
+        z2 = Z_95 * Z_95
+        denominator = 1 + z2 / weight
+        center = (success_rate + z2 / (2 * weight)) / denominator
+        half_width = Z_95 * np.sqrt(success_rate * (1 - success_rate) / weight + z2 / (4 * weight * weight)) / denominator
+        return {
+            "success_rate": success_rate,
+            "avg_duration": avg_duration,
+            "ci_low": np.maximum(center - half_width, 0.0),
+            "ci_high": np.minimum(center + half_width, 1.0),
+            "samples": samples
+        }
+    
+    def estimate_rows(self, rows: np.ndarray, now: Optional[float] = None) -> Dict[str, np.ndarray]:
+        """Vectorized estimates for table rows (as returned by row())."""
+        with self.lock:
+            return self._estimate(rows, time.time() if now is None else now)
+    
+    def lookup(self, action: str, target: str, now: Optional[float] = None) -> Dict[str, Any]:
+        estimate = self.estimate_rows(np.array([self.row(action, target)]), now)
+        return {name: values[0].item() for name, values in estimate.items()}
+    
+    def entries(self, now: Optional[float] = None) -> List[Dict[str, Any]]:
+        rows = np.arange(1, self.size)
+        estimate = self.estimate_rows(rows, now)
+        return [
+            {
+                "action": self.keys[row][0],
+                "target": self.keys[row][1],
+                "success_rate": round(estimate["success_rate"][i].item(), 4),
+                "avg_duration": round(estimate["avg_duration"][i].item(), 1),
+                "confidence_interval": [
+                    round(estimate["ci_low"][i].item(), 4), round(estimate["ci_high"][i].item(), 4)
+                ],
+                "effective_samples": round(estimate["samples"][i].item(), 3)
+            }
+            for i, row in enumerate(rows.tolist())
+        ]
+    
+    def snapshot(self, path: Optional[str] = None) -> Dict[str, Any]:
+        """Write the table atomically (temp file + rename)."""
+        path = path or self.snapshot_path
+        with self.lock:
+            keys = np.array(self.keys[1:], dtype=str).reshape(-1, 2)
+            arrays = {name: column[:self.size].copy() for name, column in self.columns.items()}
+            self.dirty = False
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "wb") as handle:
+            np.savez(handle, keys=keys, half_life_seconds=self.half_life_seconds, **arrays)
+        os.replace(temp_path, path)
+        self.last_snapshot_at = time.time()
+        return {"path": path, "keys": len(keys), "bytes": os.path.getsize(path)}
+    
+    def load(self, path: str):
+        with np.load(path) as data:
+            keys = [tuple(key) for key in data["keys"].tolist()]
+            arrays = {name: data[name] for name in self.COLUMNS}
+        with self.lock:
+            for offset, key in enumerate(keys, start=1):
+                row = self.index.get(key)
+                if row is None:
+                    row = self._append(key, arrays["prior_rate"][offset], arrays["prior_duration"][offset])
+                for name in ("successes", "attempts", "duration", "updated_at"):
+                    self.columns[name][row] = arrays[name][offset]
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "keys": self.size - 1,
+            "outcomes_ingested": self.outcomes_ingested,
+            "half_life_seconds": self.half_life_seconds,
+            "prior_weight": self.prior_weight,
+            "table_bytes": sum(column.nbytes for column in self.columns.values()),
+            "snapshot_path": self.snapshot_path,
+            "last_snapshot_at": self.last_snapshot_at,
+            "dirty": self.dirty
+        }
@@ -3,7 +3,10 @@
 
 import pytest
 from fastapi.testclient import TestClient
+import main
 from main import app
+from outcome_store import OutcomeStore
+from scoring_engine import ScoringEngine
 
 client = TestClient(app)
 
@@ -110,6 +113,87 @@ def test_batch_scoring():
     assert len(data["batch_results"]) == 2
     assert data["total_processed"] == 2
 
+def test_batch_scoring_matches_single_scores():
+    """Batch lookup-table scores agree with /score, with explanations on request"""
+    manifests = [
+        {"action": "scale_up", "target": "compute_instances", "impact_level": "medium",
+         "rollback_plan": True, "parameters": {"target_count": 3, "instance_type": "c5.large"}},
+        {"action": "delete", "target": "database", "impact_level": "high"},
+        {"action": "security_patch", "target": "system", "approval_required": True,
+         "safety_checks": ["backup"]},
+        {"action": "custom_action", "target": "unknown_target", "impact_level": "unusual"},
+        {}
+    ]
+    proposals = [{"proposal_id": f"parity-{i}", "manifest": m} for i, m in enumerate(manifests)]
+    
+    response = client.post("/batch_score?explain=true", json=proposals)
+    assert response.status_code == 200
+    batch_results = response.json()["batch_results"]
+    
+    for proposal, result in zip(proposals, batch_results):
+        single = client.post("/score", json=proposal).json()["score"]
+        for key in ("confidence", "risk", "cost_estimate", "explanation", "factors"):
+            assert result["score"][key] == single[key]
+
+def test_batch_scoring_reports_bad_rows():
+    """Malformed proposals fail individually without failing the batch"""
+    proposals = [
+        {"proposal_id": "ok-001", "manifest": {"action": "scale_up"}},
+        {"proposal_id": "bad-001", "manifest": {"action": "scale_up", "parameters": {"target_count": "many"}}}
+    ]
+    
+    response = client.post("/batch_score", json=proposals)
+    data = response.json()
+    
+    assert "score" in data["batch_results"][0]
+    assert "explanation" not in data["batch_results"][0]["score"]
+    assert "error" in data["batch_results"][1]
+
+def test_outcomes_update_historical_performance(monkeypatch, tmp_path):
+    """Ingested enactment results move the learned success rate and its interval"""
+    # Fresh store, so a snapshot left by a local run of the service cannot leak in
+    store = OutcomeStore(
+        half_life_seconds=main.HISTORY_HALF_LIFE_SECONDS,
+        prior_weight=main.HISTORY_PRIOR_WEIGHT,
+        snapshot_path=str(tmp_path / "history.npz")
+    )
+    monkeypatch.setattr(main, "outcome_store", store)
+    monkeypatch.setattr(main, "scoring_engine", ScoringEngine(store))
+    
+    before = client.get("/history/update_config/load_balancer").json()
+    assert before["learned"] is False
+    
+    outcomes = [
+        {"action": "update_config", "target": "load_balancer", "success": i % 10 != 0, "duration_seconds": 90}
+        for i in range(50)
+    ]
+    response = client.post("/outcomes", json=outcomes)
+    assert response.status_code == 200
+    assert response.json()["ingested"] == 50
+    
+    after = client.get("/history/update_config/load_balancer").json()
+    assert after["learned"] is True
+    assert after["success_rate"] > before["success_rate"]
+    assert after["avg_duration"] < before["avg_duration"]
+    low, high = after["confidence_interval"]
+    assert low <= after["success_rate"] <= high
+    assert high - low < before["confidence_interval"][1] - before["confidence_interval"][0]
+
+def test_outcome_store_decay_and_snapshot(tmp_path):
+    """Evidence decays back toward the prior and survives a snapshot round trip"""
+    store = OutcomeStore(half_life_seconds=100, prior_weight=5)
+    for _ in range(20):
+        store.record("scale_up", "compute_instances", False, 10, timestamp=1000)
+    fresh = store.lookup("scale_up", "compute_instances", now=1000)
+    stale = store.lookup("scale_up", "compute_instances", now=2000)
+    assert fresh["success_rate"] < stale["success_rate"] < 0.92
+    assert fresh["samples"] == 20
+    
+    path = str(tmp_path / "history.npz")
+    store.snapshot(path)
+    restored = OutcomeStore(half_life_seconds=100, prior_weight=5, snapshot_path=path)
+    assert restored.lookup("scale_up", "compute_instances", now=1000) == fresh
+
 def test_list_models():
     """Test listing available scoring models"""
     response = client.get("/models")
@@ -10,7 +10,7 @@ import logging
 import asyncio
 import argparse
 from datetime import datetime, timezone
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 import uuid
 
 import requests
@@ -21,6 +21,7 @@ import uvicorn
 from auth import VaultAuth
 from metrics import MetricsStreamer
 from executor import WPKExecutor
+from scheduler import ExecutionScheduler
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -35,12 +36,23 @@ class ConnectorConfig:
         self.prom_url = os.getenv("PROM_URL", "http://localhost:9090")
         self.cosign_key = os.getenv("COSIGN_KEY", "")
         self.simulate = os.getenv("SIMULATE", "true").lower() == "true"
+        self.max_workers = int(os.getenv("EXEC_MAX_WORKERS", "4"))
+        self.namespace_limit = int(os.getenv("EXEC_NAMESPACE_LIMIT", "2"))
+        self.playbook_limit = int(os.getenv("EXEC_PLAYBOOK_LIMIT", "1"))
+        self.max_queue = int(os.getenv("EXEC_MAX_QUEUE", "1000"))
+        self.history_size = int(os.getenv("EXEC_HISTORY_SIZE", "1000"))
+        self.signature_cache_size = int(os.getenv("SIGNATURE_CACHE_SIZE", "4096"))
+        self.signature_cache_ttl = int(os.getenv("SIGNATURE_CACHE_TTL", "3600"))
+        self.verify_workers = int(os.getenv("VERIFY_WORKERS", "4"))
 
 class ExecutionRequest(BaseModel):
     playbook_id: str
     signature: str
     payload: Dict[str, Any]
     orchestration_id: str
+    namespace: Optional[str] = None
+    priority: str = "normal"
+    idempotency_key: Optional[str] = None
 
 class HealthStatus(BaseModel):
     cluster_id: str
@@ -56,7 +68,21 @@ class BYOCConnector:
         self.config = config
         self.auth = VaultAuth(config.vault_addr, config.simulate)
         self.metrics = MetricsStreamer(config.prom_url, config.control_plane_url, config.simulate)
-        self.executor = WPKExecutor(config.cosign_key, config.simulate)
+        self.executor = WPKExecutor(
+            config.cosign_key,
+            config.simulate,
+            history_size=config.history_size,
+            signature_cache_size=config.signature_cache_size,
+            signature_cache_ttl=config.signature_cache_ttl,
+            verify_workers=config.verify_workers
+        )
+        self.scheduler = ExecutionScheduler(
+            self.executor,
+            max_workers=config.max_workers,
+            namespace_limit=config.namespace_limit,
+            playbook_limit=config.playbook_limit,
+            max_queue=config.max_queue
+        )
         self.registered = False
         self.last_execution = None
         
@@ -142,29 +168,37 @@ class BYOCConnector:
                 logger.error(f"Heartbeat error: {e}")
                 await asyncio.sleep(60)
     
-    async def execute_wpk(self, request: ExecutionRequest) -> Dict[str, Any]:
+    async def execute_wpk(self, request: ExecutionRequest, verified: bool = False) -> Dict[str, Any]:
         """Execute signed WPK payload."""
         try:
-            # Verify signature
-            if not await self.executor.verify_signature(request.signature, request.payload):
+            # Verify signature unless already checked by a batch
+            if not verified and not await self.executor.verify_signature(request.signature, request.payload):
                 raise HTTPException(status_code=403, detail="Invalid signature")
             
-            # Execute playbook
-            result = await self.executor.execute(request.playbook_id, request.payload)
+            # Execute playbook through the scheduler
+            result = await self.scheduler.submit(
+                request.playbook_id,
+                request.payload,
+                namespace=request.namespace,
+                priority=request.priority,
+                idempotency_key=request.idempotency_key
+            )
             
             self.last_execution = datetime.now(timezone.utc).isoformat()
             
-            # Log execution
-            await self.executor.log_execution(
-                request.orchestration_id,
-                request.playbook_id,
-                result
-            )
+            # Log execution once; retried submissions reuse the original result
+            if not result.get("deduplicated"):
+                await self.executor.log_execution(
+                    request.orchestration_id,
+                    request.playbook_id,
+                    result
+                )
             
             return {
                 "status": "success",
                 "execution_id": result.get("execution_id"),
                 "cluster_id": self.config.cluster_id,
+                "deduplicated": result.get("deduplicated", False),
                 "timestamp": self.last_execution
             }
             
@@ -177,6 +211,27 @@ class BYOCConnector:
                 "timestamp": datetime.now(timezone.utc).isoformat()
             }
 
+    async def execute_wpk_batch(self, requests_: List[ExecutionRequest]) -> List[Dict[str, Any]]:
+        """Verify a batch of WPKs in parallel, then schedule the valid ones."""
+        verified = await self.executor.verify_batch(
+            [(request.signature, request.payload) for request in requests_]
+        )
+        
+        async def run(request: ExecutionRequest, ok: bool) -> Dict[str, Any]:
+            if not ok:
+                return {
+                    "status": "error",
+                    "error": "Invalid signature",
+                    "playbook_id": request.playbook_id,
+                    "cluster_id": self.config.cluster_id,
+                    "timestamp": datetime.now(timezone.utc).isoformat()
+                }
+            return await self.execute_wpk(request, verified=True)
+        
+        return list(await asyncio.gather(*[
+            run(request, ok) for request, ok in zip(requests_, verified)
+        ]))
+
 # FastAPI app for receiving commands
 app = FastAPI(title="BYOC Connector", version="1.0.0")
 connector = None
@@ -189,6 +244,25 @@ async def execute_endpoint(request: ExecutionRequest):
     
     return await connector.execute_wpk(request)
 
+@app.post("/execute/batch")
+async def execute_batch_endpoint(requests_: List[ExecutionRequest]):
+    """Receive a queue of WPKs and execute them with batched verification."""
+    if not connector or not connector.registered:
+        raise HTTPException(status_code=503, detail="Connector not registered")
+    
+    return {"results": await connector.execute_wpk_batch(requests_)}
+
+@app.get("/executions/summary")
+async def execution_summary():
+    """Execution history and scheduler statistics."""
+    if not connector:
+        raise HTTPException(status_code=503, detail="Connector not initialized")
+    
+    return {
+        **connector.executor.get_execution_summary(),
+        "scheduler": connector.scheduler.get_status()
+    }
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint."""
@@ -214,6 +288,7 @@ async def main():
         return
     
     # Start background tasks
+    connector.scheduler.start()
     tasks = [
         asyncio.create_task(connector.start_metrics_streaming()),
         asyncio.create_task(connector.send_heartbeat())
@@ -232,6 +307,7 @@ async def main():
         logger.info("Shutting down connector...")
         for task in tasks:
             task.cancel()
+        await connector.scheduler.stop()
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="BYOC Connector Agent")
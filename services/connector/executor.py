@@ -7,20 +7,168 @@ import os
 import json
 import logging
 import hashlib
+import asyncio
+import time
+import threading
 import subprocess
-from typing import Dict, Any, Optional
+from collections import deque, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Iterable, List, Optional, Tuple
 from datetime import datetime, timezone
 import uuid
 
 logger = logging.getLogger(__name__)
 
+class ExecutionHistory:
+    """Bounded ring buffer of execution results with running aggregate counters."""
+    
+    def __init__(self, maxlen: int = 1000):
+        self.maxlen = maxlen
+        self.reset()
+    
+    def reset(self, results: Iterable[Dict[str, Any]] = ()):
+        """Clear history and counters, optionally seeding from existing results."""
+        self._records = deque(maxlen=self.maxlen)
+        self.total = 0
+        self.successful = 0
+        self.failed = 0
+        for result in results:
+            self.append(result)
+    
+    def append(self, result: Dict[str, Any]):
+        """Record an execution result and update counters in O(1)."""
+        self._records.append(result)
+        self.total += 1
+        status = result.get("status")
+        if status == "success":
+            self.successful += 1
+        elif status in ("failed", "error"):
+            self.failed += 1
+    
+    @property
+    def last(self) -> Optional[Dict[str, Any]]:
+        return self._records[-1] if self._records else None
+    
+    def __len__(self) -> int:
+        return len(self._records)
+    
+    def __iter__(self):
+        return iter(self._records)
+    
+    def __getitem__(self, index):
+        return self._records[index]
+
+class SignatureCache:
+    """LRU cache of verified (signature, payload digest) pairs bound to one cosign key."""
+    
+    def __init__(self, maxsize: int = 4096, ttl: float = 3600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.key_id: Optional[str] = None
+        self._entries: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def bind_key(self, cosign_key: str):
+        """Drop all entries if the verifying key has changed."""
+        key_id = hashlib.sha256((cosign_key or "").encode()).hexdigest()
+        with self._lock:
+            if key_id != self.key_id:
+                self._entries.clear()
+                self.key_id = key_id
+    
+    def get(self, signature: str, digest: str) -> bool:
+        entry = (signature, digest)
+        with self._lock:
+            verified_at = self._entries.get(entry)
+            if verified_at is None or time.monotonic() - verified_at > self.ttl:
+                if verified_at is not None:
+                    del self._entries[entry]
+                self.misses += 1
+                return False
+            self._entries.move_to_end(entry)
+            self.hits += 1
+            return True
+    
+    def put(self, signature: str, digest: str):
+        with self._lock:
+            self._entries[(signature, digest)] = time.monotonic()
+            self._entries.move_to_end((signature, digest))
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+
 class WPKExecutor:
     """Handles WPK execution with cosign verification."""
     
-    def __init__(self, cosign_key: str, simulate: bool = False):
+    def __init__(self, cosign_key: str, simulate: bool = False, history_size: int = 1000,
+                 signature_cache_size: int = 4096, signature_cache_ttl: float = 3600,
+                 verify_workers: int = 4):
+        self.signature_cache = SignatureCache(signature_cache_size, signature_cache_ttl)
         self.cosign_key = cosign_key
         self.simulate = simulate
-        self.executions = []
+        self.history = ExecutionHistory(history_size)
+        self.verify_workers = verify_workers
+        self._verify_pool: Optional[ThreadPoolExecutor] = None
+    
+    @property
+    def cosign_key(self) -> str:
+        return self._cosign_key
+    
+    @cosign_key.setter
+    def cosign_key(self, value: str):
+        # Rotating the key invalidates every previously verified signature
+        self._cosign_key = value
+        self.signature_cache.bind_key(value)
+    
+    @property
+    def executions(self) -> ExecutionHistory:
+        """Retained execution results, most recent last."""
+        return self.history
+    
+    @executions.setter
+    def executions(self, results: Iterable[Dict[str, Any]]):
+        self.history.reset(results)
+    
+    @staticmethod
+    def payload_digest(payload: Dict[str, Any]) -> str:
+        """Canonical SHA-256 digest of a WPK payload."""
+        payload_json = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(payload_json.encode()).hexdigest()
+    
+    def _verify_uncached(self, signature: str, payload_hash: str) -> bool:
+        """Run the (expensive) cosign check for one digest."""
+        # Mock verification - in production use cosign CLI or library
+        if signature and len(signature) > 10:
+            logger.info("Signature verification passed")
+            return True
+        else:
+            logger.error("Invalid signature format")
+            return False
+    
+    def _verify_sync(self, signature: str, payload: Dict[str, Any]) -> bool:
+        """Verify a signature, consulting the cache first."""
+        try:
+            payload_hash = self.payload_digest(payload)
+            if self.signature_cache.get(signature, payload_hash):
+                return True
+            
+            # In production, this would use actual cosign verification
+            verified = self._verify_uncached(signature, payload_hash)
+            if verified:
+                self.signature_cache.put(signature, payload_hash)
+            return verified
+        
+        except Exception as e:
+            logger.error(f"Signature verification error: {e}")
+            return False
     
     async def verify_signature(self, signature: str, payload: Dict[str, Any]) -> bool:
         """Verify cosign signature of WPK payload."""
@@ -32,22 +180,24 @@ class WPKExecutor:
             logger.warning("COSIGN_KEY not set, using simulation mode")
             return True
         
-        try:
-            # In production, this would use actual cosign verification
-            payload_json = json.dumps(payload, sort_keys=True)
-            payload_hash = hashlib.sha256(payload_json.encode()).hexdigest()
-            
-            # Mock verification - in production use cosign CLI or library
-            if signature and len(signature) > 10:
-                logger.info("Signature verification passed")
-                return True
-            else:
-                logger.error("Invalid signature format")
-                return False
-                
-        except Exception as e:
-            logger.error(f"Signature verification error: {e}")
-            return False
+        return self._verify_sync(signature, payload)
+    
+    async def verify_batch(self, items: List[Tuple[str, Dict[str, Any]]]) -> List[bool]:
+        """Verify a queue of (signature, payload) pairs across worker threads."""
+        if self.simulate or not self.cosign_key:
+            return [await self.verify_signature(sig, payload) for sig, payload in items]
+        
+        if self._verify_pool is None:
+            self._verify_pool = ThreadPoolExecutor(
+                max_workers=self.verify_workers,
+                thread_name_prefix="wpk-verify"
+            )
+        
+        loop = asyncio.get_running_loop()
+        return list(await asyncio.gather(*[
+            loop.run_in_executor(self._verify_pool, self._verify_sync, sig, payload)
+            for sig, payload in items
+        ]))
     
     async def execute(self, playbook_id: str, payload: Dict[str, Any]) -> Dict[str, Any]:
         """Execute WPK playbook."""
@@ -85,7 +235,8 @@ class WPKExecutor:
             
             # Execute via kubectl
             cmd = ["kubectl", "apply", "-f", manifest_file]
-            process = subprocess.run(
+            process = await asyncio.to_thread(
+                subprocess.run,
                 cmd,
                 capture_output=True,
                 text=True,
@@ -153,9 +304,9 @@ class WPKExecutor:
     
     def get_execution_summary(self) -> Dict[str, Any]:
         """Get execution summary statistics."""
-        total = len(self.executions)
-        successful = len([e for e in self.executions if e.get("status") == "success"])
-        failed = len([e for e in self.executions if e.get("status") in ["failed", "error"]])
+        total = self.history.total
+        successful = self.history.successful
+        failed = self.history.failed
         
         return {
             "total_executions": total,
@@ -163,5 +314,10 @@ class WPKExecutor:
             "failed": failed,
             "success_rate": (successful / total * 100) if total > 0 else 0,
             "simulation_mode": self.simulate,
-            "last_execution": self.executions[-1] if self.executions else None
+            "signature_cache": {
+                "size": len(self.signature_cache),
+                "hits": self.signature_cache.hits,
+                "misses": self.signature_cache.misses
+            },
+            "last_execution": self.history.last
         }
\ No newline at end of file
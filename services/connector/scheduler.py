@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Execution scheduler for BYOC Connector.
+"""
+
+import time
+import asyncio
+import logging
+from collections import deque, OrderedDict
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+# Lanes are drained in this order; incident remediation always goes first.
+PRIORITY_LANES = ("incident", "high", "normal", "low")
+
+class ExecutionJob:
+    """A queued playbook execution."""
+    
+    def __init__(self, playbook_id: str, payload: Dict[str, Any], namespace: str,
+                 priority: str, idempotency_key: Optional[str], future: asyncio.Future):
+        self.playbook_id = playbook_id
+        self.payload = payload
+        self.namespace = namespace
+        self.priority = priority
+        self.idempotency_key = idempotency_key
+        self.future = future
+        self.enqueued_at = time.monotonic()
+
+class ExecutionScheduler:
+    """Bounded worker pool that runs WPK executions with concurrency caps."""
+    
+    def __init__(self, executor, max_workers: int = 4, namespace_limit: int = 2,
+                 playbook_limit: int = 1, max_queue: int = 1000,
+                 idempotency_ttl: int = 3600, idempotency_size: int = 10000):
+        self.executor = executor
+        self.max_workers = max_workers
+        self.namespace_limit = namespace_limit
+        self.playbook_limit = playbook_limit
+        self.max_queue = max_queue
+        self.idempotency_ttl = idempotency_ttl
+        self.idempotency_size = idempotency_size
+        
+        self.lanes = {lane: deque() for lane in PRIORITY_LANES}
+        self.running_by_namespace: Dict[str, int] = {}
+        self.running_by_playbook: Dict[str, int] = {}
+        self.idempotency: "OrderedDict[str, tuple]" = OrderedDict()
+        self.deduplicated = 0
+        
+        self._cond: Optional[asyncio.Condition] = None
+        self._workers = []
+    
+    @staticmethod
+    def resolve_namespace(payload: Dict[str, Any], namespace: Optional[str] = None) -> str:
+        """Pick the target namespace from the request or the manifest metadata."""
+        if namespace:
+            return namespace
+        manifest = payload.get("manifest")
+        if isinstance(manifest, dict):
+            return manifest.get("metadata", {}).get("namespace") or "default"
+        return "default"
+    
+    def start(self):
+        """Spawn the worker pool on the running event loop."""
+        if self._workers:
+            return
+        self._cond = asyncio.Condition()
+        self._workers = [
+            asyncio.create_task(self._worker(i)) for i in range(self.max_workers)
+        ]
+        logger.info(f"Execution scheduler started with {self.max_workers} workers")
+    
+    async def stop(self):
+        """Cancel workers and fail anything still queued."""
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        for lane in self.lanes.values():
+            while lane:
+                job = lane.popleft()
+                if not job.future.done():
+                    job.future.set_exception(RuntimeError("Scheduler stopped"))
+    
+    def queue_depth(self) -> int:
+        return sum(len(lane) for lane in self.lanes.values())
+    
+    def _lookup_idempotent(self, key: str) -> Optional[asyncio.Future]:
+        """Return the future of a previous submission with the same key, if still live."""
+        now = time.monotonic()
+        while self.idempotency:
+            _, created = next(iter(self.idempotency.values()))
+            if now - created < self.idempotency_ttl and len(self.idempotency) <= self.idempotency_size:
+                break
+            self.idempotency.popitem(last=False)
+        entry = self.idempotency.get(key)
+        return entry[0] if entry else None
+    
+    async def submit(self, playbook_id: str, payload: Dict[str, Any],
+                     namespace: Optional[str] = None, priority: str = "normal",
+                     idempotency_key: Optional[str] = None) -> Dict[str, Any]:
+        """Queue an execution and wait for its result."""
+        if priority not in self.lanes:
+            raise ValueError(f"Unknown priority lane: {priority}")
+        
+        if idempotency_key:
+            existing = self._lookup_idempotent(idempotency_key)
+            if existing is not None:
+                self.deduplicated += 1
+                logger.info(f"Deduplicated execution for idempotency key {idempotency_key}")
+                result = await asyncio.shield(existing)
+                return {**result, "deduplicated": True}
+        
+        if self.queue_depth() >= self.max_queue:
+            raise RuntimeError("Execution queue full")
+        
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        job = ExecutionJob(
+            playbook_id,
+            payload,
+            self.resolve_namespace(payload, namespace),
+            priority,
+            idempotency_key,
+            future
+        )
+        if idempotency_key:
+            self.idempotency[idempotency_key] = (future, time.monotonic())
+        
+        async with self._cond:
+            self.lanes[priority].append(job)
+            self._cond.notify()
+        
+        return await asyncio.shield(future)
+    
+    def _runnable(self, job: ExecutionJob) -> bool:
+        return (self.running_by_namespace.get(job.namespace, 0) < self.namespace_limit and
+                self.running_by_playbook.get(job.playbook_id, 0) < self.playbook_limit)
+    
+    def _take_next(self) -> Optional[ExecutionJob]:
+        """Pop the first job, in lane priority order, whose caps allow it to run."""
+        for lane_name in PRIORITY_LANES:
+            lane = self.lanes[lane_name]
+            for index, job in enumerate(lane):
+                if self._runnable(job):
+                    del lane[index]
+                    return job
+        return None
+    
+    async def _worker(self, worker_id: int):
+        while True:
+            async with self._cond:
+                job = self._take_next()
+                while job is None:
+                    await self._cond.wait()
+                    job = self._take_next()
+                self.running_by_namespace[job.namespace] = self.running_by_namespace.get(job.namespace, 0) + 1
+                self.running_by_playbook[job.playbook_id] = self.running_by_playbook.get(job.playbook_id, 0) + 1
+            
+            try:
+                result = await self.executor.execute(job.playbook_id, job.payload)
+                result["namespace"] = job.namespace
+                result["priority"] = job.priority
+                result["queue_wait_ms"] = int((time.monotonic() - job.enqueued_at) * 1000)
+                if not job.future.done():
+                    job.future.set_result(result)
+            except Exception as e:
+                logger.error(f"Worker {worker_id} execution error: {e}")
+                if job.idempotency_key:
+                    self.idempotency.pop(job.idempotency_key, None)
+                if not job.future.done():
+                    job.future.set_exception(e)
+            finally:
+                async with self._cond:
+                    self.running_by_namespace[job.namespace] -= 1
+                    self.running_by_playbook[job.playbook_id] -= 1
+                    if not self.running_by_namespace[job.namespace]:
+                        del self.running_by_namespace[job.namespace]
+                    if not self.running_by_playbook[job.playbook_id]:
+                        del self.running_by_playbook[job.playbook_id]
+                    # A freed slot may unblock jobs that other workers skipped
+                    self._cond.notify_all()
+    
+    def get_status(self) -> Dict[str, Any]:
+        """Get scheduler queue and concurrency statistics."""
+        return {
+            "workers": len(self._workers),
+            "max_workers": self.max_workers,
+            "queued": {lane: len(jobs) for lane, jobs in self.lanes.items()},
+            "running_by_namespace": dict(self.running_by_namespace),
+            "running_by_playbook": dict(self.running_by_playbook),
+            "namespace_limit": self.namespace_limit,
+            "playbook_limit": self.playbook_limit,
+            "deduplicated": self.deduplicated
+        }
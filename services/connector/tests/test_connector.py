@@ -15,6 +15,7 @@ from agent import BYOCConnector, ConnectorConfig, ExecutionRequest
 from auth import VaultAuth
 from metrics import MetricsStreamer
 from executor import WPKExecutor
+from scheduler import ExecutionScheduler
 
 class TestBYOCConnector:
     """Test cases for BYOC Connector."""
@@ -139,5 +140,128 @@ class TestWPKExecutor:
         assert summary["failed"] == 1
         assert abs(summary["success_rate"] - 66.67) < 0.1
 
+    def test_history_ring_buffer(self):
+        """Test bounded history keeps cumulative counters."""
+        executor = WPKExecutor("", simulate=True, history_size=2)
+        for status in ["success", "failed", "success"]:
+            executor.history.append({"status": status})
+        
+        summary = executor.get_execution_summary()
+        
+        assert len(executor.executions) == 2
+        assert summary["total_executions"] == 3
+        assert summary["successful"] == 2
+        assert summary["last_execution"] == {"status": "success"}
+
+class TestSignatureCache:
+    """Test cases for verified-signature caching."""
+    
+    def setup_method(self):
+        """Setup test environment."""
+        self.executor = WPKExecutor("cosign-key-1")
+        self.payload = {"manifest": {"kind": "Pod"}}
+    
+    @pytest.mark.asyncio
+    async def test_repeat_verification_hits_cache(self):
+        """Test replayed payloads are served from the cache."""
+        assert await self.executor.verify_signature("valid-signature-123", self.payload)
+        assert await self.executor.verify_signature("valid-signature-123", self.payload)
+        
+        assert self.executor.signature_cache.misses == 1
+        assert self.executor.signature_cache.hits == 1
+    
+    @pytest.mark.asyncio
+    async def test_key_rotation_invalidates_cache(self):
+        """Test changing cosign_key drops cached verifications."""
+        await self.executor.verify_signature("valid-signature-123", self.payload)
+        assert len(self.executor.signature_cache) == 1
+        
+        self.executor.cosign_key = "cosign-key-2"
+        
+        assert len(self.executor.signature_cache) == 0
+    
+    def test_lru_eviction(self):
+        """Test the cache is bounded."""
+        executor = WPKExecutor("cosign-key-1", signature_cache_size=2)
+        for i in range(3):
+            executor._verify_sync(f"valid-signature-{i:04d}", self.payload)
+        
+        assert len(executor.signature_cache) == 2
+        assert not executor.signature_cache.get("valid-signature-0000", executor.payload_digest(self.payload))
+    
+    @pytest.mark.asyncio
+    async def test_verify_batch(self):
+        """Test batch verification in worker threads."""
+        results = await self.executor.verify_batch([
+            ("valid-signature-123", self.payload),
+            ("bad", self.payload)
+        ])
+        
+        assert results == [True, False]
+
+class TestExecutionScheduler:
+    """Test cases for the execution scheduler."""
+    
+    def setup_method(self):
+        """Setup test environment."""
+        self.executor = WPKExecutor("", simulate=True)
+        self.scheduler = ExecutionScheduler(self.executor, max_workers=1)
+    
+    @pytest.mark.asyncio
+    async def test_idempotency_key_deduplicates(self):
+        """Test retried submissions reuse the original execution."""
+        payload = {"manifest": {"metadata": {"namespace": "prod"}}}
+        first = await self.scheduler.submit("pb-1", payload, idempotency_key="retry-1")
+        second = await self.scheduler.submit("pb-1", payload, idempotency_key="retry-1")
+        await self.scheduler.stop()
+        
+        assert second["execution_id"] == first["execution_id"]
+        assert second["deduplicated"] is True
+        assert first["namespace"] == "prod"
+        assert self.executor.get_execution_summary()["total_executions"] == 1
+    
+    @pytest.mark.asyncio
+    async def test_incident_lane_runs_first(self):
+        """Test incident remediation is dequeued ahead of normal work."""
+        order = []
+        release = asyncio.Event()
+        
+        async def tracking_execute(playbook_id, payload):
+            order.append(playbook_id)
+            if playbook_id == "pb-blocker":
+                await release.wait()
+            return {"status": "success", "playbook_id": playbook_id}
+        
+        self.executor.execute = tracking_execute
+        # Occupy the only worker so the next two jobs queue up behind it
+        blocker = asyncio.create_task(self.scheduler.submit("pb-blocker", {}))
+        await asyncio.sleep(0.01)
+        normal = asyncio.create_task(self.scheduler.submit("pb-normal", {}))
+        incident = asyncio.create_task(self.scheduler.submit("pb-incident", {}, priority="incident"))
+        await asyncio.sleep(0.01)
+        release.set()
+        await asyncio.gather(blocker, normal, incident)
+        await self.scheduler.stop()
+        
+        assert order == ["pb-blocker", "pb-incident", "pb-normal"]
+    
+    @pytest.mark.asyncio
+    async def test_playbook_concurrency_cap(self):
+        """Test the per-playbook cap serialises executions of one playbook."""
+        scheduler = ExecutionScheduler(self.executor, max_workers=4, playbook_limit=1)
+        peak = 0
+        
+        async def slow_execute(playbook_id, payload):
+            nonlocal peak
+            peak = max(peak, scheduler.running_by_playbook.get(playbook_id, 0))
+            await asyncio.sleep(0.01)
+            return {"status": "success", "playbook_id": playbook_id}
+        
+        self.executor.execute = slow_execute
+        await asyncio.gather(*[scheduler.submit("pb-1", {}) for _ in range(4)])
+        await scheduler.stop()
+        
+        assert peak == 1
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
\ No newline at end of file
@@ -0,0 +1,134 @@
+import json
+import heapq
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Iterable
+
+def to_epoch(timestamp: str) -> float:
+    return datetime.fromisoformat(timestamp.replace('Z', '+00:00')).timestamp()
+
+class TenantPartition:
+    """One tenant's contexts plus sorted time/relevance indexes and a region index."""
+    
+    def __init__(self):
+        self.items: Dict[str, Dict[str, Any]] = {}
+        self.epochs: Dict[str, float] = {}
+        self.search_text: Dict[str, str] = {}
+        # Sorted (key, entity_id) lists for range scans
+        self.by_time: List[tuple] = []
+        self.by_relevance: List[tuple] = []
+        self.by_region: Dict[str, set] = {}
+    
+    def put(self, entity_id: str, item: Dict[str, Any]):
+        if entity_id in self.items:
+            self.remove(entity_id)
+        epoch = to_epoch(item["last_updated"])
+        relevance = item.get("relevance", 0)
+        self.items[entity_id] = item
+        self.epochs[entity_id] = epoch
+        self.search_text[entity_id] = json.dumps(item["context"]).lower()
+        insort(self.by_time, (epoch, entity_id))
+        insort(self.by_relevance, (relevance, entity_id))
+        self.by_region.setdefault(item.get("region"), set()).add(entity_id)
+    
+    def remove(self, entity_id: str) -> bool:
+        item = self.items.pop(entity_id, None)
+        if item is None:
+            return False
+        epoch = self.epochs.pop(entity_id)
+        self.search_text.pop(entity_id, None)
+        self.by_time.pop(bisect_left(self.by_time, (epoch, entity_id)))
+        self.by_relevance.pop(bisect_left(self.by_relevance, (item.get("relevance", 0), entity_id)))
+        members = self.by_region.get(item.get("region"))
+        if members is not None:
+            members.discard(entity_id)
+            if not members:
+                del self.by_region[item.get("region")]
+        return True
+    
+    def time_range(self, start: float, end: float) -> List[str]:
+        low = bisect_left(self.by_time, (start, ""))
+        high = bisect_right(self.by_time, (end, "\uffff"))
+        return [entity_id for _, entity_id in self.by_time[low:high]]
+    
+    def relevance_at_least(self, threshold: float) -> int:
+        """Position in by_relevance where relevance >= threshold starts."""
+        return bisect_left(self.by_relevance, (threshold, ""))
+    
+    def query(self, entity_id: Optional[str] = None, region: Optional[str] = None,
+              time_range: Optional[tuple] = None, relevance_threshold: float = 0.0,
+              limit: Optional[int] = None) -> List[str]:
+        """Entity ids matching every filter, highest relevance first.
+        
+        The most selective index drives the scan; remaining filters are checked
+        per candidate and the top results are picked with a heap.
+        """
+        relevance_start = self.relevance_at_least(relevance_threshold)
+        if entity_id is not None:
+            candidates: Iterable[str] = [entity_id] if entity_id in self.items else []
+        else:
+            options = [(len(self.by_relevance) - relevance_start, "relevance")]
+            if region is not None:
+                options.append((len(self.by_region.get(region, ())), "region"))
+            if time_range is not None:
+                low = bisect_left(self.by_time, (time_range[0], ""))
+                high = bisect_right(self.by_time, (time_range[1], "\uffff"))
+                options.append((high - low, "time"))
+            _, driver = min(options)
+            if driver == "relevance":
+                # Already in relevance order: walk down from the top and stop at limit
+                matches = []
+                for position in range(len(self.by_relevance) - 1, relevance_start - 1, -1):
+                    candidate = self.by_relevance[position][1]
+                    if self._matches(candidate, region, time_range, relevance_threshold):
+                        matches.append(candidate)
+                        if limit is not None and len(matches) >= limit:
+                            break
+                return matches
+            candidates = self.by_region.get(region, ()) if driver == "region" else self.time_range(*time_range)
+        
+        matches = [c for c in candidates if self._matches(c, region, time_range, relevance_threshold)]
+        relevance = lambda c: (self.items[c].get("relevance", 0), c)
+        if limit is not None:
+            return heapq.nlargest(limit, matches, key=relevance)
+        return sorted(matches, key=relevance, reverse=True)
+    
+    def _matches(self, entity_id: str, region: Optional[str], time_range: Optional[tuple],
+                 relevance_threshold: float) -> bool:
+        item = self.items[entity_id]
+        if region is not None and item.get("region") != region:
+            return False
+        if item.get("relevance", 0) < relevance_threshold:
+            return False
+        if time_range is not None and not (time_range[0] <= self.epochs[entity_id] <= time_range[1]):
+            return False
+        return True
+    
+    def search(self, q: str, limit: int) -> List[str]:
+        """Top-k entity ids by relevance whose context or id contains q."""
+        needle = q.lower()
+        matches = [
+            entity_id for entity_id, text in self.search_text.items()
+            if needle in text or needle in entity_id.lower()
+        ]
+        return heapq.nlargest(limit, matches, key=lambda c: (self.items[c].get("relevance", 0.5), c))
+
+class ContextStore:
+    """Contexts partitioned by tenant, so every lookup touches only the caller's data."""
+    
+    def __init__(self):
+        self.partitions: Dict[str, TenantPartition] = {}
+    
+    def put(self, tenant_id: str, entity_id: str, item: Dict[str, Any]):
+        self.partitions.setdefault(tenant_id, TenantPartition()).put(entity_id, item)
+    
+    def get(self, tenant_id: str, entity_id: str) -> Optional[Dict[str, Any]]:
+        partition = self.partitions.get(tenant_id)
+        return partition.items.get(entity_id) if partition else None
+    
+    def partition(self, tenant_id: str) -> TenantPartition:
+        # Unknown tenants get an empty, unregistered partition
+        return self.partitions.get(tenant_id) or TenantPartition()
+    
+    def __len__(self) -> int:
+        return sum(len(p.items) for p in self.partitions.values())
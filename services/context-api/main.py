@@ -1,11 +1,12 @@
 from fastapi import FastAPI, HTTPException, Query
 from pydantic import BaseModel
 import os
-import json
 from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional
 import logging
 
+from context_index import ContextStore, to_epoch
+
 app = FastAPI(title="Context API Gateway", version="1.0.0")
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -18,6 +19,7 @@ class ContextQuery(BaseModel):
     region: Optional[str] = None
     relevance_threshold: Optional[float] = 0.5
     tenant_id: str
+    limit: Optional[int] = None
 
 class ContextResponse(BaseModel):
     results: List[Dict[str, Any]]
@@ -53,6 +55,12 @@ context_data = {
     }
 }
 
+# Tenant-partitioned, indexed view of context_data
+context_store = ContextStore()
+for _key, _item in context_data.items():
+    _tenant_id, _entity_id = _key.split(":", 1)
+    context_store.put(_tenant_id, _entity_id, _item)
+
 @app.get("/health")
 async def health():
     return {"status": "healthy", "simulation_mode": SIMULATION_MODE}
@@ -60,7 +68,8 @@ async def health():
 @app.get("/metrics")
 async def metrics():
     return {
-        "cached_contexts": len(context_data),
+        "cached_contexts": len(context_store),
+        "tenants": len(context_store.partitions),
         "simulation_mode": SIMULATION_MODE,
         "avg_query_time_ms": 45
     }
@@ -74,36 +83,26 @@ async def query_context(query: ContextQuery):
         results = []
         relevance_scores = {}
         
-        # Filter context data based on query parameters
-        for key, context_item in context_data.items():
-            tenant_id, entity_id = key.split(":", 1)
-            
-            # Tenant isolation
-            if tenant_id != query.tenant_id:
-                continue
-            
-            # Entity filter
-            if query.entity_id and entity_id != query.entity_id:
-                continue
-            
-            # Region filter
-            if query.region and context_item.get("region") != query.region:
-                continue
-            
-            # Relevance threshold filter
-            if context_item.get("relevance", 0) < query.relevance_threshold:
-                continue
-            
-            # Time range filter
-            if query.time_range:
-                item_time = datetime.fromisoformat(context_item["last_updated"].replace('Z', '+00:00'))
-                start_time_filter = datetime.fromisoformat(query.time_range.get("start", "2024-01-01T00:00:00Z").replace('Z', '+00:00'))
-                end_time_filter = datetime.fromisoformat(query.time_range.get("end", "2024-12-31T23:59:59Z").replace('Z', '+00:00'))
-                
-                if not (start_time_filter <= item_time <= end_time_filter):
-                    continue
-            
-            # Add to results
+        # Only the caller's partition is consulted (tenant isolation by construction)
+        partition = context_store.partition(query.tenant_id)
+        
+        time_range = None
+        if query.time_range:
+            time_range = (
+                to_epoch(query.time_range.get("start", "2024-01-01T00:00:00Z")),
+                to_epoch(query.time_range.get("end", "2024-12-31T23:59:59Z"))
+            )
+        
+        matches = partition.query(
+            entity_id=query.entity_id,
+            region=query.region,
+            time_range=time_range,
+            relevance_threshold=query.relevance_threshold or 0.0,
+            limit=query.limit
+        )
+        
+        for entity_id in matches:
+            context_item = partition.items[entity_id]
             results.append({
                 "entity_id": entity_id,
                 "context": context_item["context"],
@@ -114,9 +113,6 @@ async def query_context(query: ContextQuery):
             
             relevance_scores[entity_id] = context_item.get("relevance", 0.5)
         
-        # Sort by relevance
-        results.sort(key=lambda x: x["relevance"], reverse=True)
-        
         query_time_ms = int((datetime.utcnow() - start_time).total_seconds() * 1000)
         
         logger.info(f"Context query returned {len(results)} results in {query_time_ms}ms")
@@ -135,13 +131,11 @@ async def query_context(query: ContextQuery):
 @app.get("/context/entity/{entity_id}")
 async def get_entity_context(entity_id: str, tenant_id: str):
     """Get context for specific entity"""
-    key = f"{tenant_id}:{entity_id}"
+    context_item = context_store.get(tenant_id, entity_id)
     
-    if key not in context_data:
+    if context_item is None:
         raise HTTPException(status_code=404, detail="Entity context not found")
     
-    context_item = context_data[key]
-    
     return {
         "entity_id": entity_id,
         "tenant_id": tenant_id,
@@ -160,28 +154,18 @@ async def search_context(
     limit: int = Query(10, description="Result limit")
 ):
     """Search context data"""
-    results = []
-    
-    # Simple text search in context data
-    for key, context_item in context_data.items():
-        tenant_id_key, entity_id = key.split(":", 1)
-        
-        if tenant_id_key != tenant_id:
-            continue
-        
-        # Search in context values
-        context_str = json.dumps(context_item["context"]).lower()
-        if q.lower() in context_str or q.lower() in entity_id.lower():
-            results.append({
-                "entity_id": entity_id,
-                "context": context_item["context"],
-                "relevance": context_item.get("relevance", 0.5),
-                "match_score": 0.8  # Mock match score
-            })
+    partition = context_store.partition(tenant_id)
     
-    # Sort by relevance and limit results
-    results.sort(key=lambda x: x["relevance"], reverse=True)
-    results = results[:limit]
+    # Substring match over precomputed text, top-k by relevance via a heap
+    results = []
+    for entity_id in partition.search(q, limit):
+        context_item = partition.items[entity_id]
+        results.append({
+            "entity_id": entity_id,
+            "context": context_item["context"],
+            "relevance": context_item.get("relevance", 0.5),
+            "match_score": 0.8  # Mock match score
+        })
     
     return {
         "query": q,
@@ -194,27 +178,15 @@ async def search_context(
 async def get_context_by_region(tenant_id: str):
     """Get context distribution by region"""
     region_stats = {}
+    partition = context_store.partition(tenant_id)
     
-    for key, context_item in context_data.items():
-        tenant_id_key, entity_id = key.split(":", 1)
-        
-        if tenant_id_key != tenant_id:
-            continue
-        
-        region = context_item.get("region", "unknown")
-        
-        if region not in region_stats:
-            region_stats[region] = {
-                "entity_count": 0,
-                "avg_relevance": 0,
-                "entities": []
-            }
-        
-        region_stats[region]["entity_count"] += 1
-        region_stats[region]["entities"].append(entity_id)
-        region_stats[region]["avg_relevance"] = (
-            region_stats[region]["avg_relevance"] + context_item.get("relevance", 0.5)
-        ) / region_stats[region]["entity_count"]
+    for region, entity_ids in partition.by_region.items():
+        entities = sorted(entity_ids)
+        region_stats[region or "unknown"] = {
+            "entity_count": len(entities),
+            "avg_relevance": sum(partition.items[e].get("relevance", 0.5) for e in entities) / len(entities),
+            "entities": entities
+        }
     
     return {
         "tenant_id": tenant_id,
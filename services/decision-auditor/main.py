@@ -13,6 +13,8 @@ from fastapi import FastAPI, HTTPException
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 import logging
+from state_hashing import StateHasher
+from pii_redaction import RedactionEngine
 from prometheus_client import Counter, Histogram, generate_latest
 
 # Metrics
@@ -32,6 +34,11 @@ audit_trail = {}
 state_snapshots = {}
 rollback_plans = {}
 
+# Secret-named fields are blanked wholesale; PII inside other values is masked by type
+audit_redaction = RedactionEngine(
+    sensitive_keys=['password', 'secret', 'token', 'key', 'credential', 'pii']
+)
+
 class SnapshotRequest(BaseModel):
     proposal_id: str
     snapshot_type: str  # 'pre', 'post'
@@ -59,25 +66,20 @@ def calculate_audit_hash(audit_entry: Dict[str, Any]) -> str:
     # Remove hash field if present to avoid circular reference
     entry_copy = audit_entry.copy()
     entry_copy.pop('audit_hash', None)
-    entry_str = json.dumps(entry_copy, sort_keys=True)
-    return hashlib.sha256(entry_str.encode()).hexdigest()
+    return StateHasher(entry_copy).hexdigest()
+
+def changed_state_keys(current: Dict[str, Any], target: Dict[str, Any]) -> List[str]:
+    """Top-level state keys whose subtree hash differs between two snapshots"""
+    current_hashes = current.get("key_hashes", {})
+    target_hashes = target.get("key_hashes", {})
+    return sorted(
+        key for key in set(current_hashes) | set(target_hashes)
+        if current_hashes.get(key) != target_hashes.get(key)
+    )
 
 def redact_sensitive_data(data: Dict[str, Any]) -> Dict[str, Any]:
     """Redact sensitive data from audit entries (P1)"""
-    sensitive_keys = ['password', 'secret', 'token', 'key', 'credential', 'pii']
-    
-    def redact_recursive(obj):
-        if isinstance(obj, dict):
-            return {
-                k: '<REDACTED>' if any(sens in k.lower() for sens in sensitive_keys)
-                else redact_recursive(v)
-                for k, v in obj.items()
-            }
-        elif isinstance(obj, list):
-            return [redact_recursive(item) for item in obj]
-        return obj
-    
-    return redact_recursive(data)
+    return audit_redaction.redact(data)
 
 @app.get("/audit/{proposal_id}")
 async def get_audit_trail(proposal_id: str):
@@ -111,8 +113,9 @@ async def store_snapshot(proposal_id: str, request: SnapshotRequest):
     # Generate snapshot ID
     snapshot_id = f"snap-{proposal_id}-{request.snapshot_type}-{datetime.utcnow().strftime('%Y%m%d%H%M%S')}"
     
-    # Calculate state hash
-    state_hash = hashlib.sha256(json.dumps(request.state_data, sort_keys=True).encode()).hexdigest()
+    # Calculate Merkle state hash; per-key digests let rollback plans diff snapshots without re-hashing
+    state_hasher = StateHasher(request.state_data)
+    state_hash = state_hasher.hexdigest()
     
     # Generate PQC signature
     snapshot_data = {
@@ -130,6 +133,7 @@ async def store_snapshot(proposal_id: str, request: SnapshotRequest):
     snapshot_record = {
         **snapshot_data,
         "state_data": request.state_data,  # Store full data for rollback
+        "key_hashes": state_hasher.digests,
         "pqc_signature": pqc_signature
     }
     
@@ -177,6 +181,13 @@ async def create_rollback_plan(request: RollbackRequest):
     
     target_snapshot = state_snapshots[target_snapshot_id]
     
+    # Latest snapshot for the proposal, diffed against the target per top-level key
+    latest_snapshot = max(
+        (snap for snap in state_snapshots.values() if snap["proposal_id"] == proposal_id),
+        key=lambda snap: snap["created_at"],
+        default=target_snapshot
+    )
+    
     # Generate rollback plan ID
     rollback_id = f"rollback-{proposal_id}-{datetime.utcnow().strftime('%Y%m%d%H%M%S')}"
     
@@ -197,7 +208,8 @@ async def create_rollback_plan(request: RollbackRequest):
                 "step": 3,
                 "action": "restore_target_state",
                 "description": f"Restore to snapshot {target_snapshot_id}",
-                "target_hash": target_snapshot["state_hash"]
+                "target_hash": target_snapshot["state_hash"],
+                "changed_keys": changed_state_keys(latest_snapshot, target_snapshot)
             },
             {
                 "step": 4,
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Compiled PII redaction for the Proposal Composer and Decision Auditor.
+
+PII patterns are compiled once, each on its own and all together into one
+alternation. The alternation finds the tokens (text between whitespace or
+JSON punctuation) holding a match in a single scan; only those tokens, or a
+short string as a whole, get one pass per pattern, in order, so where two
+matches overlap the earlier pattern wins exactly as with per-pattern passes
+over the whole string. Strings that cannot contain a match (no digit and no
+'@' for the default patterns) skip the regex entirely. Documents are walked
+once; dict keys naming sensitive fields can be redacted wholesale. Large text
+is redacted as a stream of chunks, holding back only the unfinished token at
+the end of each chunk.
+"""
+
+import re
+from typing import Dict, Any, Iterable, Iterator, Optional
+
+# Applied in order: email wins over the digit patterns it contains, and phone
+# and SSN over an IP they overlap ("1.2.3.555-12-3456" keeps its SSN redacted)
+PII_PATTERNS = {
+    'email': r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b',
+    'phone': r'\b\d{3}-\d{3}-\d{4}\b',
+    'ssn': r'\b\d{3}-\d{2}-\d{4}\b',
+    'ip': r'\b\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}\b'
+}
+# Every default pattern needs a digit or an '@'
+PII_PREFILTER = r'[0-9@]'
+
+# Text up to this long gets its per-pattern passes over the whole string
+SHORT_TEXT_CHARS = 256
+# Longest unfinished token held back between stream chunks
+MAX_CARRY_CHARS = 64 * 1024
+# Characters no pattern can match across: whitespace and JSON punctuation
+_TOKEN_BREAKS = " \n\t\r\f\v\",:;{}[]()<>'"
+_token_break = re.compile("[" + re.escape(_TOKEN_BREAKS) + "]").search
+
+def _compile_alternation(patterns: Dict[str, str]) -> re.Pattern:
+    """Any of the patterns. A word boundary shared by every pattern is
+    hoisted in front of the alternation, which lets the regex engine skip
+    ahead to candidate positions instead of trying every branch everywhere."""
+    lead = r'\b' if all(pattern.startswith(r'\b') for pattern in patterns.values()) else ''
+    return re.compile(lead + "(?:" + "|".join(pattern[len(lead):] for pattern in patterns.values()) + ")")
+
+class RedactionEngine:
+    """Compiled value patterns plus optional sensitive key names.
+    
+    Custom patterns get no prefilter unless one is given: a prefilter must
+    match every string that any of the patterns can match. No pattern may
+    match across a _TOKEN_BREAKS character, since text is redacted token by
+    token.
+    """
+    
+    def __init__(self, patterns: Optional[Dict[str, str]] = None, prefilter: Optional[str] = None,
+                 sensitive_keys: Iterable[str] = (), key_placeholder: str = '<REDACTED>'):
+        if patterns is None:
+            patterns, prefilter = PII_PATTERNS, prefilter or PII_PREFILTER
+        self.pattern = _compile_alternation(patterns) if patterns else None
+        self.passes = [
+            (re.compile(pattern), f'<REDACTED_{name.upper()}>')
+            for name, pattern in patterns.items()
+        ]
+        self.prefilter = re.compile(prefilter).search if prefilter else None
+        sensitive_keys = [key.lower() for key in sensitive_keys]
+        self.key_pattern = re.compile("|".join(map(re.escape, sensitive_keys))) if sensitive_keys else None
+        self.key_placeholder = key_placeholder
+        self._sensitive_key_cache: Dict[str, bool] = {}
+    
+    def redact_text(self, text: str) -> str:
+        if self.pattern is None or (self.prefilter is not None and not self.prefilter(text)):
+            return text
+        match = self.pattern.search(text)
+        if match is None:
+            return text
+        if len(text) <= SHORT_TEXT_CHARS:
+            for pattern, placeholder in self.passes:
+                text = pattern.sub(placeholder, text)
+            return text
+        parts, position = [], 0
+        while match is not None:
+            # The token holding the match: from the last break before it to the next one
+            start = max(position, max(text.rfind(char, position, match.start()) for char in _TOKEN_BREAKS) + 1)
+            end = _token_break(text, match.end())
+            end = end.start() if end else len(text)
+            token = text[start:end]
+            for pattern, placeholder in self.passes:
+                token = pattern.sub(placeholder, token)
+            parts += (text[position:start], token)
+            position = end
+            match = self.pattern.search(text, position)
+        parts.append(text[position:])
+        return "".join(parts)
+    
+    def is_sensitive_key(self, key: Any) -> bool:
+        if self.key_pattern is None or not isinstance(key, str):
+            return False
+        sensitive = self._sensitive_key_cache.get(key)
+        if sensitive is None:
+            sensitive = self.key_pattern.search(key.lower()) is not None
+            if len(self._sensitive_key_cache) < 10000:
+                self._sensitive_key_cache[key] = sensitive
+        return sensitive
+    
+    def redact(self, obj: Any) -> Any:
+        """Redacted copy of a JSON-like document."""
+        if isinstance(obj, str):
+            return self.redact_text(obj)
+        if isinstance(obj, dict):
+            return {
+                k: self.key_placeholder if self.is_sensitive_key(k) else self.redact(v)
+                for k, v in obj.items()
+            }
+        if isinstance(obj, list):
+            return [self.redact(item) for item in obj]
+        return obj
+    
+    def redact_stream(self, chunks: Iterable[str], max_carry: int = MAX_CARRY_CHARS) -> Iterator[str]:
+        """Redact text arriving in chunks."""
+        stream = StreamRedactor(self, max_carry)
+        for chunk in chunks:
+            text = stream.feed(chunk)
+            if text:
+                yield text
+        text = stream.flush()
+        if text:
+            yield text
+
+class StreamRedactor:
+    """Incremental redaction of one text stream.
+    
+    Matches never span a break character, so everything up to the last break
+    of the buffered text is redacted and released; the rest is carried into
+    the next chunk.
+    """
+    
+    def __init__(self, engine: RedactionEngine, max_carry: int = MAX_CARRY_CHARS):
+        self.engine = engine
+        self.max_carry = max_carry
+        self.carry = ""
+    
+    def feed(self, chunk: str) -> str:
+        text = self.carry + chunk
+        cut = max(text.rfind(char) for char in _TOKEN_BREAKS) + 1
+        if len(text) - cut > self.max_carry:
+            # No break in sight: give up on the token and flush everything
+            cut = len(text)
+        self.carry = text[cut:]
+        return self.engine.redact_text(text[:cut]) if cut else ""
+    
+    def flush(self) -> str:
+        text, self.carry = self.carry, ""
+        return self.engine.redact_text(text) if text else ""
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Incremental state hashing for the Decision Coordinator and Decision Auditor.
+
+A state dict is hashed as a one-level Merkle tree: each top-level key gets the
+SHA-256 of its value's canonical JSON (sorted keys, compact separators), and
+the state hash is the SHA-256 of the sorted (key, subtree digest) pairs. A
+change to one key re-hashes only that subtree, and a subtree digest computed
+once (a proposal's manifest at submission) is reused wherever the same value
+appears in a later state. Canonical JSON is streamed into the digest in
+bounded chunks instead of being built as one string.
+"""
+
+import gc
+import json
+import hashlib
+from typing import Dict, Any, Callable, Iterable, Optional
+
+CHUNK_BYTES = 64 * 1024
+# Values with at most this many nested elements are encoded in one json call;
+# larger containers are encoded in runs of about this many elements
+SMALL_NODE_ELEMENTS = 4096
+
+_encode = json.JSONEncoder(sort_keys=True, separators=(",", ":")).encode
+
+def _key_text(key: Any) -> str:
+    """Dict key as json renders it (non-string keys are stringified)."""
+    return key if isinstance(key, str) else _encode(key).strip('"')
+
+def _element_count(node: Any, limit: int = SMALL_NODE_ELEMENTS) -> int:
+    """Approximate nested element count of a value, stopping once it exceeds limit.
+    
+    Walks one level at a time with gc.get_referents, so the count runs in C
+    and costs a fraction of encoding the value; a Python-level walk costs as
+    much as json.dumps itself. The count only decides how the value is split
+    into json calls, never what is written.
+    """
+    count = 0
+    level = [node]
+    while level and count <= limit:
+        level = gc.get_referents(*level)
+        count += len(level)
+    return count
+
+class _ChunkWriter:
+    def __init__(self, sink: Callable[[bytes], Any], chunk_bytes: int):
+        self.sink = sink
+        self.chunk_bytes = chunk_bytes
+        self.parts = []
+        self.size = 0
+    
+    def write(self, text: str):
+        self.parts.append(text)
+        self.size += len(text)
+        if self.size >= self.chunk_bytes:
+            self.flush()
+    
+    def flush(self):
+        if self.parts:
+            self.sink("".join(self.parts).encode())
+            self.parts = []
+            self.size = 0
+
+def _stream(node: Any, write: Callable[[str], None]):
+    if not isinstance(node, (dict, list, tuple)) or (
+            len(node) <= SMALL_NODE_ELEMENTS and _element_count(node) <= SMALL_NODE_ELEMENTS):
+        write(_encode(node))
+        return
+    if isinstance(node, dict):
+        # A run of sorted items re-encodes in the same order as part of the whole dict
+        items, opening, closing = sorted(node.items()), "{", "}"
+        encode_run = lambda run: _encode(dict(run))[1:-1]
+    else:
+        items, opening, closing = node, "[", "]"
+        encode_run = lambda run: _encode(run)[1:-1]
+    write(opening)
+    # Runs double while they fit in SMALL_NODE_ELEMENTS and halve when they
+    # don't; a single element that doesn't fit is walked on its own
+    start, length, separator = 0, 1, ""
+    while start < len(items):
+        run = items[start:start + length]
+        if _element_count(run) <= SMALL_NODE_ELEMENTS:
+            write(separator + encode_run(run))
+            start += len(run)
+            length *= 2
+        elif length > 1:
+            length //= 2
+            continue
+        else:
+            if isinstance(node, dict):
+                key, value = run[0]
+                write(separator + _encode(_key_text(key)) + ":")
+            else:
+                value = run[0]
+                write(separator)
+            _stream(value, write)
+            start += 1
+        separator = ","
+    write(closing)
+
+def stream_canonical(value: Any, sink: Callable[[bytes], Any], chunk_bytes: int = CHUNK_BYTES):
+    """Feed the canonical JSON of value to sink in chunks of roughly chunk_bytes.
+    
+    Small values are encoded in a single json call and large containers in
+    runs of elements, walking any element too large for a run, so the output
+    is byte-identical to json.dumps(value, sort_keys=True, separators=(",", ":")).
+    """
+    writer = _ChunkWriter(sink, chunk_bytes)
+    _stream(value, writer.write)
+    writer.flush()
+
+def subtree_digest(value: Any) -> str:
+    """SHA-256 hex digest of value's canonical JSON."""
+    digest = hashlib.sha256()
+    stream_canonical(value, digest.update)
+    return digest.hexdigest()
+
+def combine_digests(digests: Dict[str, str]) -> str:
+    """Merkle root over top-level key digests."""
+    root = hashlib.sha256()
+    for key in sorted(digests):
+        root.update(f"{_encode(key)}:{digests[key]};".encode())
+    return root.hexdigest()
+
+def state_hash(state: Dict[str, Any], known_digests: Optional[Dict[str, str]] = None) -> str:
+    """Merkle state hash; known_digests supplies precomputed subtree digests by key."""
+    known_digests = known_digests or {}
+    return combine_digests({
+        _key_text(key): known_digests.get(key) or subtree_digest(value)
+        for key, value in state.items()
+    })
+
+class StateHasher:
+    """Per-key subtree digests for a state that changes a few keys at a time."""
+    
+    def __init__(self, state: Optional[Dict[str, Any]] = None):
+        self.digests: Dict[str, str] = {}
+        self.subtrees_hashed = 0
+        self._root: Optional[str] = None
+        if state:
+            self.update(state)
+    
+    def update(self, changes: Dict[str, Any], known_digests: Optional[Dict[str, str]] = None) -> "StateHasher":
+        """Re-hash only the changed keys."""
+        known_digests = known_digests or {}
+        for key, value in changes.items():
+            digest = known_digests.get(key)
+            if digest is None:
+                digest = subtree_digest(value)
+                self.subtrees_hashed += 1
+            self.digests[_key_text(key)] = digest
+        self._root = None
+        return self
+    
+    def remove(self, keys: Iterable[str]) -> "StateHasher":
+        for key in keys:
+            self.digests.pop(_key_text(key), None)
+        self._root = None
+        return self
+    
+    def derive(self, changes: Dict[str, Any], removed: Iterable[str] = ()) -> "StateHasher":
+        """A new hasher for this state with some keys changed or removed."""
+        derived = StateHasher()
+        derived.digests = dict(self.digests)
+        return derived.remove(removed).update(changes)
+    
+    def digest(self, key: str) -> Optional[str]:
+        return self.digests.get(_key_text(key))
+    
+    def hexdigest(self) -> str:
+        if self._root is None:
+            self._root = combine_digests(self.digests)
+        return self._root
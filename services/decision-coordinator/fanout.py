@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Concurrent proposal fan-out for the Decision Coordinator.
+
+New proposals are pushed to the Federated Negotiator and the Confidence
+Scorer at the same time over one pooled HTTP client. Transport errors and
+5xx responses are retried with exponential backoff; 4xx responses are final.
+"""
+
+import asyncio
+import logging
+from typing import Dict, Any, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+class ProposalFanout:
+    def __init__(self, negotiator_url: str, scorer_url: str, timeout_seconds: float = 5.0,
+                 retries: int = 3, backoff_seconds: float = 0.2, max_connections: int = 100):
+        self.negotiator_url = negotiator_url.rstrip("/")
+        self.scorer_url = scorer_url.rstrip("/")
+        self.timeout_seconds = timeout_seconds
+        self.retries = retries
+        self.backoff_seconds = backoff_seconds
+        self.max_connections = max_connections
+        self._client: Optional[httpx.AsyncClient] = None
+    
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout_seconds,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections
+                )
+            )
+        return self._client
+    
+    async def post(self, url: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """POST with retries; returns {"ok", "status_code", "body"|"error", "attempts"}."""
+        error = None
+        for attempt in range(1, self.retries + 2):
+            try:
+                response = await self.client.post(url, json=payload)
+                if response.status_code < 500:
+                    return {
+                        "ok": response.is_success,
+                        "status_code": response.status_code,
+                        "body": response.json() if response.content else None,
+                        "attempts": attempt
+                    }
+                error = f"HTTP {response.status_code}"
+            except (httpx.TransportError, ValueError) as e:
+                error = f"{type(e).__name__}: {e}"
+            if attempt <= self.retries:
+                await asyncio.sleep(self.backoff_seconds * 2 ** (attempt - 1))
+        return {"ok": False, "error": error, "attempts": self.retries + 1}
+    
+    async def broadcast(self, proposal: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        """Send the proposal to negotiator and scorer concurrently."""
+        negotiator, scorer = await asyncio.gather(
+            self.post(f"{self.negotiator_url}/negotiate", {"proposal_id": proposal["proposal_id"]}),
+            self.post(f"{self.scorer_url}/score", {
+                "proposal_id": proposal["proposal_id"],
+                "manifest": proposal["manifest"]
+            })
+        )
+        return {"negotiator": negotiator, "scorer": scorer}
+    
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
@@ -5,8 +5,7 @@ Orchestrates proposals, votes, consensus, and enactment
 """
 
 import os
-import json
-import hashlib
+import uuid
 from datetime import datetime, timedelta
 from typing import Dict, Any, Optional
 from fastapi import FastAPI, HTTPException, Depends, Header
@@ -17,6 +16,10 @@ import logging
 from prometheus_client import Counter, Histogram, generate_latest
 import jwt
 
+from proposal_store import ProposalStore
+from fanout import ProposalFanout
+from state_hashing import state_hash, subtree_digest
+
 # Metrics
 PROPOSALS_TOTAL = Counter('decision_proposals_total', 'Total decision proposals')
 ENACTMENTS_TOTAL = Counter('decision_enactments_total', 'Total decision enactments')
@@ -29,10 +32,19 @@ logger = logging.getLogger(__name__)
 # Configuration
 SIMULATION_MODE = os.getenv('SIMULATION_MODE', 'true').lower() == 'true'
 DECISION_TIMEOUT_MS = int(os.getenv('PHASE_I4_DECISION_TIMEOUT_MS', '30000'))
+# Shared WAL-mode SQLite file; point every replica at the same path
+COORDINATOR_DB_PATH = os.getenv('COORDINATOR_DB_PATH', '/tmp/decision-coordinator/proposals.db')
+NEGOTIATOR_URL = os.getenv('NEGOTIATOR_URL', 'http://localhost:9203')
+CONFIDENCE_SCORER_URL = os.getenv('CONFIDENCE_SCORER_URL', 'http://localhost:9204')
+FANOUT_TIMEOUT_SECONDS = float(os.getenv('FANOUT_TIMEOUT_SECONDS', '5'))
+FANOUT_RETRIES = int(os.getenv('FANOUT_RETRIES', '3'))
+
+FANOUT_FAILURES = Counter('decision_fanout_failures_total', 'Proposal fan-out deliveries that failed after retries', ['target'])
 
-# In-memory storage for simulation
-proposals_db = {}
-negotiations_db = {}
+# Persistent, indexed proposal and negotiation storage
+# SQLite calls can block on the busy timeout, so handlers run them via asyncio.to_thread
+proposal_store = ProposalStore(COORDINATOR_DB_PATH)
+fanout = ProposalFanout(NEGOTIATOR_URL, CONFIDENCE_SCORER_URL, timeout_seconds=FANOUT_TIMEOUT_SECONDS, retries=FANOUT_RETRIES)
 
 class ProposalRequest(BaseModel):
     tenant_id: str
@@ -69,10 +81,9 @@ def validate_manifest_signature(manifest: Dict[str, Any]) -> bool:
     # In production: actual cosign validation
     return True
 
-def calculate_state_hash(state_data: Dict[str, Any]) -> str:
-    """Calculate SHA256 hash of state data (P7)"""
-    state_str = json.dumps(state_data, sort_keys=True)
-    return hashlib.sha256(state_str.encode()).hexdigest()
+def calculate_state_hash(state_data: Dict[str, Any], known_digests: Optional[Dict[str, str]] = None) -> str:
+    """Calculate Merkle SHA256 hash of state data (P7); known_digests skips re-hashing unchanged subtrees"""
+    return state_hash(state_data, known_digests)
 
 @app.post("/proposals")
 async def submit_proposal(
@@ -90,12 +101,14 @@ async def submit_proposal(
     if not validate_manifest_signature(request.manifest):
         raise HTTPException(status_code=400, detail="Invalid manifest signature")
     
-    # Generate proposal ID
-    proposal_id = f"prop-{datetime.utcnow().strftime('%Y%m%d%H%M%S')}-{len(proposals_db)}"
+    # Generate proposal ID (unique across replicas)
+    proposal_id = f"prop-{datetime.utcnow().strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:12]}"
     
     # Calculate pre-state snapshot (P7)
+    # The manifest digest is kept so enactment does not re-serialize the manifest
+    manifest_hash = subtree_digest(request.manifest)
     pre_state = {"timestamp": datetime.utcnow().isoformat(), "manifest": request.manifest}
-    pre_state_hash = calculate_state_hash(pre_state)
+    pre_state_hash = calculate_state_hash(pre_state, {"manifest": manifest_hash})
     
     # Determine impact level
     impact_level = request.manifest.get('impact_level', 'medium')
@@ -108,12 +121,13 @@ async def submit_proposal(
         "metadata": request.metadata,
         "status": "submitted",
         "impact_level": impact_level,
+        "manifest_hash": manifest_hash,
         "pre_state_hash": pre_state_hash,
         "created_at": datetime.utcnow().isoformat(),
         "updated_at": datetime.utcnow().isoformat()
     }
     
-    proposals_db[proposal_id] = proposal
+    await asyncio.to_thread(proposal_store.insert_proposal, proposal)
     
     # Broadcast to negotiator and confidence scorer (async)
     asyncio.create_task(broadcast_proposal(proposal_id))
@@ -132,26 +146,24 @@ async def get_proposal_status(
     token_data: Dict = Depends(verify_jwt_token)
 ):
     """Get proposal status and vote results"""
-    if proposal_id not in proposals_db:
+    proposal = await asyncio.to_thread(proposal_store.get_proposal, proposal_id)
+    if proposal is None:
         raise HTTPException(status_code=404, detail="Proposal not found")
     
-    proposal = proposals_db[proposal_id]
-    
     # Check tenant access (P5)
     if proposal['tenant_id'] != token_data.get('tenant_id'):
         raise HTTPException(status_code=403, detail="Tenant access denied")
     
-    # Get negotiation status if exists
+    # Get negotiation status if exists (indexed by proposal)
     negotiation_status = None
-    for neg_id, neg in negotiations_db.items():
-        if neg['proposal_id'] == proposal_id:
-            negotiation_status = {
-                "negotiation_id": neg_id,
-                "status": neg['status'],
-                "consensus_reached": neg.get('consensus_reached', False),
-                "consensus_ratio": neg.get('consensus_ratio', 0.0)
-            }
-            break
+    neg = await asyncio.to_thread(proposal_store.negotiation_for_proposal, proposal_id)
+    if neg is not None:
+        negotiation_status = {
+            "negotiation_id": neg['negotiation_id'],
+            "status": neg['status'],
+            "consensus_reached": neg.get('consensus_reached', False),
+            "consensus_ratio": neg.get('consensus_ratio', 0.0)
+        }
     
     return {
         "proposal": proposal,
@@ -167,11 +179,10 @@ async def enact_proposal(
     """Enact proposal outcome (requires approver if impact high)"""
     ENACTMENTS_TOTAL.inc()
     
-    if proposal_id not in proposals_db:
+    proposal = await asyncio.to_thread(proposal_store.get_proposal, proposal_id)
+    if proposal is None:
         raise HTTPException(status_code=404, detail="Proposal not found")
     
-    proposal = proposals_db[proposal_id]
-    
     # Check tenant access (P5)
     if proposal['tenant_id'] != token_data.get('tenant_id'):
         raise HTTPException(status_code=403, detail="Tenant access denied")
@@ -191,16 +202,20 @@ async def enact_proposal(
         "approver": request.approver_id,
         "justification": request.justification
     }
-    post_state_hash = calculate_state_hash(post_state)
+    post_state_hash = calculate_state_hash(post_state, {"enacted_manifest": proposal.get('manifest_hash')})
     
     # Update proposal status
-    proposal['status'] = 'enacted'
-    proposal['post_state_hash'] = post_state_hash
-    proposal['updated_at'] = datetime.utcnow().isoformat()
+    changes = {
+        'status': 'enacted',
+        'post_state_hash': post_state_hash,
+        'updated_at': datetime.utcnow().isoformat()
+    }
     
     if request.approver_id:
-        proposal['approver_id'] = request.approver_id
-        proposal['justification'] = request.justification
+        changes['approver_id'] = request.approver_id
+        changes['justification'] = request.justification
+    
+    await asyncio.to_thread(proposal_store.update_proposal, proposal_id, changes)
     
     logger.info(f"Proposal {proposal_id} enacted by {request.approver_id}")
     
@@ -212,29 +227,88 @@ async def enact_proposal(
     }
 
 async def broadcast_proposal(proposal_id: str):
-    """Broadcast proposal to negotiator and confidence scorer"""
+    """Broadcast proposal to negotiator and confidence scorer concurrently"""
     try:
-        # Simulate broadcasting to other services
+        proposal = await asyncio.to_thread(proposal_store.get_proposal, proposal_id)
         logger.info(f"Broadcasting proposal {proposal_id} to negotiator and scorer")
         
-        # Create negotiation entry
-        negotiation_id = f"neg-{proposal_id}"
-        negotiations_db[negotiation_id] = {
-            "negotiation_id": negotiation_id,
-            "proposal_id": proposal_id,
-            "regions": ["us-east-1", "eu-west-1", "ap-southeast-1"],
-            "quorum_threshold": 0.6,
-            "status": "active",
-            "consensus_reached": False,
-            "started_at": datetime.utcnow().isoformat()
-        }
+        if SIMULATION_MODE:
+            # Simulated negotiator: record a local negotiation entry
+            negotiation_id = f"neg-{proposal_id}"
+            await asyncio.to_thread(proposal_store.upsert_negotiation, {
+                "negotiation_id": negotiation_id,
+                "proposal_id": proposal_id,
+                "regions": ["us-east-1", "eu-west-1", "ap-southeast-1"],
+                "quorum_threshold": 0.6,
+                "status": "active",
+                "consensus_reached": False,
+                "started_at": datetime.utcnow().isoformat()
+            })
+            return
+        
+        results = await fanout.broadcast(proposal)
+        
+        changes = {"fanout": {
+            target: {"ok": result["ok"], "attempts": result["attempts"], "error": result.get("error")}
+            for target, result in results.items()
+        }}
+        
+        negotiator = results["negotiator"]
+        if negotiator["ok"] and negotiator.get("body"):
+            body = negotiator["body"]
+            await asyncio.to_thread(proposal_store.upsert_negotiation, {
+                "negotiation_id": body["negotiation_id"],
+                "proposal_id": proposal_id,
+                "regions": body.get("regions", []),
+                "quorum_threshold": body.get("quorum_threshold"),
+                "status": body.get("status", "active"),
+                "consensus_reached": False,
+                "started_at": datetime.utcnow().isoformat(),
+                "timeout_at": body.get("timeout_at")
+            })
         
-        # Simulate async processing
-        await asyncio.sleep(1)
+        scorer = results["scorer"]
+        if scorer["ok"] and scorer.get("body"):
+            changes["score"] = scorer["body"].get("score")
+        
+        for target, result in results.items():
+            if not result["ok"]:
+                FANOUT_FAILURES.labels(target=target).inc()
+                logger.warning(f"Fan-out of {proposal_id} to {target} failed: {result.get('error') or result.get('status_code')}")
+        
+        await asyncio.to_thread(proposal_store.update_proposal, proposal_id, changes)
         
     except Exception as e:
         logger.error(f"Error broadcasting proposal {proposal_id}: {e}")
 
+@app.get("/proposals")
+async def list_proposals(
+    tenant_id: str,
+    status: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    limit: int = 100,
+    token_data: Dict = Depends(verify_jwt_token)
+):
+    """List a tenant's proposals, newest first, filtered by status and submission time"""
+    if tenant_id != token_data.get('tenant_id'):
+        raise HTTPException(status_code=403, detail="Tenant access denied")
+    
+    proposals = await asyncio.to_thread(
+        proposal_store.list_proposals, tenant_id, status=status, since=since, until=until, limit=min(limit, 1000)
+    )
+    
+    return {
+        "tenant_id": tenant_id,
+        "proposals": proposals,
+        "count": len(proposals)
+    }
+
+@app.on_event("shutdown")
+async def shutdown():
+    await fanout.close()
+    proposal_store.close()
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint (P4)"""
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Persistent proposal and negotiation store for the Decision Coordinator.
+
+SQLite in WAL mode so several coordinator replicas sharing the database file
+can read while one writes. Each proposal is stored as a JSON document with
+its tenant, status, impact level and submission time lifted into indexed
+columns for listing and filtering.
+"""
+
+import os
+import json
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+class ProposalStore:
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        # One connection per thread, reused across requests
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        self.init_database()
+    
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Each connection stays on its thread; close() may run on another
+            conn = sqlite3.connect(self.db_path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+    
+    def init_database(self):
+        conn = self._connection()
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS proposals (
+                proposal_id TEXT PRIMARY KEY,
+                tenant_id TEXT NOT NULL,
+                status TEXT NOT NULL,
+                impact_level TEXT,
+                created_at TEXT NOT NULL,
+                updated_at TEXT NOT NULL,
+                document TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_proposals_tenant_created ON proposals (tenant_id, created_at);
+            CREATE INDEX IF NOT EXISTS idx_proposals_tenant_status_created ON proposals (tenant_id, status, created_at);
+            CREATE INDEX IF NOT EXISTS idx_proposals_status_created ON proposals (status, created_at);
+            CREATE TABLE IF NOT EXISTS negotiations (
+                negotiation_id TEXT PRIMARY KEY,
+                proposal_id TEXT NOT NULL,
+                status TEXT NOT NULL,
+                document TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_negotiations_proposal ON negotiations (proposal_id);
+        """)
+    
+    def insert_proposal(self, proposal: Dict[str, Any]):
+        self._connection().execute(
+            "INSERT INTO proposals (proposal_id, tenant_id, status, impact_level, created_at, updated_at, document) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                proposal["proposal_id"], proposal["tenant_id"], proposal["status"], proposal.get("impact_level"),
+                proposal["created_at"], proposal["updated_at"], json.dumps(proposal)
+            )
+        )
+    
+    def get_proposal(self, proposal_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connection().execute(
+            "SELECT document FROM proposals WHERE proposal_id = ?", (proposal_id,)
+        ).fetchone()
+        return json.loads(row["document"]) if row else None
+    
+    def update_proposal(self, proposal_id: str, changes: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Merge changes into the stored document atomically; returns the updated proposal."""
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT document FROM proposals WHERE proposal_id = ?", (proposal_id,)).fetchone()
+            if row is None:
+                conn.execute("ROLLBACK")
+                return None
+            proposal = json.loads(row["document"])
+            proposal.update(changes)
+            proposal["updated_at"] = changes.get("updated_at", datetime.utcnow().isoformat())
+            conn.execute(
+                "UPDATE proposals SET status = ?, impact_level = ?, updated_at = ?, document = ? WHERE proposal_id = ?",
+                (proposal["status"], proposal.get("impact_level"), proposal["updated_at"], json.dumps(proposal), proposal_id)
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return proposal
+    
+    def list_proposals(self, tenant_id: str, status: Optional[str] = None, since: Optional[str] = None,
+                       until: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        """Newest first; served from the (tenant, status, created_at) indexes."""
+        clauses, params = ["tenant_id = ?"], [tenant_id]
+        if status:
+            clauses.append("status = ?")
+            params.append(status)
+        if since:
+            clauses.append("created_at >= ?")
+            params.append(since)
+        if until:
+            clauses.append("created_at <= ?")
+            params.append(until)
+        params.append(limit)
+        rows = self._connection().execute(
+            f"SELECT document FROM proposals WHERE {' AND '.join(clauses)} ORDER BY created_at DESC LIMIT ?",
+            params
+        ).fetchall()
+        return [json.loads(row["document"]) for row in rows]
+    
+    def upsert_negotiation(self, negotiation: Dict[str, Any]):
+        self._connection().execute(
+            "INSERT OR REPLACE INTO negotiations (negotiation_id, proposal_id, status, document) VALUES (?, ?, ?, ?)",
+            (negotiation["negotiation_id"], negotiation["proposal_id"], negotiation["status"], json.dumps(negotiation))
+        )
+    
+    def negotiation_for_proposal(self, proposal_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connection().execute(
+            "SELECT document FROM negotiations WHERE proposal_id = ? LIMIT 1", (proposal_id,)
+        ).fetchone()
+        return json.loads(row["document"]) if row else None
+    
+    def close(self):
+        # Worker threads' connections are closed too; they reconnect if used again
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
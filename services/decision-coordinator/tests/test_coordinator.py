@@ -1,13 +1,32 @@
 #!/usr/bin/env python3
 """Tests for Decision Coordinator"""
 
+import os
 import pytest
 import json
+import tempfile
+
+# Keep the import-time store off the shared default database path
+os.environ.setdefault("COORDINATOR_DB_PATH", os.path.join(tempfile.mkdtemp(prefix="coordinator-tests-"), "proposals.db"))
+
+import main
+import state_hashing
 from fastapi.testclient import TestClient
 from main import app
+from proposal_store import ProposalStore
+from state_hashing import StateHasher, state_hash, stream_canonical
 
 client = TestClient(app)
 
+@pytest.fixture(autouse=True)
+def db_path(tmp_path, monkeypatch):
+    """Give each test its own proposal database"""
+    path = str(tmp_path / "proposals.db")
+    store = ProposalStore(path)
+    monkeypatch.setattr(main, "proposal_store", store)
+    yield path
+    store.close()
+
 def test_health_endpoint():
     """Test health check endpoint"""
     response = client.get("/health")
@@ -105,5 +124,65 @@ def test_high_impact_requires_approver():
     assert response.status_code == 400
     assert "approver" in response.json()["detail"].lower()
 
+def test_list_proposals_by_status():
+    """Test listing a tenant's proposals filtered by status"""
+    headers = {"Authorization": "Bearer sim-token"}
+    proposal_data = {
+        "tenant_id": "sim-tenant",
+        "manifest": {"action": "test", "impact_level": "low"},
+        "metadata": {}
+    }
+    proposal_id = client.post("/proposals", json=proposal_data, headers=headers).json()["proposal_id"]
+    client.post(f"/proposals/{proposal_id}/enact", json={"approver_id": "a", "justification": "j"}, headers=headers)
+    
+    response = client.get("/proposals", params={"tenant_id": "sim-tenant", "status": "enacted"}, headers=headers)
+    assert response.status_code == 200
+    proposals = response.json()["proposals"]
+    assert proposal_id in [p["proposal_id"] for p in proposals]
+    assert all(p["status"] == "enacted" for p in proposals)
+    
+    response = client.get("/proposals", params={"tenant_id": "other-tenant"}, headers=headers)
+    assert response.status_code == 403
+
+def test_proposals_survive_restart(db_path):
+    """Test that a second store on the same database sees submitted proposals"""
+    headers = {"Authorization": "Bearer sim-token"}
+    proposal_data = {"tenant_id": "sim-tenant", "manifest": {"action": "test"}, "metadata": {}}
+    proposal_id = client.post("/proposals", json=proposal_data, headers=headers).json()["proposal_id"]
+    
+    replica = ProposalStore(db_path)
+    stored = replica.get_proposal(proposal_id)
+    replica.close()
+    assert stored is not None
+    assert stored["tenant_id"] == "sim-tenant"
+
+def test_state_hash_matches_full_rehash():
+    """Test that incremental and streamed state hashes match a full canonical re-hash"""
+    manifest = {"action": "scale", "parameters": {"items": [{"id": i, "tags": {"n": str(i)}} for i in range(2000)]}}
+    
+    chunks = []
+    stream_canonical(manifest, chunks.append, chunk_bytes=1024)
+    assert b"".join(chunks) == json.dumps(manifest, sort_keys=True, separators=(",", ":")).encode()
+    
+    pre_state = {"timestamp": "t0", "manifest": manifest}
+    hasher = StateHasher(pre_state)
+    assert hasher.hexdigest() == state_hash(pre_state)
+    
+    post = hasher.derive({"timestamp": "t1", "approver": "a"})
+    assert post.subtrees_hashed == 2
+    assert post.hexdigest() == state_hash({"timestamp": "t1", "manifest": manifest, "approver": "a"})
+    assert post.hexdigest() != hasher.hexdigest()
+
+def test_auditor_state_hashing_copy_in_sync():
+    """Test that decision-auditor's copy of state_hashing.py has not drifted from this one.
+    
+    Each service image is built from its own directory, so modules both
+    services need are copied rather than shared; the auditor's copies of
+    state_hashing.py and pii_redaction.py are checked here and in the
+    proposal-composer tests."""
+    auditor_copy = os.path.join(os.path.dirname(__file__), "..", "..", "decision-auditor", "state_hashing.py")
+    with open(state_hashing.__file__) as ours, open(auditor_copy) as theirs:
+        assert ours.read() == theirs.read()
+
 if __name__ == "__main__":
     pytest.main([__file__])
\ No newline at end of file
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Consensus engine for the Federated Negotiator.
+
+Votes are indexed by negotiation id and folded into running weighted
+approve/reject/abstain totals as they arrive. A negotiation is decided as soon
+as no combination of outstanding regional votes could change the outcome:
+approved when the approve ratio clears the quorum even if every outstanding
+region rejects, failed when it cannot clear the quorum even if every
+outstanding region approves. Outstanding regions are assumed to vote with
+their expected weight (1.0 unless configured per region), so a vote never
+counts for more than that weight and only the negotiation's regions vote.
+"""
+
+from typing import Dict, Any, List, Optional
+
+class VoteTally:
+    """Running weighted totals for one negotiation."""
+    
+    def __init__(self, negotiation_id: str, regions: List[str], quorum_threshold: float,
+                 region_weights: Optional[Dict[str, float]] = None):
+        self.negotiation_id = negotiation_id
+        self.regions = list(regions)
+        self.quorum_threshold = quorum_threshold
+        self.expected_weights = {region: (region_weights or {}).get(region, 1.0) for region in self.regions}
+        self.votes: Dict[str, Dict[str, Any]] = {}
+        self.totals = {"approve": 0.0, "reject": 0.0, "abstain": 0.0}
+        self.counts = {"approve": 0, "reject": 0, "abstain": 0}
+        self.outstanding_weight = sum(self.expected_weights.values())
+    
+    def expected_weight(self, region: str) -> float:
+        return self.expected_weights.get(region, 1.0)
+    
+    def record(self, vote: Dict[str, Any]) -> Dict[str, Any]:
+        """Add a vote, replacing any earlier vote from the same region.
+        
+        Raises ValueError for a region outside the negotiation; the weight is
+        clamped to [0, expected weight] so one vote cannot outweigh the
+        region it speaks for. Returns the vote as recorded.
+        """
+        region = vote["region"]
+        if region not in self.expected_weights:
+            raise ValueError(f"Region {region} is not part of negotiation {self.negotiation_id}")
+        expected = self.expected_weights[region]
+        weight = vote.get("weight")
+        weight = expected if weight is None else min(max(float(weight), 0.0), expected)
+        vote = {**vote, "weight": weight}
+        previous = self.votes.get(region)
+        if previous is not None:
+            self._adjust(previous, -1)
+        else:
+            self.outstanding_weight -= expected
+        self.votes[region] = vote
+        self._adjust(vote, 1)
+        return vote
+    
+    def _adjust(self, vote: Dict[str, Any], sign: int):
+        choice = vote["vote"] if vote["vote"] in self.totals else "abstain"
+        self.totals[choice] += sign * vote["weight"]
+        self.counts[choice] += sign
+    
+    @property
+    def cast_weight(self) -> float:
+        return self.totals["approve"] + self.totals["reject"] + self.totals["abstain"]
+    
+    @property
+    def pending_regions(self) -> List[str]:
+        return [region for region in self.regions if region not in self.votes]
+    
+    def consensus_ratio(self) -> float:
+        cast = self.cast_weight
+        return self.totals["approve"] / cast if cast > 0 else 0.0
+    
+    def outcome(self) -> Optional[bool]:
+        """True/False once consensus is mathematically decided, None while it is open."""
+        approve, cast = self.totals["approve"], self.cast_weight
+        outstanding = max(self.outstanding_weight, 0.0)
+        if not self.pending_regions:
+            return cast > 0 and approve / cast >= self.quorum_threshold
+        if cast + outstanding <= 0:
+            return None
+        # Every outstanding region rejects and the quorum still holds
+        if approve / (cast + outstanding) >= self.quorum_threshold:
+            return True
+        # Every outstanding region approves and the quorum is still missed
+        if (approve + outstanding) / (cast + outstanding) < self.quorum_threshold:
+            return False
+        return None
+    
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "consensus_ratio": round(self.consensus_ratio(), 3),
+            "consensus_reached": self.outcome() is True,
+            "decided": self.outcome() is not None,
+            "total_votes": len(self.votes),
+            "approve_votes": self.counts["approve"],
+            "reject_votes": self.counts["reject"],
+            "abstain_votes": self.counts["abstain"],
+            "approve_weight": round(self.totals["approve"], 6),
+            "reject_weight": round(self.totals["reject"], 6),
+            "outstanding_weight": round(max(self.outstanding_weight, 0.0), 6),
+            "pending_regions": self.pending_regions
+        }
+
+class ConsensusEngine:
+    """Vote tallies indexed by negotiation id."""
+    
+    def __init__(self):
+        self.tallies: Dict[str, VoteTally] = {}
+    
+    def open(self, negotiation_id: str, regions: List[str], quorum_threshold: float,
+             region_weights: Optional[Dict[str, float]] = None) -> VoteTally:
+        tally = VoteTally(negotiation_id, regions, quorum_threshold, region_weights)
+        self.tallies[negotiation_id] = tally
+        return tally
+    
+    def tally(self, negotiation_id: str) -> Optional[VoteTally]:
+        return self.tallies.get(negotiation_id)
+    
+    def record(self, negotiation_id: str, vote: Dict[str, Any]) -> VoteTally:
+        tally = self.tallies[negotiation_id]
+        tally.record(vote)
+        return tally
+    
+    def votes(self, negotiation_id: str) -> List[Dict[str, Any]]:
+        tally = self.tallies.get(negotiation_id)
+        return list(tally.votes.values()) if tally else []
+    
+    def __len__(self) -> int:
+        return sum(len(tally.votes) for tally in self.tallies.values())
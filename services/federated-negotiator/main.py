@@ -15,10 +15,13 @@ from pydantic import BaseModel
 import logging
 from prometheus_client import Counter, Histogram, generate_latest
 
+from consensus_engine import ConsensusEngine
+
 # Metrics
 NEGOTIATIONS_TOTAL = Counter('negotiations_total', 'Total negotiations started')
 CONSENSUS_REACHED = Counter('consensus_reached_total', 'Total consensus reached')
 NEGOTIATION_DURATION = Histogram('negotiation_duration_seconds', 'Negotiation duration')
+EARLY_RESOLUTIONS = Counter('negotiations_resolved_early_total', 'Negotiations decided before every region voted')
 
 app = FastAPI(title="Federated Negotiator", version="1.0.0")
 logging.basicConfig(level=logging.INFO)
@@ -30,13 +33,17 @@ DECISION_TIMEOUT_MS = int(os.getenv('PHASE_I4_DECISION_TIMEOUT_MS', '30000'))
 
 # In-memory storage for simulation
 negotiations_db = {}
-regional_votes_db = {}
+# Votes indexed by negotiation id with running weighted tallies
+consensus_engine = ConsensusEngine()
+# Outstanding regional vote tasks per negotiation, cancelled once consensus is decided
+voting_tasks: Dict[str, set] = {}
 
 class NegotiationRequest(BaseModel):
     proposal_id: str
     regions: Optional[List[str]] = ["us-east-1", "eu-west-1", "ap-southeast-1"]
     quorum_threshold: Optional[float] = 0.6
     timeout_minutes: Optional[int] = 30
+    region_weights: Optional[Dict[str, float]] = None
 
 class RegionalVote(BaseModel):
     region: str
@@ -68,45 +75,85 @@ def simulate_regional_agent_vote(region: str, proposal_id: str) -> Dict[str, Any
         "response_time": prefs["latency"]
     }
 
+def finalize_negotiation(negotiation_id: str, status: Optional[str] = None):
+    """Record the tally's outcome on the negotiation and cancel outstanding regional votes"""
+    negotiation = negotiations_db[negotiation_id]
+    tally = consensus_engine.tally(negotiation_id)
+    
+    consensus_result = tally.summary()
+    negotiation["consensus_reached"] = consensus_result["consensus_reached"]
+    negotiation["consensus_ratio"] = consensus_result["consensus_ratio"]
+    
+    if status is None:
+        status = "consensus_reached" if consensus_result["consensus_reached"] else "consensus_failed"
+    negotiation["status"] = status
+    
+    pending_regions = tally.pending_regions
+    negotiation["resolved_early"] = bool(pending_regions) and status != "timeout"
+    if negotiation["resolved_early"]:
+        EARLY_RESOLUTIONS.inc()
+    negotiation["pending_regions"] = pending_regions
+    
+    completed_at = datetime.utcnow()
+    negotiation["completed_at"] = completed_at.isoformat()
+    duration = (completed_at - datetime.fromisoformat(negotiation["started_at"])).total_seconds()
+    negotiation["decision_latency_ms"] = int(duration * 1000)
+    NEGOTIATION_DURATION.observe(duration)
+    
+    if status == "consensus_reached":
+        CONSENSUS_REACHED.inc()
+    
+    for task in voting_tasks.pop(negotiation_id, ()):
+        task.cancel()
+
 async def conduct_regional_voting(negotiation_id: str, regions: List[str]):
-    """Conduct voting across regions with simulated latency"""
+    """Conduct voting across regions, resolving as soon as the quorum outcome is decided"""
     try:
         negotiation = negotiations_db[negotiation_id]
         proposal_id = negotiation["proposal_id"]
+        tally = consensus_engine.tally(negotiation_id)
         
         # Simulate parallel voting with different latencies
-        vote_tasks = []
-        for region in regions:
-            vote_tasks.append(simulate_regional_vote_async(region, proposal_id, negotiation_id))
+        pending = {
+            asyncio.create_task(simulate_regional_vote_async(region, proposal_id, negotiation_id))
+            for region in regions
+        }
+        voting_tasks[negotiation_id] = pending
         
-        # Wait for all votes with timeout
-        timeout_seconds = DECISION_TIMEOUT_MS / 1000
-        try:
-            await asyncio.wait_for(asyncio.gather(*vote_tasks), timeout=timeout_seconds)
-        except asyncio.TimeoutError:
-            logger.warning(f"Negotiation {negotiation_id} timed out")
-            negotiation["status"] = "timeout"
-            return
+        # Consume votes as they land until the outcome is decided or the deadline passes
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + DECISION_TIMEOUT_MS / 1000
+        while pending and negotiation["status"] == "active" and tally.outcome() is None:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if not task.cancelled() and task.exception() is not None:
+                    logger.error(f"Regional vote failed for negotiation {negotiation_id}: {task.exception()}")
         
-        # Calculate consensus
-        consensus_result = calculate_consensus(negotiation_id)
-        negotiation["consensus_reached"] = consensus_result["consensus_reached"]
-        negotiation["consensus_ratio"] = consensus_result["consensus_ratio"]
+        if negotiation["status"] != "active":
+            # Already resolved by a submitted vote
+            return
         
-        if consensus_result["consensus_reached"]:
-            negotiation["status"] = "consensus_reached"
-            CONSENSUS_REACHED.inc()
-            logger.info(f"Consensus reached for negotiation {negotiation_id}")
-        else:
-            negotiation["status"] = "consensus_failed"
-            logger.info(f"Consensus failed for negotiation {negotiation_id}")
+        if tally.outcome() is None:
+            # Keep the votes already received; report the partial tally
+            logger.warning(f"Negotiation {negotiation_id} timed out")
+            finalize_negotiation(negotiation_id, status="timeout")
+            return
         
-        negotiation["completed_at"] = datetime.utcnow().isoformat()
+        finalize_negotiation(negotiation_id)
+        logger.info(
+            f"Negotiation {negotiation_id} {negotiation['status']} with "
+            f"{len(tally.votes)}/{len(regions)} regional votes"
+        )
         
     except Exception as e:
         logger.error(f"Error in regional voting for {negotiation_id}: {e}")
         negotiation["status"] = "error"
         negotiation["error"] = str(e)
+        for task in voting_tasks.pop(negotiation_id, ()):
+            task.cancel()
 
 async def simulate_regional_vote_async(region: str, proposal_id: str, negotiation_id: str):
     """Simulate async regional vote with latency"""
@@ -115,44 +162,22 @@ async def simulate_regional_vote_async(region: str, proposal_id: str, negotiatio
     # Simulate network latency
     await asyncio.sleep(vote_result["response_time"])
     
-    # Store vote
-    vote_id = f"{negotiation_id}-{region}"
-    regional_votes_db[vote_id] = {
+    # Store vote in the negotiation's index; the tally updates in O(1)
+    tally = consensus_engine.tally(negotiation_id)
+    tally.record({
         "negotiation_id": negotiation_id,
         "region": region,
         "vote": vote_result["vote"],
-        "weight": vote_result["weight"],
+        "weight": tally.expected_weight(region),
         "reasoning": vote_result["reasoning"],
         "timestamp": datetime.utcnow().isoformat()
-    }
+    })
     
     logger.info(f"Region {region} voted {vote_result['vote']} for negotiation {negotiation_id}")
 
 def calculate_consensus(negotiation_id: str) -> Dict[str, Any]:
-    """Calculate consensus based on regional votes"""
-    negotiation = negotiations_db[negotiation_id]
-    threshold = negotiation["quorum_threshold"]
-    
-    # Get all votes for this negotiation
-    votes = [v for v in regional_votes_db.values() if v["negotiation_id"] == negotiation_id]
-    
-    if not votes:
-        return {"consensus_ratio": 0.0, "consensus_reached": False}
-    
-    # Calculate weighted consensus
-    total_weight = sum(v["weight"] for v in votes)
-    approve_weight = sum(v["weight"] for v in votes if v["vote"] == "approve")
-    
-    consensus_ratio = approve_weight / total_weight if total_weight > 0 else 0.0
-    consensus_reached = consensus_ratio >= threshold
-    
-    return {
-        "consensus_ratio": round(consensus_ratio, 3),
-        "consensus_reached": consensus_reached,
-        "total_votes": len(votes),
-        "approve_votes": len([v for v in votes if v["vote"] == "approve"]),
-        "reject_votes": len([v for v in votes if v["vote"] == "reject"])
-    }
+    """Current weighted consensus from the negotiation's running tally"""
+    return consensus_engine.tally(negotiation_id).summary()
 
 @app.post("/negotiate")
 async def start_negotiation(
@@ -182,6 +207,7 @@ async def start_negotiation(
     }
     
     negotiations_db[negotiation_id] = negotiation
+    consensus_engine.open(negotiation_id, request.regions, request.quorum_threshold, request.region_weights)
     
     # Start background voting process
     background_tasks.add_task(conduct_regional_voting, negotiation_id, request.regions)
@@ -205,12 +231,10 @@ async def get_negotiation_status(negotiation_id: str):
     negotiation = negotiations_db[negotiation_id]
     
     # Get votes for this negotiation
-    votes = [v for v in regional_votes_db.values() if v["negotiation_id"] == negotiation_id]
+    votes = consensus_engine.votes(negotiation_id)
     
-    # Calculate current consensus if active
-    consensus_info = {}
-    if negotiation["status"] in ["active", "consensus_reached", "consensus_failed"]:
-        consensus_info = calculate_consensus(negotiation_id)
+    # Current consensus from the running tally
+    consensus_info = calculate_consensus(negotiation_id)
     
     return {
         "negotiation": negotiation,
@@ -234,29 +258,25 @@ async def submit_regional_vote(
     
     negotiation = negotiations_db[negotiation_id]
     
+    if vote.region not in negotiation["regions"]:
+        raise HTTPException(status_code=400, detail=f"Region {vote.region} is not part of this negotiation")
+    
     if negotiation["status"] != "active":
         raise HTTPException(status_code=400, detail="Negotiation not active")
     
-    # Store vote
-    vote_id = f"{negotiation_id}-{vote.region}"
-    regional_votes_db[vote_id] = {
+    # Store vote; its weight is capped at the region's expected weight
+    tally = consensus_engine.record(negotiation_id, {
         "negotiation_id": negotiation_id,
         "region": vote.region,
         "vote": vote.vote,
         "weight": vote.weight,
         "reasoning": vote.reasoning,
         "timestamp": datetime.utcnow().isoformat()
-    }
+    })
     
-    # Check if all regions have voted
-    votes = [v for v in regional_votes_db.values() if v["negotiation_id"] == negotiation_id]
-    if len(votes) >= len(negotiation["regions"]):
-        # Calculate final consensus
-        consensus_result = calculate_consensus(negotiation_id)
-        negotiation["consensus_reached"] = consensus_result["consensus_reached"]
-        negotiation["consensus_ratio"] = consensus_result["consensus_ratio"]
-        negotiation["status"] = "consensus_reached" if consensus_result["consensus_reached"] else "consensus_failed"
-        negotiation["completed_at"] = datetime.utcnow().isoformat()
+    # Resolve once the outcome is decided, even if regions are still outstanding
+    if tally.outcome() is not None:
+        finalize_negotiation(negotiation_id)
     
     return {"status": "vote_recorded", "negotiation_status": negotiation["status"]}
 
@@ -4,7 +4,9 @@
 import pytest
 import asyncio
 from fastapi.testclient import TestClient
+import main
 from main import app
+from consensus_engine import VoteTally
 
 client = TestClient(app)
 
@@ -74,44 +76,122 @@ def test_submit_regional_vote():
     data = response.json()
     assert data["status"] == "vote_recorded"
 
-def test_consensus_calculation():
+def scripted_regional_votes(votes):
+    """Deterministic stand-in for simulate_regional_agent_vote: region -> (vote, response time)"""
+    def simulate(region, proposal_id):
+        choice, response_time = votes[region]
+        return {"vote": choice, "weight": 1.0, "reasoning": "scripted", "response_time": response_time}
+    return simulate
+
+def test_consensus_calculation(monkeypatch):
     """Test consensus calculation with multiple votes"""
-    # Start negotiation
+    monkeypatch.setattr(main, "simulate_regional_agent_vote", scripted_regional_votes({
+        "us-east-1": ("approve", 0.0),
+        "eu-west-1": ("reject", 0.01)
+    }))
+    
+    # Start negotiation; the regional votes are collected before the response returns
     negotiation_data = {
         "proposal_id": "prop-test-004",
         "regions": ["us-east-1", "eu-west-1"],
-        "quorum_threshold": 0.5
+        "quorum_threshold": 0.6
     }
     
     start_response = client.post("/negotiate", json=negotiation_data)
     negotiation_id = start_response.json()["negotiation_id"]
     
-    # Submit approving vote
-    vote1_data = {
-        "region": "us-east-1",
-        "vote": "approve",
-        "weight": 1.0
-    }
-    client.post(f"/negotiate/{negotiation_id}/vote", json=vote1_data)
-    
-    # Submit rejecting vote
-    vote2_data = {
-        "region": "eu-west-1", 
-        "vote": "reject",
-        "weight": 1.0
-    }
-    client.post(f"/negotiate/{negotiation_id}/vote", json=vote2_data)
-    
-    # Check final status
+    # One approve then one reject: 0.5 < 0.6 once both regions have voted
     response = client.get(f"/negotiate/{negotiation_id}/status")
     data = response.json()
     assert data["consensus_info"]["consensus_ratio"] == 0.5
-    assert data["negotiation"]["status"] in ["consensus_reached", "consensus_failed"]
+    assert data["negotiation"]["status"] == "consensus_failed"
+    assert data["negotiation"]["resolved_early"] == False
+    assert data["progress"]["votes_received"] == 2
+    
+    # Votes after the decision are refused
+    vote_data = {"region": "us-east-1", "vote": "approve", "weight": 1.0}
+    response = client.post(f"/negotiate/{negotiation_id}/vote", json=vote_data)
+    assert response.status_code == 400
+
+def test_consensus_resolves_early(monkeypatch):
+    """Test negotiation resolves once outstanding regions cannot change the outcome"""
+    monkeypatch.setattr(main, "simulate_regional_agent_vote", scripted_regional_votes({
+        "us-east-1": ("approve", 0.0),
+        "eu-west-1": ("reject", 0.05)
+    }))
+    
+    negotiation_data = {
+        "proposal_id": "prop-test-005",
+        "regions": ["us-east-1", "eu-west-1"],
+        "quorum_threshold": 0.5
+    }
+    
+    start_response = client.post("/negotiate", json=negotiation_data)
+    negotiation_id = start_response.json()["negotiation_id"]
+    
+    # 1 approve out of at most 2 already meets 0.5, so eu-west-1 is not waited for
+    data = client.get(f"/negotiate/{negotiation_id}/status").json()
+    assert data["negotiation"]["status"] == "consensus_reached"
+    assert data["negotiation"]["resolved_early"] == True
+    assert data["negotiation"]["pending_regions"] == ["eu-west-1"]
+    assert data["consensus_info"]["consensus_ratio"] == 1.0
+
+def test_vote_from_unknown_region_rejected():
+    """Test votes from regions outside the negotiation are refused"""
+    start_response = client.post("/negotiate", json={"proposal_id": "prop-test-006", "regions": ["us-east-1"]})
+    negotiation_id = start_response.json()["negotiation_id"]
+    
+    vote_data = {"region": "mars-north-1", "vote": "approve", "weight": 100.0}
+    response = client.post(f"/negotiate/{negotiation_id}/vote", json=vote_data)
+    assert response.status_code == 400
+    assert "mars-north-1" in response.json()["detail"]
 
 def test_negotiation_not_found():
     """Test getting status for non-existent negotiation"""
     response = client.get("/negotiate/non-existent/status")
     assert response.status_code == 404
 
+def _vote(region, choice, weight=1.0):
+    return {"region": region, "vote": choice, "weight": weight}
+
+def test_tally_decides_approval_before_all_regions_vote():
+    """Approval is decided once outstanding rejects cannot break the quorum"""
+    tally = VoteTally("neg-early", ["a", "b", "c"], 0.6)
+    tally.record(_vote("a", "approve"))
+    assert tally.outcome() is None
+    tally.record(_vote("b", "approve"))
+    # 2 / 3 >= 0.6 even if "c" rejects
+    assert tally.outcome() is True
+    assert tally.pending_regions == ["c"]
+
+def test_tally_decides_failure_before_all_regions_vote():
+    """Failure is decided once outstanding approvals cannot reach the quorum"""
+    tally = VoteTally("neg-fail", ["a", "b", "c", "d"], 0.8)
+    tally.record(_vote("a", "reject"))
+    assert tally.outcome() is False
+
+def test_tally_uses_region_weights_and_replaces_votes():
+    """Weighted outstanding regions keep the outcome open; revotes replace earlier votes"""
+    tally = VoteTally("neg-weighted", ["a", "b"], 0.6, region_weights={"b": 3.0})
+    tally.record(_vote("a", "approve"))
+    assert tally.outcome() is None
+    tally.record(_vote("a", "reject"))
+    assert tally.summary()["approve_votes"] == 0
+    assert tally.summary()["reject_votes"] == 1
+    tally.record(_vote("b", "approve", 3.0))
+    assert tally.outcome() is True
+    assert tally.summary()["consensus_ratio"] == 0.75
+
+def test_tally_caps_vote_weight_and_rejects_unknown_regions():
+    """A vote counts for at most its region's expected weight"""
+    tally = VoteTally("neg-capped", ["a", "b", "c"], 0.6)
+    recorded = tally.record(_vote("a", "approve", 100.0))
+    assert recorded["weight"] == 1.0
+    # 1 / 3 approve is not decided either way
+    assert tally.outcome() is None
+    with pytest.raises(ValueError):
+        tally.record(_vote("z", "approve"))
+    assert tally.summary()["total_votes"] == 1
+
 if __name__ == "__main__":
     pytest.main([__file__])
\ No newline at end of file
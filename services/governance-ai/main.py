@@ -7,19 +7,27 @@ import os
 import json
 import time
 import uuid
-import re
-from fastapi import FastAPI, HTTPException, Depends
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from fastapi import FastAPI, HTTPException, Depends, Request
+from fastapi.responses import StreamingResponse
 from fastapi.security import HTTPBearer
-from pydantic import BaseModel
-from typing import Dict, List, Optional
+from pydantic import BaseModel, ValidationError
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 import sqlite3
 
+from policy_engine import PolicyEngine, SECURITY_PATTERNS, POLICY_RULES, evaluate_document
+
 app = FastAPI(title="Governance AI", version="1.0.0")
 security = HTTPBearer()
 
 # Environment
 SIMULATION_MODE = os.getenv("SIMULATION_MODE", "true").lower() == "true"
 DB_PATH = os.getenv("GOVERNANCE_DB", "/tmp/governance.db")
+# Worker processes for /analyze/batch; 0 analyzes batches in the service process
+BATCH_WORKERS = int(os.getenv("GOVERNANCE_BATCH_WORKERS", str(os.cpu_count() or 2)))
+BATCH_MAX_DOCUMENTS = int(os.getenv("GOVERNANCE_BATCH_MAX_DOCUMENTS", "1000"))
 
 class AnalysisRequest(BaseModel):
     id: str
@@ -32,6 +40,9 @@ class PolicyViolation(BaseModel):
     description: str
     line: Optional[int] = None
 
+class BatchAnalysisRequest(BaseModel):
+    documents: List[AnalysisRequest]
+
 class AnalysisResult(BaseModel):
     id: str
     risk_score: float
@@ -58,48 +69,16 @@ class GovernanceAnalyzer:
     """AI-powered governance and policy analyzer"""
     
     def __init__(self):
-        self.security_patterns = [
-            (r'password\s*=\s*["\'][^"\']+["\']', 'HIGH', 'Hardcoded password detected'),
-            (r'api[_-]?key\s*=\s*["\'][^"\']+["\']', 'HIGH', 'Hardcoded API key detected'),
-            (r'secret\s*=\s*["\'][^"\']+["\']', 'MEDIUM', 'Hardcoded secret detected'),
-            (r'eval\s*\(', 'HIGH', 'Dangerous eval() function usage'),
-            (r'exec\s*\(', 'HIGH', 'Dangerous exec() function usage'),
-            (r'subprocess\.call', 'MEDIUM', 'System command execution'),
-            (r'os\.system', 'HIGH', 'Direct system command execution'),
-        ]
-        
-        self.policy_rules = [
-            ('P-1', 'Data Privacy', self._check_data_privacy),
-            ('P-2', 'Secrets & Signing', self._check_secrets),
-            ('P-3', 'Execution Safety', self._check_execution_safety),
-            ('P-4', 'Observability', self._check_observability),
-            ('P-5', 'Multi-Tenancy', self._check_multi_tenancy),
-            ('P-6', 'Performance Budget', self._check_performance),
-        ]
+        # Security patterns and P-1..P-6 rules, compiled into one evaluator
+        self.engine = PolicyEngine(SECURITY_PATTERNS, POLICY_RULES)
     
     def analyze(self, content: Dict) -> AnalysisResult:
         """Perform comprehensive governance analysis"""
-        violations = []
-        
-        # Convert content to string for pattern matching
-        content_str = json.dumps(content, indent=2)
-        
-        # Security pattern analysis
-        for pattern, severity, description in self.security_patterns:
-            matches = re.finditer(pattern, content_str, re.IGNORECASE)
-            for match in matches:
-                line_num = content_str[:match.start()].count('\n') + 1
-                violations.append(PolicyViolation(
-                    rule=f"SEC-{severity}",
-                    severity=severity,
-                    description=description,
-                    line=line_num
-                ))
-        
-        # Policy compliance checks
-        for rule_id, rule_name, check_func in self.policy_rules:
-            policy_violations = check_func(content)
-            violations.extend(policy_violations)
+        return self.build_result(self.engine.evaluate(content))
+    
+    def build_result(self, found: List[Dict[str, Any]]) -> AnalysisResult:
+        """Score and decide on violations reported by the policy engine"""
+        violations = [PolicyViolation(**violation) for violation in found]
         
         # Calculate risk score
         risk_score = self._calculate_risk_score(violations)
@@ -118,96 +97,6 @@ class GovernanceAnalyzer:
             approved=approved
         )
     
-    def _check_data_privacy(self, content: Dict) -> List[PolicyViolation]:
-        """Check P-1 Data Privacy compliance"""
-        violations = []
-        content_str = json.dumps(content).lower()
-        
-        pii_patterns = ['email', 'phone', 'ssn', 'credit_card', 'address']
-        for pattern in pii_patterns:
-            if pattern in content_str:
-                violations.append(PolicyViolation(
-                    rule="P-1",
-                    severity="MEDIUM",
-                    description=f"Potential PII detected: {pattern}"
-                ))
-        
-        return violations
-    
-    def _check_secrets(self, content: Dict) -> List[PolicyViolation]:
-        """Check P-2 Secrets & Signing compliance"""
-        violations = []
-        content_str = json.dumps(content)
-        
-        if 'signature' not in content_str:
-            violations.append(PolicyViolation(
-                rule="P-2",
-                severity="HIGH",
-                description="Missing required signature"
-            ))
-        
-        return violations
-    
-    def _check_execution_safety(self, content: Dict) -> List[PolicyViolation]:
-        """Check P-3 Execution Safety compliance"""
-        violations = []
-        
-        if content.get('auto_execute', False) and not content.get('dry_run_passed', False):
-            violations.append(PolicyViolation(
-                rule="P-3",
-                severity="HIGH",
-                description="Auto-execution without dry run validation"
-            ))
-        
-        return violations
-    
-    def _check_observability(self, content: Dict) -> List[PolicyViolation]:
-        """Check P-4 Observability compliance"""
-        violations = []
-        
-        required_endpoints = ['/health', '/metrics']
-        for endpoint in required_endpoints:
-            if endpoint not in json.dumps(content):
-                violations.append(PolicyViolation(
-                    rule="P-4",
-                    severity="LOW",
-                    description=f"Missing {endpoint} endpoint"
-                ))
-        
-        return violations
-    
-    def _check_multi_tenancy(self, content: Dict) -> List[PolicyViolation]:
-        """Check P-5 Multi-Tenancy compliance"""
-        violations = []
-        content_str = json.dumps(content)
-        
-        if 'tenant' not in content_str and 'jwt' not in content_str:
-            violations.append(PolicyViolation(
-                rule="P-5",
-                severity="MEDIUM",
-                description="No tenant isolation mechanism detected"
-            ))
-        
-        return violations
-    
-    def _check_performance(self, content: Dict) -> List[PolicyViolation]:
-        """Check P-6 Performance Budget compliance"""
-        violations = []
-        
-        # Check for potential performance issues
-        content_str = json.dumps(content).lower()
-        performance_risks = ['while true', 'infinite loop', 'recursive']
-        
-        for risk in performance_risks:
-            if risk in content_str:
-                violations.append(PolicyViolation(
-                    rule="P-6",
-                    severity="MEDIUM",
-                    description=f"Performance risk detected: {risk}"
-                ))
-        
-        return violations
-    
     def _calculate_risk_score(self, violations: List[PolicyViolation]) -> float:
         """Calculate overall risk score (0.0 - 1.0)"""
         if not violations:
@@ -243,12 +132,38 @@ class GovernanceAnalyzer:
 
 # Global analyzer instance
 analyzer = GovernanceAnalyzer()
+batch_pool: Optional[ProcessPoolExecutor] = None
+
+def get_batch_pool() -> Optional[ProcessPoolExecutor]:
+    global batch_pool
+    if batch_pool is None and BATCH_WORKERS > 0:
+        batch_pool = ProcessPoolExecutor(max_workers=BATCH_WORKERS)
+    return batch_pool
+
+def store_analyses(rows: List[Tuple]):
+    """Insert (id, content_id, risk_score, violations_count, approved, created_at) rows in one transaction"""
+    conn = sqlite3.connect(DB_PATH)
+    conn.executemany("""
+        INSERT INTO analyses (id, content_id, risk_score, violations_count, approved, created_at)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, rows)
+    conn.commit()
+    conn.close()
+
+def analysis_row(content_id: str, result: AnalysisResult) -> Tuple:
+    return (result.id, content_id, result.risk_score, len(result.violations),
+            int(result.approved), int(time.time()))
 
 @app.on_event("startup")
 async def startup():
     init_db()
     print(f"Governance AI started (SIMULATION_MODE={SIMULATION_MODE})")
 
+@app.on_event("shutdown")
+async def shutdown():
+    if batch_pool is not None:
+        batch_pool.shutdown(cancel_futures=True)
+
 @app.post("/analyze")
 async def analyze_content(request: AnalysisRequest, token: str = Depends(security)):
     """Analyze content for security and policy compliance"""
@@ -256,17 +171,117 @@ async def analyze_content(request: AnalysisRequest, token: str = Depends(securit
     result = analyzer.analyze(request.content)
     
     # Store analysis result
-    conn = sqlite3.connect(DB_PATH)
-    conn.execute("""
-        INSERT INTO analyses (id, content_id, risk_score, violations_count, approved, created_at)
-        VALUES (?, ?, ?, ?, ?, ?)
-    """, (result.id, request.id, result.risk_score, len(result.violations), 
-          int(result.approved), int(time.time())))
-    conn.commit()
-    conn.close()
+    store_analyses([analysis_row(request.id, result)])
     
     return result
 
+async def read_batch_documents(request: Request) -> AsyncIterator[Tuple[Optional[AnalysisRequest], Optional[str]]]:
+    """Documents from a JSON {"documents": [...]} body or an NDJSON stream.
+    
+    NDJSON lines are yielded as they arrive, so analysis starts before the
+    upload finishes; a malformed line yields an error for that position
+    instead of rejecting the batch.
+    """
+    if request.headers.get("content-type", "").split(";")[0].strip() != "application/x-ndjson":
+        try:
+            batch = BatchAnalysisRequest(**await request.json())
+        except (ValueError, TypeError, ValidationError) as e:
+            raise HTTPException(status_code=422, detail=f"Invalid batch: {e}")
+        for document in batch.documents:
+            yield document, None
+        return
+    
+    pending = b""
+    async for chunk in request.stream():
+        lines = (pending + chunk).split(b"\n")
+        pending = lines.pop()
+        for line in lines:
+            if line.strip():
+                yield parse_batch_line(line)
+    if pending.strip():
+        yield parse_batch_line(pending)
+
+def parse_batch_line(line: bytes) -> Tuple[Optional[AnalysisRequest], Optional[str]]:
+    try:
+        return AnalysisRequest(**json.loads(line)), None
+    except (ValueError, TypeError, ValidationError) as e:
+        return None, f"Invalid document: {e}"
+
+async def analyze_batch_document(index: int, document: AnalysisRequest) -> Dict[str, Any]:
+    global batch_pool
+    loop = asyncio.get_running_loop()
+    pool = get_batch_pool()
+    try:
+        if pool is None:
+            found = evaluate_document(document.content)
+        else:
+            found = await loop.run_in_executor(pool, evaluate_document, document.content)
+    except BrokenProcessPool:
+        # A worker died; the next batch starts a fresh pool
+        batch_pool = None
+        return {"index": index, "content_id": document.id, "error": "Analysis worker failed"}
+    except Exception as e:
+        return {"index": index, "content_id": document.id, "error": f"Analysis failed: {e}"}
+    return {"index": index, "content_id": document.id, "result": analyzer.build_result(found)}
+
+async def failed_batch_document(index: int, error: str) -> Dict[str, Any]:
+    return {"index": index, "content_id": None, "error": error}
+
+@app.post("/analyze/batch")
+async def analyze_batch(request: Request, token: str = Depends(security)):
+    """Analyze many documents across the worker pool.
+    
+    Accepts {"documents": [AnalysisRequest, ...]} or an NDJSON stream of
+    AnalysisRequest objects. Results are streamed back as NDJSON in
+    completion order, each tagged with its input index, followed by a
+    summary line; all results are stored with a single executemany.
+    """
+    started = time.time()
+    tasks = []
+    try:
+        async for document, error in read_batch_documents(request):
+            if len(tasks) >= BATCH_MAX_DOCUMENTS:
+                raise HTTPException(status_code=413, detail=f"Batch exceeds {BATCH_MAX_DOCUMENTS} documents")
+            index = len(tasks)
+            if document is None:
+                tasks.append(asyncio.ensure_future(failed_batch_document(index, error)))
+            else:
+                tasks.append(asyncio.ensure_future(analyze_batch_document(index, document)))
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+    
+    async def stream_results():
+        rows = []
+        approved = failed = 0
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                outcome = await next_done
+                result = outcome.pop("result", None)
+                if result is None:
+                    failed += 1
+                else:
+                    rows.append(analysis_row(outcome["content_id"], result))
+                    approved += int(result.approved)
+                    outcome.update(result.model_dump())
+                yield json.dumps(outcome) + "\n"
+            yield json.dumps({"summary": {
+                "documents": len(tasks),
+                "analyzed": len(rows),
+                "approved": approved,
+                "failed": failed,
+                "elapsed_ms": round((time.time() - started) * 1000, 1)
+            }}) + "\n"
+        finally:
+            # Client gone: drop queued work, keep what was already analyzed
+            for task in tasks:
+                task.cancel()
+            if rows:
+                store_analyses(rows)
+    
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
 @app.get("/models")
 async def list_models():
     """List available governance models"""
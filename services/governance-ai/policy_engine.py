@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Single-pass policy evaluation for Governance AI.
+
+Policies are declared as data: security patterns as (regex, severity,
+description) rows, P-policies as keyword and structural rules. Content is
+serialized once (compact JSON); every keyword rule is a substring check on
+that string, and structural rules (P-3 auto_execute without dry_run_passed)
+read the top-level fields in one pass. Security patterns are prefiltered by
+their literal prefix and the remaining ones run as one alternation over the
+indented serialization, which is only built when a pattern can match since
+reported line numbers refer to it. Results are identical to running each
+check separately.
+"""
+
+import re
+import json
+import bisect
+from typing import Dict, Any, List, Optional, Tuple
+
+# (pattern, severity, description); matched case-insensitively, reported per occurrence with its line
+SECURITY_PATTERNS = [
+    (r'password\s*=\s*["\'][^"\']+["\']', 'HIGH', 'Hardcoded password detected'),
+    (r'api[_-]?key\s*=\s*["\'][^"\']+["\']', 'HIGH', 'Hardcoded API key detected'),
+    (r'secret\s*=\s*["\'][^"\']+["\']', 'MEDIUM', 'Hardcoded secret detected'),
+    (r'eval\s*\(', 'HIGH', 'Dangerous eval() function usage'),
+    (r'exec\s*\(', 'HIGH', 'Dangerous exec() function usage'),
+    (r'subprocess\.call', 'MEDIUM', 'System command execution'),
+    (r'os\.system', 'HIGH', 'Direct system command execution'),
+]
+
+# Bound on compiled pattern subsets kept per engine
+MAX_CACHED_AUTOMATA = 256
+
+class KeywordRule:
+    """Violation per keyword found ("present"), per keyword missing ("absent"),
+    or once when none of the keywords is found ("absent_all")."""
+    
+    def __init__(self, rule: str, severity: str, description: str, keywords: List[str],
+                 trigger: str = "present", case_sensitive: bool = False):
+        self.rule = rule
+        self.severity = severity
+        self.description = description
+        self.keywords = keywords
+        self.trigger = trigger
+        self.case_sensitive = case_sensitive
+    
+    def violations(self, found: set) -> List[Dict[str, Any]]:
+        """found holds (keyword, case_sensitive) pairs seen in the content."""
+        present = [keyword for keyword in self.keywords if (keyword, self.case_sensitive) in found]
+        if self.trigger == "absent_all":
+            hits = [] if present else [None]
+        elif self.trigger == "absent":
+            hits = [keyword for keyword in self.keywords if keyword not in present]
+        else:
+            hits = present
+        return [
+            {"rule": self.rule, "severity": self.severity, "description": self.description.format(keyword=keyword)}
+            for keyword in hits
+        ]
+
+class StructuralRule:
+    """Violation when every field in when_set is truthy and none in unless_set is."""
+    
+    def __init__(self, rule: str, severity: str, description: str, when_set: List[str], unless_set: List[str] = ()):
+        self.rule = rule
+        self.severity = severity
+        self.description = description
+        self.when_set = list(when_set)
+        self.unless_set = list(unless_set)
+    
+    def violations(self, fields: Dict[str, bool]) -> List[Dict[str, Any]]:
+        if all(fields.get(key) for key in self.when_set) and not any(fields.get(key) for key in self.unless_set):
+            return [{"rule": self.rule, "severity": self.severity, "description": self.description}]
+        return []
+
+# P-policies in report order
+POLICY_RULES = [
+    KeywordRule("P-1", "MEDIUM", "Potential PII detected: {keyword}",
+                ['email', 'phone', 'ssn', 'credit_card', 'address']),
+    KeywordRule("P-2", "HIGH", "Missing required signature", ['signature'], trigger="absent", case_sensitive=True),
+    StructuralRule("P-3", "HIGH", "Auto-execution without dry run validation", ['auto_execute'], ['dry_run_passed']),
+    KeywordRule("P-4", "LOW", "Missing {keyword} endpoint", ['/health', '/metrics'], trigger="absent", case_sensitive=True),
+    KeywordRule("P-5", "MEDIUM", "No tenant isolation mechanism detected", ['tenant', 'jwt'],
+                trigger="absent_all", case_sensitive=True),
+    KeywordRule("P-6", "MEDIUM", "Performance risk detected: {keyword}",
+                ['while true', 'infinite loop', 'recursive']),
+]
+
+def literal_prefix(pattern: str) -> Optional[str]:
+    """Lower-cased literal text every match of pattern starts with, if any."""
+    prefix = []
+    index = 0
+    while index < len(pattern):
+        char = pattern[index]
+        if char.isalnum() or char == '_':
+            literal, width = char, 1
+        elif char == '\\' and index + 1 < len(pattern) and not pattern[index + 1].isalnum():
+            literal, width = pattern[index + 1], 2
+        else:
+            break
+        if index + width < len(pattern) and pattern[index + width] in '?*{':
+            # Optional character ends the guaranteed prefix
+            break
+        prefix.append(literal)
+        index += width
+    return "".join(prefix).lower() or None
+
+class PolicyEngine:
+    """Evaluates every rule against one compact serialization of the content.
+    
+    Keyword rules are substring checks on that serialization. Security
+    patterns whose literal prefix occurs in it are compiled into a single
+    alternation and scanned over the indented serialization, which is only
+    built when some pattern can match and is needed for line numbers.
+    """
+    
+    def __init__(self, security_patterns: List[Tuple[str, str, str]] = SECURITY_PATTERNS,
+                 policy_rules: List[Any] = POLICY_RULES):
+        self.security_patterns = security_patterns
+        self.policy_rules = policy_rules
+        self.detectors = [re.compile(pattern, re.IGNORECASE) for pattern, _, _ in security_patterns]
+        self.literals = [literal_prefix(pattern) for pattern, _, _ in security_patterns]
+        # (keyword as searched, keyword as declared, case sensitive)
+        self.keywords: List[Tuple[str, str, bool]] = []
+        for rule in policy_rules:
+            if isinstance(rule, KeywordRule):
+                for keyword in rule.keywords:
+                    entry = (keyword if rule.case_sensitive else keyword.lower(), keyword, rule.case_sensitive)
+                    if entry not in self.keywords:
+                        self.keywords.append(entry)
+        self.structural_fields = sorted({
+            key for rule in policy_rules if isinstance(rule, StructuralRule)
+            for key in rule.when_set + rule.unless_set
+        })
+        self._automata: Dict[Tuple[int, ...], re.Pattern] = {}
+    
+    def automaton(self, active: Tuple[int, ...]) -> re.Pattern:
+        """One alternation over the active security patterns.
+        
+        A lookahead on the possible first characters lets the regex engine
+        skip to candidate positions instead of trying every branch at every
+        offset.
+        """
+        automaton = self._automata.get(active)
+        if automaton is None:
+            alternatives = "|".join(f"(?:{self.security_patterns[index][0]})" for index in active)
+            literals = [self.literals[index] for index in active]
+            if all(literals):
+                first = sorted({char for literal in literals for char in (literal[0], literal[0].upper())})
+                alternatives = f"(?=[{re.escape(''.join(first))}])(?:{alternatives})"
+            automaton = re.compile(alternatives, re.IGNORECASE)
+            if len(self._automata) < MAX_CACHED_AUTOMATA:
+                self._automata[active] = automaton
+        return automaton
+    
+    def scan(self, text: str, active: Tuple[int, ...]) -> Dict[int, List[int]]:
+        """Start offsets per active security pattern, non-overlapping per
+        pattern as finditer would report them.
+        
+        Every position where the alternation matches is one where at least
+        one pattern starts, so each pattern is tried there with an anchored
+        match; patterns that overlap each other are all reported.
+        """
+        matches: Dict[int, List[int]] = {index: [] for index in active}
+        next_allowed = dict.fromkeys(active, 0)
+        automaton = self.automaton(active)
+        pos = 0
+        while True:
+            hit = automaton.search(text, pos)
+            if hit is None:
+                return matches
+            start = hit.start()
+            for index in active:
+                if start >= next_allowed[index]:
+                    match = self.detectors[index].match(text, start)
+                    if match:
+                        matches[index].append(start)
+                        next_allowed[index] = max(match.end(), start + 1)
+            pos = start + 1
+    
+    def evaluate(self, content: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Violations as plain dicts: security findings first, then P-policies in order."""
+        # ASCII (ensure_ascii), so lower-casing keeps offsets and matches IGNORECASE
+        compact = json.dumps(content)
+        lowered = compact.lower()
+        found = {
+            (declared, case_sensitive) for keyword, declared, case_sensitive in self.keywords
+            if keyword in (compact if case_sensitive else lowered)
+        }
+        active = tuple(
+            index for index, literal in enumerate(self.literals)
+            if literal is None or literal in lowered
+        )
+        
+        violations = []
+        if active:
+            # Line numbers refer to the indented layout
+            text = json.dumps(content, indent=2)
+            matches = self.scan(text, active)
+            newlines = None
+            for index in active:
+                _, severity, description = self.security_patterns[index]
+                if matches[index] and newlines is None:
+                    newlines = [match.start() for match in re.finditer('\n', text)]
+                for start in matches[index]:
+                    violations.append({
+                        "rule": f"SEC-{severity}",
+                        "severity": severity,
+                        "description": description,
+                        "line": bisect.bisect_left(newlines, start) + 1
+                    })
+        
+        fields = {key: bool(content.get(key, False)) for key in self.structural_fields}
+        for rule in self.policy_rules:
+            if isinstance(rule, StructuralRule):
+                violations.extend(rule.violations(fields))
+            else:
+                violations.extend(rule.violations(found))
+        return violations
+
+# Per-process engine for pool workers, compiled on first use
+_worker_engine: Optional[PolicyEngine] = None
+
+def evaluate_document(content: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Process-pool entry point: violations for one document."""
+    global _worker_engine
+    if _worker_engine is None:
+        _worker_engine = PolicyEngine()
+    return _worker_engine.evaluate(content)
@@ -0,0 +1,663 @@
+#!/usr/bin/env python3
+"""
+Persistent adjacency store for Graph Core.
+
+Nodes get dense integer ids. Edges live in two places:
+
+* a compacted CSR snapshot (``csr.bin``), memory-mapped read-only, holding
+  out- and in-adjacency as flat arrays indexed by node id;
+* an append log (``edges.log``) of fixed-size records for everything written
+  since the last compaction, mirrored in small in-memory delta lists.
+
+Reads merge the CSR slice with the node's delta list, so neighbor lookups are
+O(degree). Compaction folds the delta into a fresh CSR snapshot.
+"""
+
+import os
+import json
+import mmap
+import struct
+import logging
+import threading
+from array import array
+from typing import Dict, Any, List, Optional, Iterator, Tuple
+
+logger = logging.getLogger(__name__)
+
+CSR_MAGIC = b"GCSR"
+CSR_VERSION = 1
+CSR_HEADER = struct.Struct("<4sIqq")
+# src, dst, relation code, tenant code, confidence
+EDGE_RECORD = struct.Struct("<iiiif")
+
+class SymbolTable:
+    """Interns repeated strings (relations, tenants, types) to small integer codes."""
+    
+    def __init__(self, names: Optional[List[str]] = None):
+        self.names: List[str] = list(names or [])
+        self.codes: Dict[str, int] = {name: code for code, name in enumerate(self.names)}
+    
+    def code(self, name: str) -> Tuple[int, bool]:
+        """Return (code, created)."""
+        code = self.codes.get(name)
+        if code is not None:
+            return code, False
+        code = len(self.names)
+        self.names.append(name)
+        self.codes[name] = code
+        return code, True
+    
+    def lookup(self, name: str) -> Optional[int]:
+        return self.codes.get(name)
+    
+    def __getitem__(self, code: int) -> str:
+        return self.names[code]
+
+class CSRSnapshot:
+    """Read-only, memory-mapped compressed sparse row adjacency."""
+    
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.n_nodes = 0
+        self.n_edges = 0
+        self._file = None
+        self._mmap = None
+        self.out_offsets = self.in_offsets = ()
+        self.out_dst = self.out_rel = self.out_tenant = self.out_conf = ()
+        self.in_src = self.in_pos = ()
+        if path and os.path.exists(path) and os.path.getsize(path) >= CSR_HEADER.size:
+            self._map(path)
+    
+    def _map(self, path: str):
+        self._file = open(path, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, n_nodes, n_edges = CSR_HEADER.unpack_from(self._mmap, 0)
+        if magic != CSR_MAGIC or version != CSR_VERSION:
+            raise ValueError(f"Unsupported CSR snapshot: {path}")
+        self.n_nodes, self.n_edges = n_nodes, n_edges
+        
+        view = memoryview(self._mmap)
+        offset = CSR_HEADER.size
+        
+        def take(typecode: str, count: int):
+            nonlocal offset
+            size = count * array(typecode).itemsize
+            section = view[offset:offset + size].cast(typecode)
+            offset += size
+            return section
+        
+        self.out_offsets = take("q", n_nodes + 1)
+        self.in_offsets = take("q", n_nodes + 1)
+        self.out_dst = take("i", n_edges)
+        self.out_rel = take("i", n_edges)
+        self.out_tenant = take("i", n_edges)
+        self.out_conf = take("f", n_edges)
+        self.in_src = take("i", n_edges)
+        self.in_pos = take("i", n_edges)
+    
+    @staticmethod
+    def write(path: str, n_nodes: int, arrays: Dict[str, array]):
+        tmp_path = path + ".tmp"
+        n_edges = len(arrays["out_dst"])
+        with open(tmp_path, "wb") as f:
+            f.write(CSR_HEADER.pack(CSR_MAGIC, CSR_VERSION, n_nodes, n_edges))
+            for name in ("out_offsets", "in_offsets", "out_dst", "out_rel",
+                         "out_tenant", "out_conf", "in_src", "in_pos"):
+                arrays[name].tofile(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    
+    def out_range(self, node: int) -> range:
+        if node >= self.n_nodes:
+            return range(0)
+        return range(self.out_offsets[node], self.out_offsets[node + 1])
+    
+    def in_range(self, node: int) -> range:
+        if node >= self.n_nodes:
+            return range(0)
+        return range(self.in_offsets[node], self.in_offsets[node + 1])
+    
+    def close(self):
+        for name in ("out_offsets", "in_offsets", "out_dst", "out_rel",
+                     "out_tenant", "out_conf", "in_src", "in_pos"):
+            section = getattr(self, name)
+            if isinstance(section, memoryview):
+                section.release()
+        try:
+            if self._mmap is not None:
+                self._mmap.close()
+        except BufferError:
+            pass
+        if self._file is not None:
+            self._file.close()
+
+class EdgeView:
+    """One generation of edge storage: a CSR snapshot plus the confidence
+    overrides and delta edges written since it was built.
+    
+    Compaction installs a new view with a single assignment, so a reader that
+    takes ``store.edges`` once sees the snapshot, delta arrays and adjacency
+    lists of the same generation however long it runs. Writers only append to
+    or update the current view's containers, under the store lock.
+    """
+    
+    __slots__ = ("csr", "conf_overrides", "delta_src", "delta_dst", "delta_rel",
+                 "delta_tenant", "delta_conf", "delta_out", "delta_in")
+    
+    def __init__(self, csr: CSRSnapshot):
+        self.csr = csr
+        # CSR position -> updated confidence, until the next compaction
+        self.conf_overrides: Dict[int, float] = {}
+        # Delta edges written since the last compaction
+        self.delta_src = array("i")
+        self.delta_dst = array("i")
+        self.delta_rel = array("i")
+        self.delta_tenant = array("i")
+        self.delta_conf = array("f")
+        self.delta_out: Dict[int, List[int]] = {}
+        self.delta_in: Dict[int, List[int]] = {}
+
+class GraphStore:
+    """Node table, secondary indexes and CSR + append-log edge storage."""
+    
+    def __init__(self, data_dir: str, compact_threshold: int = 100000):
+        self.data_dir = data_dir
+        self.compact_threshold = compact_threshold
+        os.makedirs(data_dir, exist_ok=True)
+        self.nodes_path = os.path.join(data_dir, "nodes.jsonl")
+        self.edges_log_path = os.path.join(data_dir, "edges.log")
+        self.csr_path = os.path.join(data_dir, "csr.bin")
+        self.symbols_path = os.path.join(data_dir, "symbols.json")
+        
+        self.lock = threading.RLock()
+        
+        # Node table: dense int id <-> external string id
+        self.node_keys: List[str] = []
+        self.node_index: Dict[str, int] = {}
+        self.node_records: List[Dict[str, Any]] = []
+        self.node_log_lines = 0
+        
+        # Secondary indexes: value -> node ids
+        self.type_index: Dict[str, array] = {}
+        self.tenant_index: Dict[str, array] = {}
+        
+        self.relations = SymbolTable()
+        self.tenants = SymbolTable()
+        
+        self.edges = EdgeView(CSRSnapshot())
+        
+        self._compacting = False
+        self._updates_during_compaction: List[Tuple[int, int, int, float]] = []
+        
+        # Bumped by every write and compaction; equal versions mean identical walks
+        self.version = 0
+        
+        self._load()
+        self._nodes_file = open(self.nodes_path, "a")
+        self._edges_file = open(self.edges_log_path, "ab")
+    
+    # The current edge generation's parts; readers that iterate should take
+    # self.edges once instead, since compaction replaces all of them together
+    csr = property(lambda self: self.edges.csr)
+    conf_overrides = property(lambda self: self.edges.conf_overrides)
+    delta_src = property(lambda self: self.edges.delta_src)
+    delta_dst = property(lambda self: self.edges.delta_dst)
+    delta_rel = property(lambda self: self.edges.delta_rel)
+    delta_tenant = property(lambda self: self.edges.delta_tenant)
+    delta_conf = property(lambda self: self.edges.delta_conf)
+    delta_out = property(lambda self: self.edges.delta_out)
+    delta_in = property(lambda self: self.edges.delta_in)
+    
+    # ------------------------------------------------------------------ load
+    
+    def _load(self):
+        if os.path.exists(self.symbols_path):
+            with open(self.symbols_path, "r") as f:
+                symbols = json.load(f)
+            self.relations = SymbolTable(symbols.get("relations"))
+            self.tenants = SymbolTable(symbols.get("tenants"))
+        
+        if os.path.exists(self.nodes_path):
+            with open(self.nodes_path, "r") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    self._index_node(record)
+                    self.node_log_lines += 1
+        
+        self.edges = EdgeView(CSRSnapshot(self.csr_path))
+        
+        if os.path.exists(self.edges_log_path):
+            with open(self.edges_log_path, "rb") as f:
+                data = f.read()
+            usable = len(data) - len(data) % EDGE_RECORD.size
+            for src, dst, rel, tenant, conf in EDGE_RECORD.iter_unpack(data[:usable]):
+                self._apply_edge(src, dst, rel, tenant, conf)
+        
+        logger.info(f"Graph store loaded: {len(self.node_keys)} nodes, {self.edge_count()} edges")
+    
+    def _save_symbols(self):
+        tmp_path = self.symbols_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"relations": self.relations.names, "tenants": self.tenants.names}, f)
+        os.replace(tmp_path, self.symbols_path)
+    
+    # ----------------------------------------------------------------- nodes
+    
+    def _index_node(self, record: Dict[str, Any]) -> int:
+        node_id = record["id"]
+        index = self.node_index.get(node_id)
+        if index is None:
+            index = len(self.node_keys)
+            self.node_keys.append(node_id)
+            self.node_index[node_id] = index
+            self.node_records.append(record)
+            self.type_index.setdefault(record["type"], array("i")).append(index)
+            self.tenant_index.setdefault(record["tenant"], array("i")).append(index)
+        else:
+            previous = self.node_records[index]
+            if previous["tenant"] != record["tenant"]:
+                members = self.tenant_index[previous["tenant"]]
+                members.pop(members.index(index))
+                self.tenant_index.setdefault(record["tenant"], array("i")).append(index)
+            self.node_records[index] = record
+        return index
+    
+    def add_node(self, record: Dict[str, Any]) -> int:
+        """Insert or replace a node record; existing edges are kept."""
+        with self.lock:
+            index = self._index_node(record)
+            self._nodes_file.write(json.dumps(record) + "\n")
+            self._nodes_file.flush()
+            self.node_log_lines += 1
+            self.version += 1
+            return index
+    
+    def has_node(self, node_id: str) -> bool:
+        return node_id in self.node_index
+    
+    def get_node(self, node_id: str) -> Optional[Dict[str, Any]]:
+        index = self.node_index.get(node_id)
+        return self.node_records[index] if index is not None else None
+    
+    def node_ids(self, type: Optional[str] = None, tenant: Optional[str] = None) -> List[int]:
+        """Node ids matching the given type and/or tenant via secondary indexes."""
+        if type is None and tenant is None:
+            return list(range(len(self.node_keys)))
+        candidates = None
+        for index, value in ((self.type_index, type), (self.tenant_index, tenant)):
+            if value is None:
+                continue
+            members = index.get(value, ())
+            if candidates is None:
+                candidates = list(members)
+            else:
+                wanted = set(members)
+                candidates = [node for node in candidates if node in wanted]
+        return candidates or []
+    
+    # ----------------------------------------------------------------- edges
+    
+    def _find_edge(self, src: int, dst: int, rel: int,
+                   view: Optional[EdgeView] = None) -> Tuple[Optional[str], int]:
+        """Locate an existing (src, rel, dst) edge by scanning src's adjacency: O(degree)."""
+        view = view or self.edges
+        csr = view.csr
+        for pos in csr.out_range(src):
+            if csr.out_dst[pos] == dst and csr.out_rel[pos] == rel:
+                return "csr", pos
+        for edge in view.delta_out.get(src, ()):
+            if view.delta_dst[edge] == dst and view.delta_rel[edge] == rel:
+                return "delta", edge
+        return None, -1
+    
+    def _apply_edge(self, src: int, dst: int, rel: int, tenant: int, conf: float,
+                    view: Optional[EdgeView] = None) -> bool:
+        """Add or update an edge in memory; returns True if it was new."""
+        view = view or self.edges
+        where, position = self._find_edge(src, dst, rel, view)
+        if where == "csr":
+            view.conf_overrides[position] = conf
+        elif where == "delta":
+            view.delta_conf[position] = conf
+        else:
+            edge = len(view.delta_src)
+            view.delta_src.append(src)
+            view.delta_dst.append(dst)
+            view.delta_rel.append(rel)
+            view.delta_tenant.append(tenant)
+            view.delta_conf.append(conf)
+            view.delta_out.setdefault(src, []).append(edge)
+            view.delta_in.setdefault(dst, []).append(edge)
+        if where is not None and self._compacting:
+            self._updates_during_compaction.append((src, dst, rel, conf))
+        return where is None
+    
+    def add_edge(self, source: str, target: str, relation: str, confidence: float,
+                 tenant: str) -> Optional[bool]:
+        """Add an edge between existing nodes; returns None if an endpoint is missing."""
+        with self.lock:
+            src = self.node_index.get(source)
+            dst = self.node_index.get(target)
+            if src is None or dst is None:
+                return None
+            rel, new_rel = self.relations.code(relation)
+            tenant_code, new_tenant = self.tenants.code(tenant)
+            if new_rel or new_tenant:
+                self._save_symbols()
+            created = self._apply_edge(src, dst, rel, tenant_code, confidence)
+            self._edges_file.write(EDGE_RECORD.pack(src, dst, rel, tenant_code, confidence))
+            self._edges_file.flush()
+            self.version += 1
+            return created
+    
+    def add_nodes_bulk(self, records: List[Dict[str, Any]]) -> int:
+        """Insert or replace many nodes with a single log write; returns how many were new."""
+        with self.lock:
+            before = len(self.node_keys)
+            for record in records:
+                self._index_node(record)
+            self._nodes_file.write("".join(json.dumps(record) + "\n" for record in records))
+            self._nodes_file.flush()
+            self.node_log_lines += len(records)
+            self.version += 1
+            return len(self.node_keys) - before
+    
+    def _edge_positions(self, src: int) -> Dict[Tuple[int, int], Tuple[str, int]]:
+        """(dst, rel) -> location for every current out-edge of src."""
+        positions = {}
+        for pos in self.csr.out_range(src):
+            positions[(self.csr.out_dst[pos], self.csr.out_rel[pos])] = ("csr", pos)
+        for edge in self.delta_out.get(src, ()):
+            positions[(self.delta_dst[edge], self.delta_rel[edge])] = ("delta", edge)
+        return positions
+    
+    def add_edges_bulk(self, edges: List[Tuple[int, int, str, float, str]]) -> Tuple[int, int]:
+        """Add many (src, dst, relation, confidence, tenant) edges between known node ids.
+        
+        Edges must be unique by (src, relation, dst) within the call. Existing
+        adjacency is scanned once per source node rather than once per edge,
+        new edges are appended to the delta arrays in one pass, symbols are
+        persisted once and the log is written in a single call. Returns
+        (created, updated).
+        """
+        with self.lock:
+            symbols_before = (len(self.relations.names), len(self.tenants.names))
+            rel_codes: Dict[str, int] = {}
+            tenant_codes: Dict[str, int] = {}
+            existing: Dict[int, Dict[Tuple[int, int], Tuple[str, int]]] = {}
+            csr_nodes = self.csr.n_nodes
+            new_src, new_dst, new_rel, new_tenant = array("i"), array("i"), array("i"), array("i")
+            new_conf = array("f")
+            packed = bytearray()
+            pack = EDGE_RECORD.pack
+            updated = 0
+            for src, dst, relation, confidence, tenant in edges:
+                rel = rel_codes.get(relation)
+                if rel is None:
+                    rel = rel_codes[relation] = self.relations.code(relation)[0]
+                tenant_code = tenant_codes.get(tenant)
+                if tenant_code is None:
+                    tenant_code = tenant_codes[tenant] = self.tenants.code(tenant)[0]
+                packed += pack(src, dst, rel, tenant_code, confidence)
+                
+                # Only sources that already had adjacency can hold a duplicate
+                if src < csr_nodes or src in self.delta_out:
+                    positions = existing.get(src)
+                    if positions is None:
+                        positions = existing[src] = self._edge_positions(src)
+                    hit = positions.get((dst, rel))
+                    if hit is not None:
+                        where, position = hit
+                        if where == "csr":
+                            self.conf_overrides[position] = confidence
+                        else:
+                            self.delta_conf[position] = confidence
+                        if self._compacting:
+                            self._updates_during_compaction.append((src, dst, rel, confidence))
+                        updated += 1
+                        continue
+                new_src.append(src)
+                new_dst.append(dst)
+                new_rel.append(rel)
+                new_tenant.append(tenant_code)
+                new_conf.append(confidence)
+            
+            base = len(self.delta_src)
+            self.delta_src.extend(new_src)
+            self.delta_dst.extend(new_dst)
+            self.delta_rel.extend(new_rel)
+            self.delta_tenant.extend(new_tenant)
+            self.delta_conf.extend(new_conf)
+            delta_out, delta_in = self.delta_out, self.delta_in
+            for offset, (src, dst) in enumerate(zip(new_src, new_dst)):
+                edge = base + offset
+                out_list = delta_out.get(src)
+                if out_list is None:
+                    delta_out[src] = [edge]
+                else:
+                    out_list.append(edge)
+                in_list = delta_in.get(dst)
+                if in_list is None:
+                    delta_in[dst] = [edge]
+                else:
+                    in_list.append(edge)
+            
+            if (len(self.relations.names), len(self.tenants.names)) != symbols_before:
+                self._save_symbols()
+            self._edges_file.write(packed)
+            self._edges_file.flush()
+            self.version += 1
+            return len(new_src), updated
+    
+    def out_edges(self, node: int) -> Iterator[Tuple[int, int, float, int]]:
+        """(target, relation code, confidence, tenant code) for each outgoing edge."""
+        view = self.edges
+        csr = view.csr
+        overrides = view.conf_overrides
+        for pos in csr.out_range(node):
+            conf = overrides.get(pos, csr.out_conf[pos]) if overrides else csr.out_conf[pos]
+            yield csr.out_dst[pos], csr.out_rel[pos], conf, csr.out_tenant[pos]
+        for edge in view.delta_out.get(node, ()):
+            yield view.delta_dst[edge], view.delta_rel[edge], view.delta_conf[edge], view.delta_tenant[edge]
+    
+    def in_edges(self, node: int) -> Iterator[Tuple[int, int, float, int]]:
+        """(source, relation code, confidence, tenant code) for each incoming edge."""
+        view = self.edges
+        csr = view.csr
+        overrides = view.conf_overrides
+        for in_pos in csr.in_range(node):
+            pos = csr.in_pos[in_pos]
+            conf = overrides.get(pos, csr.out_conf[pos]) if overrides else csr.out_conf[pos]
+            yield csr.in_src[in_pos], csr.out_rel[pos], conf, csr.out_tenant[pos]
+        for edge in view.delta_in.get(node, ()):
+            yield view.delta_src[edge], view.delta_rel[edge], view.delta_conf[edge], view.delta_tenant[edge]
+    
+    def degree(self, node: int) -> Tuple[int, int]:
+        """(in, out) degree without materialising edges."""
+        view = self.edges
+        return (len(view.csr.in_range(node)) + len(view.delta_in.get(node, ())),
+                len(view.csr.out_range(node)) + len(view.delta_out.get(node, ())))
+    
+    def edge_count(self) -> int:
+        view = self.edges
+        return view.csr.n_edges + len(view.delta_src)
+    
+    def node_count(self) -> int:
+        return len(self.node_keys)
+    
+    # ------------------------------------------------------------ compaction
+    
+    def needs_compaction(self) -> bool:
+        return len(self.delta_src) + len(self.conf_overrides) >= self.compact_threshold
+    
+    def compact(self) -> Dict[str, int]:
+        """Fold delta edges and confidence overrides into a new CSR snapshot."""
+        with self.lock:
+            if self._compacting:
+                return {"status": "in_progress"}
+            self._compacting = True
+            self._updates_during_compaction = []
+            view = self.edges
+            overrides = dict(view.conf_overrides)
+            delta_count = len(view.delta_src)
+            n_nodes = len(self.node_keys)
+        
+        try:
+            arrays = self._build_csr(view, overrides, delta_count, n_nodes)
+            CSRSnapshot.write(self.csr_path, n_nodes, arrays)
+            
+            with self.lock:
+                new_csr = CSRSnapshot(self.csr_path)
+                self._swap(new_csr, delta_count)
+                # The old mapping is not closed here: in-flight traversals may still
+                # be reading it, and it is released once they drop their reference
+                self._rewrite_logs()
+                return {"nodes": n_nodes, "edges": new_csr.n_edges, "delta_remaining": len(self.delta_src)}
+        finally:
+            with self.lock:
+                self._compacting = False
+    
+    def _build_csr(self, view: EdgeView, overrides: Dict[int, float], delta_count: int,
+                   n_nodes: int) -> Dict[str, array]:
+        # Gather edge columns: snapshot edges first, then the delta prefix
+        csr = view.csr
+        src = array("i")
+        for node in range(csr.n_nodes):
+            count = csr.out_offsets[node + 1] - csr.out_offsets[node]
+            if count:
+                src.extend([node] * count)
+        dst = array("i", csr.out_dst)
+        rel = array("i", csr.out_rel)
+        tenant = array("i", csr.out_tenant)
+        conf = array("f", csr.out_conf)
+        for pos, value in overrides.items():
+            conf[pos] = value
+        src.extend(view.delta_src[:delta_count])
+        dst.extend(view.delta_dst[:delta_count])
+        rel.extend(view.delta_rel[:delta_count])
+        tenant.extend(view.delta_tenant[:delta_count])
+        conf.extend(view.delta_conf[:delta_count])
+        n_edges = len(src)
+        
+        # Counting sort by source for the out-adjacency
+        out_offsets = array("q", [0]) * (n_nodes + 1)
+        for node in src:
+            out_offsets[node + 1] += 1
+        for node in range(n_nodes):
+            out_offsets[node + 1] += out_offsets[node]
+        cursor = array("q", out_offsets)
+        order = array("i", [0]) * n_edges
+        for edge in range(n_edges):
+            node = src[edge]
+            order[cursor[node]] = edge
+            cursor[node] += 1
+        
+        out_dst = array("i", (dst[edge] for edge in order))
+        out_rel = array("i", (rel[edge] for edge in order))
+        out_tenant = array("i", (tenant[edge] for edge in order))
+        out_conf = array("f", (conf[edge] for edge in order))
+        out_src = array("i", (src[edge] for edge in order))
+        
+        # Counting sort by target for the in-adjacency, pointing back at out positions
+        in_offsets = array("q", [0]) * (n_nodes + 1)
+        for node in out_dst:
+            in_offsets[node + 1] += 1
+        for node in range(n_nodes):
+            in_offsets[node + 1] += in_offsets[node]
+        cursor = array("q", in_offsets)
+        in_src = array("i", [0]) * n_edges
+        in_pos = array("i", [0]) * n_edges
+        for pos in range(n_edges):
+            node = out_dst[pos]
+            in_src[cursor[node]] = out_src[pos]
+            in_pos[cursor[node]] = pos
+            cursor[node] += 1
+        
+        return {
+            "out_offsets": out_offsets, "in_offsets": in_offsets,
+            "out_dst": out_dst, "out_rel": out_rel, "out_tenant": out_tenant, "out_conf": out_conf,
+            "in_src": in_src, "in_pos": in_pos
+        }
+    
+    def _swap(self, new_csr: CSRSnapshot, delta_count: int):
+        """Install a new snapshot, keeping delta edges and updates written meanwhile.
+        
+        The new view is complete before it replaces the old one, so readers
+        see either generation whole, never a mix of the two.
+        """
+        old = self.edges
+        view = EdgeView(new_csr)
+        self._compacting = False
+        for edge in range(delta_count, len(old.delta_src)):
+            self._apply_edge(old.delta_src[edge], old.delta_dst[edge], old.delta_rel[edge],
+                             old.delta_tenant[edge], old.delta_conf[edge], view)
+        for src, dst, rel, conf in self._updates_during_compaction:
+            where, position = self._find_edge(src, dst, rel, view)
+            if where == "csr":
+                view.conf_overrides[position] = conf
+            elif where == "delta":
+                view.delta_conf[position] = conf
+        self._updates_during_compaction = []
+        self.edges = view
+        # A rebuilt snapshot may order adjacency differently, so walks can change
+        self.version += 1
+    
+    def _rewrite_logs(self):
+        """Shrink the edge log to what the snapshot does not cover; dedupe the node log."""
+        tmp_path = self.edges_log_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            for pos, conf in self.conf_overrides.items():
+                f.write(EDGE_RECORD.pack(
+                    self._csr_source(pos), self.csr.out_dst[pos], self.csr.out_rel[pos],
+                    self.csr.out_tenant[pos], conf))
+            for edge in range(len(self.delta_src)):
+                f.write(EDGE_RECORD.pack(
+                    self.delta_src[edge], self.delta_dst[edge], self.delta_rel[edge],
+                    self.delta_tenant[edge], self.delta_conf[edge]))
+        self._edges_file.close()
+        os.replace(tmp_path, self.edges_log_path)
+        self._edges_file = open(self.edges_log_path, "ab")
+        
+        if self.node_log_lines > len(self.node_records):
+            tmp_path = self.nodes_path + ".tmp"
+            with open(tmp_path, "w") as f:
+                for record in self.node_records:
+                    f.write(json.dumps(record) + "\n")
+            self._nodes_file.close()
+            os.replace(tmp_path, self.nodes_path)
+            self._nodes_file = open(self.nodes_path, "a")
+            self.node_log_lines = len(self.node_records)
+    
+    def _csr_source(self, pos: int) -> int:
+        # Binary search the out offsets for the row containing pos
+        low, high = 0, self.csr.n_nodes - 1
+        while low < high:
+            mid = (low + high + 1) // 2
+            if self.csr.out_offsets[mid] <= pos:
+                low = mid
+            else:
+                high = mid - 1
+        return low
+    
+    def stats(self) -> Dict[str, Any]:
+        view = self.edges
+        return {
+            "nodes": self.node_count(),
+            "edges": view.csr.n_edges + len(view.delta_src),
+            "csr_edges": view.csr.n_edges,
+            "delta_edges": len(view.delta_src),
+            "confidence_overrides": len(view.conf_overrides),
+            "relations": len(self.relations.names),
+            "tenants": len(self.tenant_index),
+            "types": len(self.type_index)
+        }
+    
+    def close(self):
+        with self.lock:
+            self._nodes_file.close()
+            self._edges_file.close()
+            self.csr.close()
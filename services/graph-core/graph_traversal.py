@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+Server-side traversal over the Graph Core adjacency store.
+
+Every operation runs on dense node ids and yields plain dicts so endpoints can
+page or stream them. Tenant isolation is enforced while walking: when a tenant
+is given, only nodes and edges belonging to it are ever visited.
+"""
+
+import copy
+import json
+import base64
+import hashlib
+import threading
+from itertools import islice
+from collections import deque, OrderedDict
+from typing import Dict, Any, List, Optional, Iterator, Iterable, Tuple, Callable
+
+DIRECTIONS = ("out", "in", "both")
+
+class TraversalError(ValueError):
+    """Raised for invalid traversal requests (unknown node, tenant mismatch, bad cursor)."""
+
+class EdgeFilter:
+    """Relation, confidence and tenant constraints applied to every hop."""
+    
+    def __init__(self, store, relations: Optional[Iterable[str]] = None,
+                 min_confidence: float = 0.0, tenant: Optional[str] = None,
+                 direction: str = "out"):
+        if direction not in DIRECTIONS:
+            raise TraversalError(f"Unknown direction: {direction}")
+        self.store = store
+        self.direction = direction
+        self.min_confidence = min_confidence
+        self.tenant = tenant
+        self.relation_codes = None
+        if relations:
+            # Unknown relations simply match nothing
+            self.relation_codes = {
+                code for code in (store.relations.lookup(r) for r in relations) if code is not None
+            }
+        self.tenant_code = store.tenants.lookup(tenant) if tenant is not None else None
+    
+    def with_direction(self, direction: str) -> "EdgeFilter":
+        clone = copy.copy(self)
+        clone.direction = direction
+        return clone
+    
+    def allows_node(self, node: int) -> bool:
+        return self.tenant is None or self.store.node_records[node]["tenant"] == self.tenant
+    
+    def neighbors(self, node: int) -> Iterator[Tuple[int, int, float, str]]:
+        """(neighbor, relation code, confidence, direction) for each admissible hop."""
+        if self.tenant is not None and self.tenant_code is None:
+            return
+        sources = []
+        if self.direction in ("out", "both"):
+            sources.append((self.store.out_edges(node), "outgoing"))
+        if self.direction in ("in", "both"):
+            sources.append((self.store.in_edges(node), "incoming"))
+        for edges, label in sources:
+            for neighbor, relation, confidence, tenant in edges:
+                if self.relation_codes is not None and relation not in self.relation_codes:
+                    continue
+                if confidence < self.min_confidence:
+                    continue
+                if self.tenant_code is not None and tenant != self.tenant_code:
+                    continue
+                if not self.allows_node(neighbor):
+                    continue
+                yield neighbor, relation, confidence, label
+
+def resolve_start(store, node_id: str, edge_filter: EdgeFilter) -> int:
+    index = store.node_index.get(node_id)
+    if index is None:
+        raise TraversalError(f"Node not found: {node_id}")
+    if not edge_filter.allows_node(index):
+        # Same message as a missing node so tenants cannot probe each other's ids
+        raise TraversalError(f"Node not found: {node_id}")
+    return index
+
+def _hop(store, node: int, depth: int, parent: Optional[int], relation: Optional[int],
+         confidence: Optional[float], direction: Optional[str]) -> Dict[str, Any]:
+    record = store.node_records[node]
+    return {
+        "node_id": store.node_keys[node],
+        "type": record["type"],
+        "depth": depth,
+        "parent": store.node_keys[parent] if parent is not None else None,
+        "relation": store.relations[relation] if relation is not None else None,
+        "confidence": round(confidence, 6) if confidence is not None else None,
+        "direction": direction
+    }
+
+def traverse(store, start: str, edge_filter: EdgeFilter, mode: str = "bfs",
+             max_depth: int = 3, max_nodes: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """Breadth- or depth-first walk from start, each node reported once."""
+    if mode not in ("bfs", "dfs"):
+        raise TraversalError(f"Unknown traversal mode: {mode}")
+    origin = resolve_start(store, start, edge_filter)
+    visited = {origin}
+    frontier = deque([(origin, 0, None, None, None, None)])
+    emitted = 0
+    while frontier:
+        node, depth, parent, relation, confidence, direction = (
+            frontier.popleft() if mode == "bfs" else frontier.pop()
+        )
+        yield _hop(store, node, depth, parent, relation, confidence, direction)
+        emitted += 1
+        if max_nodes is not None and emitted >= max_nodes:
+            return
+        if depth >= max_depth:
+            continue
+        children = []
+        for neighbor, rel, conf, label in edge_filter.neighbors(node):
+            if neighbor in visited:
+                continue
+            visited.add(neighbor)
+            children.append((neighbor, depth + 1, node, rel, conf, label))
+        # DFS pops from the right, so push children reversed to visit them in edge order
+        frontier.extend(children if mode == "bfs" else reversed(children))
+
+def shortest_path(store, source: str, target: str, edge_filter: EdgeFilter,
+                  max_depth: int = 6) -> Optional[List[Dict[str, Any]]]:
+    """Fewest-hop path via bidirectional BFS; None if unreachable within max_depth."""
+    src = resolve_start(store, source, edge_filter)
+    dst = resolve_start(store, target, edge_filter)
+    if src == dst:
+        return [_hop(store, src, 0, None, None, None, None)]
+    
+    # The backward search walks edges against the requested direction
+    reverse_direction = {"out": "in", "in": "out", "both": "both"}[edge_filter.direction]
+    backward_filter = edge_filter.with_direction(reverse_direction)
+    
+    # node -> (previous node, relation, confidence, direction)
+    forward = {src: None}
+    backward = {dst: None}
+    forward_frontier, backward_frontier = [src], [dst]
+    meeting = None
+    depth = 0
+    while forward_frontier and backward_frontier and depth < max_depth and meeting is None:
+        # Expand the smaller frontier first
+        if len(forward_frontier) <= len(backward_frontier):
+            forward_frontier, meeting = _expand(forward_frontier, forward, backward, edge_filter)
+        else:
+            backward_frontier, meeting = _expand(backward_frontier, backward, forward, backward_filter)
+        depth += 1
+    if meeting is None:
+        return None
+    
+    head = []
+    node = meeting
+    while forward[node] is not None:
+        previous, relation, confidence, direction = forward[node]
+        head.append((node, previous, relation, confidence, direction))
+        node = previous
+    head.reverse()
+    
+    path = [_hop(store, src, 0, None, None, None, None)]
+    for node, previous, relation, confidence, direction in head:
+        path.append(_hop(store, node, len(path), previous, relation, confidence, direction))
+    node = meeting
+    while backward[node] is not None:
+        following, relation, confidence, direction = backward[node]
+        # Backward hops were discovered from the far side; flip them to read source -> target
+        flipped = "incoming" if direction == "outgoing" else "outgoing"
+        path.append(_hop(store, following, len(path), node, relation, confidence, flipped))
+        node = following
+    return path
+
+def _expand(frontier: List[int], seen: Dict[int, Any], other: Dict[int, Any],
+            edge_filter: EdgeFilter) -> Tuple[List[int], Optional[int]]:
+    next_frontier = []
+    for node in frontier:
+        for neighbor, relation, confidence, direction in edge_filter.neighbors(node):
+            if neighbor in seen:
+                continue
+            seen[neighbor] = (node, relation, confidence, direction)
+            if neighbor in other:
+                return next_frontier, neighbor
+            next_frontier.append(neighbor)
+    return next_frontier, None
+
+def k_hop_subgraph(store, start: str, edge_filter: EdgeFilter, k: int = 2,
+                   max_nodes: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """Nodes within k hops of start, then every admissible edge among them."""
+    members = []
+    for hop in traverse(store, start, edge_filter, mode="bfs", max_depth=k, max_nodes=max_nodes):
+        members.append(store.node_index[hop["node_id"]])
+        yield {"kind": "node", **hop}
+    
+    member_set = set(members)
+    out_filter = edge_filter.with_direction("out")
+    for node in members:
+        for neighbor, relation, confidence, _ in out_filter.neighbors(node):
+            if neighbor in member_set:
+                yield {
+                    "kind": "edge",
+                    "source": store.node_keys[node],
+                    "target": store.node_keys[neighbor],
+                    "relation": store.relations[relation],
+                    "confidence": round(confidence, 6)
+                }
+
+def query_fingerprint(params: Dict[str, Any]) -> str:
+    return hashlib.sha256(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()[:12]
+
+def encode_cursor(offset: int, fingerprint: str, version: int) -> str:
+    payload = json.dumps({"o": offset, "q": fingerprint, "v": version}).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+def decode_cursor(cursor: Optional[str], fingerprint: str, version: int) -> int:
+    """Offset stored in a cursor; the cursor must belong to the same query and store version."""
+    if not cursor:
+        return 0
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        offset, owner, issued = int(payload["o"]), payload["q"], int(payload["v"])
+    except (ValueError, KeyError, TypeError):
+        raise TraversalError("Malformed cursor")
+    if owner != fingerprint:
+        raise TraversalError("Cursor does not belong to this query")
+    if issued != version:
+        # Later pages of a changed graph would skip or repeat nodes
+        raise TraversalError("Graph changed since the cursor was issued; restart the query")
+    return offset
+
+class PageCache:
+    """Suspended result iterators, keyed by (fingerprint, store version, offset).
+    
+    Taking an entry removes it, so only one request ever resumes a given walk.
+    The least recently stored walks are dropped beyond max_entries.
+    """
+    
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[Tuple[str, int, int], Tuple[Dict[str, Any], Iterator]]" = OrderedDict()
+        self.lock = threading.Lock()
+    
+    def take(self, key: Tuple[str, int, int]) -> Optional[Tuple[Dict[str, Any], Iterator]]:
+        with self.lock:
+            return self.entries.pop(key, None)
+    
+    def put(self, key: Tuple[str, int, int], head: Dict[str, Any], rest: Iterator):
+        if self.max_entries <= 0:
+            return
+        with self.lock:
+            self.entries[key] = (head, rest)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+def paginate(make_results: Callable[[], Iterator[Dict[str, Any]]], offset: int, limit: int,
+             fingerprint: str, version: int,
+             cache: Optional[PageCache] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Take one page at offset, resuming the previous page's walk when it is cached.
+    
+    On a cache miss the walk is replayed up to offset; that only reproduces
+    the earlier pages because cursors are tied to the store version.
+    """
+    if limit < 1:
+        raise TraversalError("limit must be at least 1")
+    page: List[Dict[str, Any]] = []
+    suspended = cache.take((fingerprint, version, offset)) if cache is not None else None
+    if suspended is not None:
+        head, results = suspended
+        page.append(head)
+    else:
+        results = islice(make_results(), offset, None)
+    page.extend(islice(results, limit - len(page)))
+    if len(page) < limit:
+        return page, None
+    # Read one item ahead so the last page does not hand out a cursor to nothing
+    head = next(results, None)
+    if head is None:
+        return page, None
+    if cache is not None:
+        cache.put((fingerprint, version, offset + limit), head, results)
+    return page, encode_cursor(offset + limit, fingerprint, version)
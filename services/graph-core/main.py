@@ -2,11 +2,19 @@
 import os
 import json
 import logging
-import hashlib
-from fastapi import FastAPI
+import asyncio
+from fastapi import FastAPI, Request, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Dict, Any, Optional
 
+from graph_store import GraphStore
+from graph_ingest import BulkIngestor, node_identity, arrow_available, ARROW_TYPES
+from graph_traversal import (
+    EdgeFilter, TraversalError, resolve_start, traverse, shortest_path, k_hop_subgraph,
+    query_fingerprint, decode_cursor, paginate, PageCache
+)
+
 app = FastAPI(title="Graph Core Service")
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -26,9 +34,41 @@ class GraphEdge(BaseModel):
     confidence: float = 1.0
     tenant: str = "default"
 
-# In-memory storage for simulation
-graph_nodes = {}
-graph_edges = {}
+GRAPH_DATA_DIR = os.getenv("GRAPH_DATA_DIR", "/tmp/graph-core")
+GRAPH_COMPACT_THRESHOLD = int(os.getenv("GRAPH_COMPACT_THRESHOLD", "100000"))
+GRAPH_COMPACT_INTERVAL = int(os.getenv("GRAPH_COMPACT_INTERVAL", "60"))
+GRAPH_INGEST_WORKERS = int(os.getenv("GRAPH_INGEST_WORKERS", "4"))
+GRAPH_INGEST_MAX_BYTES = int(os.getenv("GRAPH_INGEST_MAX_BYTES", str(256 * 1024 * 1024)))
+GRAPH_PAGE_CACHE_ENTRIES = int(os.getenv("GRAPH_PAGE_CACHE_ENTRIES", "256"))
+
+# Persistent CSR + append-log adjacency store
+store = GraphStore(GRAPH_DATA_DIR, compact_threshold=GRAPH_COMPACT_THRESHOLD)
+ingestor = BulkIngestor(store, workers=GRAPH_INGEST_WORKERS)
+# Paged traversals resume from here instead of replaying the walk for every page
+page_cache = PageCache(GRAPH_PAGE_CACHE_ENTRIES)
+
+def edge_id_for(source: str, relation: str, target: str) -> str:
+    return f"{source}-{relation}-{target}"
+
+async def compact_periodically():
+    """Fold the append log into the CSR snapshot once it grows past the threshold."""
+    while True:
+        await asyncio.sleep(GRAPH_COMPACT_INTERVAL)
+        if store.needs_compaction():
+            try:
+                result = await asyncio.to_thread(store.compact)
+                logger.info(f"Graph store compacted: {result}")
+            except Exception as e:
+                logger.error(f"Graph store compaction failed: {e}")
+
+@app.on_event("startup")
+async def startup():
+    asyncio.create_task(compact_periodically())
+
+@app.on_event("shutdown")
+async def shutdown():
+    ingestor.close()
+    store.close()
 
 @app.get("/health")
 async def health():
@@ -36,141 +76,256 @@ async def health():
 
 @app.get("/metrics")
 async def metrics():
+    nodes_total = store.node_count()
+    edges_total = store.edge_count()
     return {
-        "nodes_total": len(graph_nodes),
-        "edges_total": len(graph_edges),
-        "tenants_active": len(set(n.get("tenant") for n in graph_nodes.values())),
-        "avg_node_degree": 2.5,
+        "nodes_total": nodes_total,
+        "edges_total": edges_total,
+        "tenants_active": len(store.tenant_index),
+        "avg_node_degree": round(2 * edges_total / nodes_total, 2) if nodes_total else 0.0,
+        "csr_edges": store.csr.n_edges,
+        "delta_edges": len(store.delta_src),
+        "bulk_batches": ingestor.batches,
         "simulation": SIMULATION_MODE
     }
 
 @app.post("/graph/node")
 async def create_node(node: GraphNode):
-    if SIMULATION_MODE:
-        # Generate node ID and hash for immutability
-        node_data = json.dumps(node.data, sort_keys=True)
-        node_hash = hashlib.sha256(node_data.encode()).hexdigest()[:16]
-        node_id = f"{node.type}-{node_hash}"
-        
-        graph_node = {
-            "id": node_id,
-            "type": node.type,
-            "data": node.data,
-            "meta": node.meta,
-            "tenant": node.tenant,
-            "hash": node_hash,
-            "created_at": "2024-01-15T10:30:00Z",
-            "edges_in": [],
-            "edges_out": []
-        }
-        
-        graph_nodes[node_id] = graph_node
-        
-        logger.info(f"Graph node created: {node_id} (type: {node.type}, tenant: {node.tenant})")
-        return {
-            "status": "created",
-            "node_id": node_id,
-            "hash": node_hash,
-            "simulation": True
-        }
+    # Generate node ID and hash for immutability
+    node_id, node_hash = node_identity(node.type, node.data)
+    
+    graph_node = {
+        "id": node_id,
+        "type": node.type,
+        "data": node.data,
+        "meta": node.meta,
+        "tenant": node.tenant,
+        "hash": node_hash,
+        "created_at": "2024-01-15T10:30:00Z"
+    }
+    
+    store.add_node(graph_node)
     
-    return {"status": "error", "message": "Graph database required"}
+    logger.info(f"Graph node created: {node_id} (type: {node.type}, tenant: {node.tenant})")
+    return {
+        "status": "created",
+        "node_id": node_id,
+        "hash": node_hash,
+        "simulation": SIMULATION_MODE
+    }
 
 @app.post("/graph/edge")
 async def create_edge(edge: GraphEdge):
-    if SIMULATION_MODE:
-        # Verify source and target nodes exist
-        if edge.source not in graph_nodes or edge.target not in graph_nodes:
-            return {"status": "error", "message": "Source or target node not found"}
-        
-        edge_id = f"{edge.source}-{edge.relation}-{edge.target}"
-        
-        graph_edge = {
-            "id": edge_id,
-            "source": edge.source,
-            "target": edge.target,
-            "relation": edge.relation,
-            "confidence": edge.confidence,
-            "tenant": edge.tenant,
-            "created_at": "2024-01-15T10:30:00Z"
-        }
-        
-        graph_edges[edge_id] = graph_edge
-        
-        # Update node edge lists
-        graph_nodes[edge.source]["edges_out"].append(edge_id)
-        graph_nodes[edge.target]["edges_in"].append(edge_id)
-        
-        logger.info(f"Graph edge created: {edge_id} (confidence: {edge.confidence})")
-        return {
-            "status": "created",
-            "edge_id": edge_id,
-            "confidence": edge.confidence,
-            "simulation": True
-        }
+    created = store.add_edge(edge.source, edge.target, edge.relation, edge.confidence, edge.tenant)
+    # Verify source and target nodes exist
+    if created is None:
+        return {"status": "error", "message": "Source or target node not found"}
+    
+    edge_id = edge_id_for(edge.source, edge.relation, edge.target)
     
-    return {"status": "error", "message": "Graph database required"}
+    logger.info(f"Graph edge {'created' if created else 'updated'}: {edge_id} (confidence: {edge.confidence})")
+    return {
+        "status": "created" if created else "updated",
+        "edge_id": edge_id,
+        "confidence": edge.confidence,
+        "simulation": SIMULATION_MODE
+    }
 
-@app.get("/graph/{node_id}")
-async def get_node(node_id: str):
-    if SIMULATION_MODE:
-        if node_id in graph_nodes:
-            node = graph_nodes[node_id].copy()
-            
-            # Add connected edges information
-            node["connected_edges"] = {
-                "incoming": len(node["edges_in"]),
-                "outgoing": len(node["edges_out"]),
-                "total_degree": len(node["edges_in"]) + len(node["edges_out"])
-            }
-            
-            return node
-        
-        return {"status": "not_found", "node_id": node_id}
+@app.post("/graph/bulk")
+async def bulk_ingest(request: Request):
+    """Ingest a batch of nodes and edges sent as NDJSON or an Arrow IPC stream."""
+    too_large = HTTPException(status_code=413, detail=f"Batch exceeds {GRAPH_INGEST_MAX_BYTES} bytes")
+    declared = request.headers.get("content-length")
+    if declared is not None and declared.isdigit() and int(declared) > GRAPH_INGEST_MAX_BYTES:
+        raise too_large
+    # Chunked or understated bodies are capped while reading, never buffered past the limit
+    chunks = []
+    received = 0
+    async for chunk in request.stream():
+        received += len(chunk)
+        if received > GRAPH_INGEST_MAX_BYTES:
+            raise too_large
+        chunks.append(chunk)
+    body = b"".join(chunks)
+    
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    arrow = content_type in ARROW_TYPES
+    if arrow and not arrow_available():
+        return {"status": "error", "message": "Arrow IPC batches require pyarrow"}
     
-    return {"status": "error", "message": "Graph database required"}
+    result = await asyncio.to_thread(ingestor.ingest_body, body, arrow)
+    if store.needs_compaction():
+        asyncio.create_task(asyncio.to_thread(store.compact))
+    result["simulation"] = SIMULATION_MODE
+    return result
+
+@app.get("/graph/nodes")
+async def list_nodes(type: Optional[str] = None, tenant: Optional[str] = None, limit: int = 100):
+    """List nodes through the type/tenant secondary indexes."""
+    matches = store.node_ids(type=type, tenant=tenant)
+    return {
+        "nodes": [
+            {"node_id": store.node_keys[i], "type": store.node_records[i]["type"], "tenant": store.node_records[i]["tenant"]}
+            for i in matches[:limit]
+        ],
+        "total": len(matches),
+        "simulation": SIMULATION_MODE
+    }
 
 @app.get("/graph/neighbors/{node_id}")
 async def get_neighbors(node_id: str):
-    if SIMULATION_MODE:
-        if node_id not in graph_nodes:
-            return {"status": "not_found", "node_id": node_id}
-        
-        neighbors = []
-        node = graph_nodes[node_id]
-        
-        # Get neighbors from outgoing edges
-        for edge_id in node["edges_out"]:
-            edge = graph_edges[edge_id]
-            target_node = graph_nodes[edge["target"]]
-            neighbors.append({
-                "node_id": edge["target"],
-                "type": target_node["type"],
-                "relation": edge["relation"],
-                "confidence": edge["confidence"],
-                "direction": "outgoing"
-            })
-        
-        # Get neighbors from incoming edges
-        for edge_id in node["edges_in"]:
-            edge = graph_edges[edge_id]
-            source_node = graph_nodes[edge["source"]]
-            neighbors.append({
-                "node_id": edge["source"],
-                "type": source_node["type"],
-                "relation": edge["relation"],
-                "confidence": edge["confidence"],
-                "direction": "incoming"
-            })
-        
-        return {
-            "node_id": node_id,
-            "neighbors": neighbors,
-            "neighbor_count": len(neighbors),
-            "simulation": True
-        }
+    index = store.node_index.get(node_id)
+    if index is None:
+        return {"status": "not_found", "node_id": node_id}
+    
+    neighbors = []
+    
+    # Get neighbors from outgoing edges
+    for target, relation, confidence, _ in store.out_edges(index):
+        neighbors.append({
+            "node_id": store.node_keys[target],
+            "type": store.node_records[target]["type"],
+            "relation": store.relations[relation],
+            "confidence": round(confidence, 6),
+            "direction": "outgoing"
+        })
     
-    return {"status": "error", "message": "Graph database required"}
+    # Get neighbors from incoming edges
+    for source, relation, confidence, _ in store.in_edges(index):
+        neighbors.append({
+            "node_id": store.node_keys[source],
+            "type": store.node_records[source]["type"],
+            "relation": store.relations[relation],
+            "confidence": round(confidence, 6),
+            "direction": "incoming"
+        })
+    
+    return {
+        "node_id": node_id,
+        "neighbors": neighbors,
+        "neighbor_count": len(neighbors),
+        "simulation": SIMULATION_MODE
+    }
+
+def build_filter(direction: str, relations: Optional[str], min_confidence: float,
+                 tenant: Optional[str]) -> EdgeFilter:
+    relation_list = [r for r in relations.split(",") if r] if relations else None
+    return EdgeFilter(store, relations=relation_list, min_confidence=min_confidence,
+                      tenant=tenant, direction=direction)
+
+def stream_ndjson(results):
+    for item in results:
+        yield json.dumps(item) + "\n"
+
+async def page_or_stream(make_results, params: Dict[str, Any], cursor: Optional[str], limit: int,
+                         stream: bool, key: str):
+    """Stream every result as NDJSON, or return one page with a continuation cursor."""
+    if stream:
+        # Starlette iterates synchronous generators in its threadpool
+        return StreamingResponse(stream_ndjson(make_results()), media_type="application/x-ndjson")
+    fingerprint = query_fingerprint(params)
+    version = store.version
+    offset = decode_cursor(cursor, fingerprint, version)
+    items, next_cursor = await asyncio.to_thread(
+        paginate, make_results, offset, limit, fingerprint, version, page_cache
+    )
+    return {
+        key: items,
+        "count": len(items),
+        "next_cursor": next_cursor,
+        "simulation": SIMULATION_MODE
+    }
+
+@app.get("/graph/traverse/{node_id}")
+async def traverse_graph(node_id: str, mode: str = "bfs", max_depth: int = 3, direction: str = "out",
+                         relations: Optional[str] = None, min_confidence: float = 0.0,
+                         tenant: Optional[str] = None, limit: int = 100,
+                         cursor: Optional[str] = None, stream: bool = False):
+    """BFS/DFS walk with depth, relation, confidence and tenant constraints."""
+    params = {"op": "traverse", "node_id": node_id, "mode": mode, "max_depth": max_depth,
+              "direction": direction, "relations": relations, "min_confidence": min_confidence,
+              "tenant": tenant}
+    try:
+        edge_filter = build_filter(direction, relations, min_confidence, tenant)
+        resolve_start(store, node_id, edge_filter)
+        return await page_or_stream(
+            lambda: traverse(store, node_id, edge_filter, mode=mode, max_depth=max_depth),
+            params, cursor, limit, stream, "nodes"
+        )
+    except TraversalError as e:
+        return {"status": "error", "message": str(e)}
+
+@app.get("/graph/subgraph/{node_id}")
+async def get_subgraph(node_id: str, k: int = 2, direction: str = "both",
+                       relations: Optional[str] = None, min_confidence: float = 0.0,
+                       tenant: Optional[str] = None, max_nodes: int = 10000, limit: int = 500,
+                       cursor: Optional[str] = None, stream: bool = False):
+    """k-hop neighborhood: member nodes followed by the edges among them."""
+    params = {"op": "subgraph", "node_id": node_id, "k": k, "direction": direction,
+              "relations": relations, "min_confidence": min_confidence, "tenant": tenant,
+              "max_nodes": max_nodes}
+    try:
+        edge_filter = build_filter(direction, relations, min_confidence, tenant)
+        resolve_start(store, node_id, edge_filter)
+        return await page_or_stream(
+            lambda: k_hop_subgraph(store, node_id, edge_filter, k=k, max_nodes=max_nodes),
+            params, cursor, limit, stream, "elements"
+        )
+    except TraversalError as e:
+        return {"status": "error", "message": str(e)}
+
+@app.get("/graph/path")
+async def find_path(source: str, target: str, max_depth: int = 6, direction: str = "out",
+                    relations: Optional[str] = None, min_confidence: float = 0.0,
+                    tenant: Optional[str] = None):
+    """Fewest-hop path between two nodes."""
+    try:
+        edge_filter = build_filter(direction, relations, min_confidence, tenant)
+        path = await asyncio.to_thread(shortest_path, store, source, target, edge_filter, max_depth)
+    except TraversalError as e:
+        return {"status": "error", "message": str(e)}
+    
+    if path is None:
+        return {"status": "not_found", "source": source, "target": target, "max_depth": max_depth}
+    return {
+        "source": source,
+        "target": target,
+        "path": path,
+        "hops": len(path) - 1,
+        "simulation": SIMULATION_MODE
+    }
+
+@app.get("/graph/{node_id}")
+async def get_node(node_id: str):
+    index = store.node_index.get(node_id)
+    if index is None:
+        return {"status": "not_found", "node_id": node_id}
+    
+    node = dict(store.node_records[index])
+    node["edges_out"] = [
+        edge_id_for(node_id, store.relations[relation], store.node_keys[target])
+        for target, relation, _, _ in store.out_edges(index)
+    ]
+    node["edges_in"] = [
+        edge_id_for(store.node_keys[source], store.relations[relation], node_id)
+        for source, relation, _, _ in store.in_edges(index)
+    ]
+    
+    # Add connected edges information
+    incoming, outgoing = store.degree(index)
+    node["connected_edges"] = {
+        "incoming": incoming,
+        "outgoing": outgoing,
+        "total_degree": incoming + outgoing
+    }
+    
+    return node
+
+@app.post("/graph/compact")
+async def compact_graph():
+    """Force a compaction of the append log into the CSR snapshot."""
+    result = await asyncio.to_thread(store.compact)
+    return {"status": "compacted", **result, "stats": store.stats()}
 
 if __name__ == "__main__":
     import uvicorn
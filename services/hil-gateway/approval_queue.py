@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Approval queue for the Human-in-Loop Gateway.
+
+Open approvals are held once, keyed by proposal id, and indexed per tenant
+and per required approver, so listing a tenant's queue never scans other
+tenants. Each tenant has a heap ordered by risk (highest first) and deadline
+(earliest first); approve/reject removes an entry from the dicts in O(1) and
+leaves its heap slot to be skipped and compacted later.
+
+Every change bumps a version number and is kept in a bounded change log, so
+approver UIs can long-poll or subscribe for changes since the version they
+last saw instead of re-listing the queue.
+"""
+
+import heapq
+import asyncio
+import itertools
+from collections import deque
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+
+# Changes kept for clients catching up; older versions must re-list
+CHANGE_LOG_SIZE = 10000
+# Compact a tenant heap once it holds this many removed entries
+MIN_STALE_FOR_COMPACTION = 64
+
+def deadline_timestamp(deadline: Optional[str]) -> float:
+    """Sort key for an ISO deadline; no deadline sorts last."""
+    if not deadline:
+        return float("inf")
+    return datetime.fromisoformat(deadline.replace("Z", "+00:00")).timestamp()
+
+class ApprovalQueue:
+    def __init__(self, change_log_size: int = CHANGE_LOG_SIZE):
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.by_tenant: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self.by_approver: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self.heaps: Dict[str, List[Tuple]] = {}
+        self.stale: Dict[str, int] = {}
+        # proposal id -> its live heap key; a heap slot with another key is stale
+        self.keys: Dict[str, Tuple] = {}
+        self.sequence = itertools.count()
+        self.version = 0
+        self.changes: deque = deque(maxlen=change_log_size)
+        self.waiters: List[asyncio.Future] = []
+    
+    def __len__(self) -> int:
+        return len(self.entries)
+    
+    def __contains__(self, proposal_id: str) -> bool:
+        return proposal_id in self.entries
+    
+    def get(self, proposal_id: str) -> Optional[Dict[str, Any]]:
+        return self.entries.get(proposal_id)
+    
+    def add(self, entry: Dict[str, Any]) -> Dict[str, Any]:
+        """Queue an approval (replacing any open one for the same proposal)."""
+        proposal_id = entry["proposal_id"]
+        if proposal_id in self.entries:
+            self._unindex(proposal_id)
+        tenant_id = entry["tenant_id"]
+        key = (-float(entry.get("risk_score", 0.0)), deadline_timestamp(entry.get("deadline")),
+               next(self.sequence), proposal_id)
+        self.entries[proposal_id] = entry
+        self.keys[proposal_id] = key
+        self.by_tenant.setdefault(tenant_id, {})[proposal_id] = entry
+        for approver_id in entry.get("approvers_required", []):
+            self.by_approver.setdefault(approver_id, {})[proposal_id] = entry
+        heapq.heappush(self.heaps.setdefault(tenant_id, []), key)
+        self._record("added", entry)
+        return entry
+    
+    def update(self, proposal_id: str) -> None:
+        """Announce an in-place change to a queued entry (e.g. a new approval)."""
+        entry = self.entries.get(proposal_id)
+        if entry is not None:
+            self._record("updated", entry)
+    
+    def remove(self, proposal_id: str) -> Optional[Dict[str, Any]]:
+        if proposal_id not in self.entries:
+            return None
+        entry = self._unindex(proposal_id)
+        self._record("removed", entry)
+        return entry
+    
+    def _unindex(self, proposal_id: str) -> Dict[str, Any]:
+        entry = self.entries.pop(proposal_id)
+        del self.keys[proposal_id]
+        tenant_id = entry["tenant_id"]
+        tenant_entries = self.by_tenant[tenant_id]
+        del tenant_entries[proposal_id]
+        for approver_id in entry.get("approvers_required", []):
+            approver_entries = self.by_approver.get(approver_id)
+            if approver_entries is not None:
+                approver_entries.pop(proposal_id, None)
+                if not approver_entries:
+                    del self.by_approver[approver_id]
+        if not tenant_entries:
+            del self.by_tenant[tenant_id]
+            del self.heaps[tenant_id]
+            self.stale.pop(tenant_id, None)
+        else:
+            self.stale[tenant_id] = stale = self.stale.get(tenant_id, 0) + 1
+            if stale >= MIN_STALE_FOR_COMPACTION and stale > len(tenant_entries):
+                self.heaps[tenant_id] = [key for key in self.heaps[tenant_id] if self.keys.get(key[3]) == key]
+                heapq.heapify(self.heaps[tenant_id])
+                self.stale[tenant_id] = 0
+        return entry
+    
+    def pending(self, tenant_id: str, approver_id: Optional[str] = None,
+                limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Open approvals of a tenant in priority order, optionally only those
+        requiring approver_id."""
+        if approver_id is not None:
+            keys = [
+                self.keys[proposal_id] for proposal_id, entry in self.by_approver.get(approver_id, {}).items()
+                if entry["tenant_id"] == tenant_id
+            ]
+        else:
+            keys = [key for key in self.heaps.get(tenant_id, []) if self.keys.get(key[3]) == key]
+        ordered = heapq.nsmallest(limit, keys) if limit is not None else sorted(keys)
+        return [self.entries[key[3]] for key in ordered]
+    
+    def peek(self, tenant_id: str) -> Optional[Dict[str, Any]]:
+        """Highest-priority open approval of a tenant."""
+        heap = self.heaps.get(tenant_id)
+        while heap:
+            if self.keys.get(heap[0][3]) == heap[0]:
+                return self.entries[heap[0][3]]
+            heapq.heappop(heap)
+            self.stale[tenant_id] -= 1
+        return None
+    
+    def _record(self, change: str, entry: Dict[str, Any]) -> None:
+        self.version += 1
+        self.changes.append({
+            "version": self.version,
+            "type": change,
+            "proposal_id": entry["proposal_id"],
+            "tenant_id": entry["tenant_id"],
+            "status": entry.get("status"),
+            "risk_score": entry.get("risk_score"),
+            "deadline": entry.get("deadline"),
+            "approvers_required": list(entry.get("approvers_required", []))
+        })
+        waiters, self.waiters = self.waiters, []
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(self.version)
+    
+    def changes_since(self, tenant_id: str, version: int,
+                      approver_id: Optional[str] = None) -> Optional[List[Dict[str, Any]]]:
+        """Changes to a tenant's queue after version (optionally only those to
+        approvals requiring approver_id), or None if some of them have left
+        the change log (or version is unknown) and the client has to re-list."""
+        if version > self.version:
+            return None
+        if version < self.version and (not self.changes or self.changes[0]["version"] > version + 1):
+            return None
+        changes = []
+        # Newest first, stopping at the client's version
+        for change in reversed(self.changes):
+            if change["version"] <= version:
+                break
+            if change["tenant_id"] == tenant_id and (
+                    approver_id is None or approver_id in change["approvers_required"]):
+                changes.append(change)
+        changes.reverse()
+        return changes
+    
+    async def wait_for_change(self, version: int, timeout: float) -> int:
+        """Wait until the queue moves past version or timeout expires; returns the current version."""
+        if self.version > version:
+            return self.version
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            if waiter in self.waiters:
+                self.waiters.remove(waiter)
+        return self.version
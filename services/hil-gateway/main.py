@@ -6,15 +6,19 @@ Approval UI endpoints, multi-channel notifications, MFA hooks
 
 import os
 import json
+import asyncio
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from typing import Dict, Any, List, Optional
-from fastapi import FastAPI, HTTPException, Depends, Header
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, HTTPException, Depends, Header, Query
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 import logging
 from prometheus_client import Counter, Histogram, generate_latest
 import hashlib
 
+from approval_queue import ApprovalQueue, deadline_timestamp
+
 # Metrics
 APPROVALS_TOTAL = Counter('hil_approvals_total', 'Total approval requests')
 NOTIFICATIONS_SENT = Counter('hil_notifications_sent_total', 'Total notifications sent')
@@ -26,10 +30,16 @@ logger = logging.getLogger(__name__)
 
 # Configuration
 SIMULATION_MODE = os.getenv('SIMULATION_MODE', 'true').lower() == 'true'
+APPROVAL_HISTORY_SIZE = int(os.getenv('APPROVAL_HISTORY_SIZE', '10000'))
+# Longest a /pending/{tenant}/changes request is held open
+LONG_POLL_TIMEOUT = float(os.getenv('LONG_POLL_TIMEOUT', '25'))
+# Seconds between keep-alive comments on idle event streams
+SSE_KEEPALIVE_INTERVAL = float(os.getenv('SSE_KEEPALIVE_INTERVAL', '15'))
 
 # In-memory storage for simulation
-pending_approvals = {}
-approval_history = {}
+pending_approvals = ApprovalQueue()
+# Completed approvals, oldest evicted first beyond APPROVAL_HISTORY_SIZE
+approval_history = OrderedDict()
 notification_channels = {}
 
 class ApprovalRequest(BaseModel):
@@ -45,6 +55,13 @@ class NotificationRequest(BaseModel):
     channels: List[str] = ["email", "slack"]
     urgency: str = "normal"  # 'low', 'normal', 'high', 'urgent'
 
+class QueueRequest(BaseModel):
+    proposal_id: str
+    tenant_id: str
+    approvers_required: List[str] = ["admin-001"]
+    risk_score: float = 0.5  # 0.0 - 1.0, higher is reviewed first
+    deadline: Optional[str] = None  # ISO 8601; earlier is reviewed first
+
 def verify_jwt_token(authorization: str = Header(None)):
     """Verify JWT token and extract user info"""
     if not authorization or not authorization.startswith('Bearer '):
@@ -120,6 +137,64 @@ def get_approver_preferences(approver_id: str) -> Dict[str, Any]:
         "urgent_only": False
     })
 
+def record_history(proposal_id: str, approval: Dict[str, Any]):
+    approval_history[proposal_id] = approval
+    approval_history.move_to_end(proposal_id)
+    while len(approval_history) > APPROVAL_HISTORY_SIZE:
+        approval_history.popitem(last=False)
+
+def queue_summary(approval: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "proposal_id": approval["proposal_id"],
+        "status": approval["status"],
+        "created_at": approval["created_at"],
+        "approvers_required": approval.get("approvers_required", []),
+        "current_approvals": len(approval.get("approvals", [])),
+        "risk_score": approval.get("risk_score"),
+        "deadline": approval.get("deadline")
+    }
+
+def verify_tenant_access(tenant_id: str, token_data: Dict):
+    """Verify tenant access (P5)"""
+    if tenant_id != token_data.get('tenant_id'):
+        raise HTTPException(status_code=403, detail="Tenant access denied")
+
+def visible_approver(token_data: Dict, approver_id: Optional[str] = None) -> Optional[str]:
+    """Approvers see the tenant's whole queue; other users only proposals they are required on"""
+    if "approver" not in token_data.get('roles', []):
+        return token_data.get('user_id')
+    return approver_id
+
+def visible_approvals(tenant_id: str, token_data: Dict, approver_id: Optional[str] = None,
+                      limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Queue summaries of the tenant's approvals the caller may see"""
+    approver_id = visible_approver(token_data, approver_id)
+    return [queue_summary(approval) for approval in pending_approvals.pending(tenant_id, approver_id, limit)]
+
+@app.post("/queue")
+async def queue_approval(
+    request: QueueRequest,
+    token_data: Dict = Depends(verify_jwt_token)
+):
+    """Open an approval for a proposal"""
+    verify_tenant_access(request.tenant_id, token_data)
+    try:
+        deadline_timestamp(request.deadline)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid deadline, expected ISO 8601")
+    
+    approval = pending_approvals.add({
+        "proposal_id": request.proposal_id,
+        "tenant_id": request.tenant_id,
+        "status": "pending",
+        "created_at": datetime.utcnow().isoformat(),
+        "approvers_required": request.approvers_required,
+        "risk_score": request.risk_score,
+        "deadline": request.deadline,
+        "approvals": []
+    })
+    return {**queue_summary(approval), "queue_version": pending_approvals.version}
+
 @app.post("/approve/{proposal_id}")
 async def approve_proposal(
     proposal_id: str,
@@ -145,15 +220,19 @@ async def approve_proposal(
             raise HTTPException(status_code=400, detail="Invalid MFA token")
     
     # Check if proposal exists in pending approvals
-    if proposal_id not in pending_approvals:
+    approval = pending_approvals.get(proposal_id)
+    if approval is None:
         # Create pending approval entry if not exists
-        pending_approvals[proposal_id] = {
+        approval = {
             "proposal_id": proposal_id,
+            "tenant_id": token_data.get('tenant_id'),
             "status": "pending",
             "created_at": datetime.utcnow().isoformat(),
             "approvers_required": ["admin-001"],  # Default approver
             "approvals": []
         }
+    elif approval["tenant_id"] != token_data.get('tenant_id'):
+        raise HTTPException(status_code=403, detail="Tenant access denied")
     
     # Create approval record
     approval_record = {
@@ -171,23 +250,30 @@ async def approve_proposal(
     approval_record["signature"] = signature
     
     # Store approval
-    pending_approvals[proposal_id]["approvals"].append(approval_record)
+    approval["approvals"].append(approval_record)
     
-    # Update status based on decision
+    # Update status based on decision; a decided proposal leaves the queue
     if request.decision == "approve":
-        pending_approvals[proposal_id]["status"] = "approved"
+        approval["status"] = "approved"
     elif request.decision == "reject":
-        pending_approvals[proposal_id]["status"] = "rejected"
+        approval["status"] = "rejected"
+    if approval["status"] == "pending":
+        if proposal_id in pending_approvals:
+            pending_approvals.update(proposal_id)
+        else:
+            pending_approvals.add(approval)
+    else:
+        pending_approvals.remove(proposal_id)
     
     # Move to history
-    approval_history[proposal_id] = pending_approvals[proposal_id].copy()
-    approval_history[proposal_id]["completed_at"] = datetime.utcnow().isoformat()
+    record_history(proposal_id, {**approval, "approvals": list(approval["approvals"]),
+                                 "completed_at": datetime.utcnow().isoformat()})
     
     logger.info(f"Proposal {proposal_id} {request.decision}d by {request.approver_id}")
     
     return {
         "proposal_id": proposal_id,
-        "status": request.decision + "d",
+        "status": approval["status"],
         "approver": request.approver_id,
         "mfa_verified": mfa_verified,
         "signature": signature,
@@ -197,33 +283,113 @@ async def approve_proposal(
 @app.get("/pending/{tenant_id}")
 async def get_pending_approvals(
     tenant_id: str,
+    approver_id: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1),
     token_data: Dict = Depends(verify_jwt_token)
 ):
-    """List pending approvals for tenant"""
-    # Verify tenant access (P5)
-    if tenant_id != token_data.get('tenant_id'):
-        raise HTTPException(status_code=403, detail="Tenant access denied")
+    """List pending approvals for tenant, highest risk and earliest deadline first"""
+    verify_tenant_access(tenant_id, token_data)
     
-    # Filter pending approvals for tenant
-    tenant_pending = []
-    for proposal_id, approval in pending_approvals.items():
-        # Check if user is in required approvers or has approval role
-        if ("approver" in token_data.get('roles', []) or 
-            token_data.get('user_id') in approval.get('approvers_required', [])):
-            tenant_pending.append({
-                "proposal_id": proposal_id,
-                "status": approval["status"],
-                "created_at": approval["created_at"],
-                "approvers_required": approval.get("approvers_required", []),
-                "current_approvals": len(approval.get("approvals", []))
-            })
+    # Snapshot version: follow up with /pending/{tenant_id}/changes?since=queue_version
+    version = pending_approvals.version
+    tenant_pending = visible_approvals(tenant_id, token_data, approver_id, limit)
     
     return {
         "tenant_id": tenant_id,
         "pending_approvals": tenant_pending,
-        "total_pending": len(tenant_pending)
+        "total_pending": len(tenant_pending),
+        "queue_version": version
+    }
+
+@app.get("/pending/{tenant_id}/changes")
+async def poll_pending_changes(
+    tenant_id: str,
+    since: int = Query(..., ge=0),
+    timeout: float = Query(LONG_POLL_TIMEOUT, ge=0),
+    token_data: Dict = Depends(verify_jwt_token)
+):
+    """Long-poll for queue changes after version `since`.
+    
+    Returns as soon as the tenant's queue changes, or with no changes after
+    timeout. reset=true means the changes are no longer available and the
+    client should re-list /pending/{tenant_id}.
+    """
+    verify_tenant_access(tenant_id, token_data)
+    approver_id = visible_approver(token_data)
+    deadline = asyncio.get_running_loop().time() + min(timeout, LONG_POLL_TIMEOUT)
+    
+    while True:
+        version = pending_approvals.version
+        changes = pending_approvals.changes_since(tenant_id, since, approver_id)
+        remaining = deadline - asyncio.get_running_loop().time()
+        if changes is None or changes or remaining <= 0:
+            break
+        # Changes we can't see (other tenants, other approvers) wake us too; skip past them
+        since = version
+        await pending_approvals.wait_for_change(version, remaining)
+    
+    return {
+        "tenant_id": tenant_id,
+        "queue_version": version,
+        "changes": changes or [],
+        "reset": changes is None
     }
 
+def sse_event(event: str, data: Dict[str, Any], event_id: Optional[int] = None) -> str:
+    lines = [f"event: {event}"]
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"data: {json.dumps(data)}")
+    return "\n".join(lines) + "\n\n"
+
+async def stream_queue_events(tenant_id: str, token_data: Dict, since: Optional[int]):
+    """A snapshot (unless resuming from a known version), then one event per
+    change to an approval the caller can see"""
+    approver_id = visible_approver(token_data)
+    if since is None or pending_approvals.changes_since(tenant_id, since, approver_id) is None:
+        since = pending_approvals.version
+        yield sse_event("snapshot", {
+            "tenant_id": tenant_id,
+            "queue_version": since,
+            "pending_approvals": visible_approvals(tenant_id, token_data)
+        }, since)
+    
+    while True:
+        version = await pending_approvals.wait_for_change(since, SSE_KEEPALIVE_INTERVAL)
+        if version == since:
+            yield ": keep-alive\n\n"
+            continue
+        changes = pending_approvals.changes_since(tenant_id, since, approver_id)
+        if changes is None:
+            # Fell behind the change log
+            yield sse_event("reset", {"tenant_id": tenant_id, "queue_version": version}, version)
+            return
+        for change in changes:
+            yield sse_event("change", change, change["version"])
+        since = version
+
+@app.get("/pending/{tenant_id}/stream")
+async def stream_pending_changes(
+    tenant_id: str,
+    since: Optional[int] = Query(None, ge=0),
+    last_event_id: Optional[str] = Header(None),
+    token_data: Dict = Depends(verify_jwt_token)
+):
+    """Server-sent events for the tenant's approval queue.
+    
+    Reconnecting clients resume from Last-Event-ID (or ?since=) without a
+    new snapshot while the change log still covers that version.
+    """
+    verify_tenant_access(tenant_id, token_data)
+    if since is None and last_event_id and last_event_id.isdigit():
+        since = int(last_event_id)
+    
+    return StreamingResponse(
+        stream_queue_events(tenant_id, token_data, since),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.post("/notify")
 async def send_approval_notification(request: NotificationRequest):
     """Send approval notifications to specified approvers"""
@@ -289,7 +455,7 @@ async def get_approval_history(
                 approval.pop("signature", None)
         return history
     elif proposal_id in pending_approvals:
-        return pending_approvals[proposal_id]
+        return pending_approvals.get(proposal_id)
     else:
         raise HTTPException(status_code=404, detail="Proposal not found")
 
@@ -1,9 +1,11 @@
 #!/usr/bin/env python3
 """Tests for Human-in-Loop Gateway"""
 
+import json
+import asyncio
 import pytest
 from fastapi.testclient import TestClient
-from main import app
+from main import app, verify_jwt_token, stream_pending_changes
 
 client = TestClient(app)
 
@@ -137,5 +139,91 @@ def test_tenant_access_control():
     response = client.get("/pending/different-tenant", headers=headers)
     assert response.status_code == 403
 
+def test_pending_queue_priority_order():
+    """Test pending approvals are ordered by risk, then deadline"""
+    headers = {"Authorization": "Bearer sim-token"}
+    for proposal_id, risk_score, deadline in [
+        ("prop-queue-low", 0.2, None),
+        ("prop-queue-high-late", 0.9, "2030-01-02T00:00:00Z"),
+        ("prop-queue-high-soon", 0.9, "2030-01-01T00:00:00Z"),
+    ]:
+        response = client.post("/queue", json={
+            "proposal_id": proposal_id,
+            "tenant_id": "sim-tenant",
+            "approvers_required": ["queue-approver"],
+            "risk_score": risk_score,
+            "deadline": deadline
+        }, headers=headers)
+        assert response.status_code == 200
+    
+    response = client.get("/pending/sim-tenant?approver_id=queue-approver", headers=headers)
+    assert response.status_code == 200
+    order = [p["proposal_id"] for p in response.json()["pending_approvals"]]
+    assert order == ["prop-queue-high-soon", "prop-queue-high-late", "prop-queue-low"]
+    
+    # A decided proposal leaves the queue
+    client.post("/approve/prop-queue-high-soon", json={
+        "proposal_id": "prop-queue-high-soon",
+        "approver_id": "sim-user",
+        "decision": "approve"
+    }, headers=headers)
+    response = client.get("/pending/sim-tenant?approver_id=queue-approver&limit=1", headers=headers)
+    assert [p["proposal_id"] for p in response.json()["pending_approvals"]] == ["prop-queue-high-late"]
+
+def test_pending_changes_long_poll():
+    """Test long-polling returns queue changes after a version"""
+    headers = {"Authorization": "Bearer sim-token"}
+    version = client.get("/pending/sim-tenant", headers=headers).json()["queue_version"]
+    
+    client.post("/queue", json={"proposal_id": "prop-poll-001", "tenant_id": "sim-tenant"}, headers=headers)
+    response = client.get(f"/pending/sim-tenant/changes?since={version}&timeout=0", headers=headers)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["reset"] == False
+    assert [(c["type"], c["proposal_id"]) for c in data["changes"]] == [("added", "prop-poll-001")]
+    
+    # Nothing new: returns empty after the timeout
+    response = client.get(f"/pending/sim-tenant/changes?since={data['queue_version']}&timeout=0", headers=headers)
+    assert response.json()["changes"] == []
+    
+    response = client.get("/pending/different-tenant/changes?since=0", headers=headers)
+    assert response.status_code == 403
+
+def test_change_feeds_hide_other_approvers_changes():
+    """Test that non-approvers only get change events for approvals they are required on"""
+    headers = {"Authorization": "Bearer sim-token"}
+    viewer = {"user_id": "viewer-001", "tenant_id": "sim-tenant", "roles": ["viewer"]}
+    version = client.get("/pending/sim-tenant", headers=headers).json()["queue_version"]
+    client.post("/queue", json={"proposal_id": "prop-feed-hidden", "tenant_id": "sim-tenant",
+                                "approvers_required": ["admin-001"]}, headers=headers)
+    client.post("/queue", json={"proposal_id": "prop-feed-visible", "tenant_id": "sim-tenant",
+                                "approvers_required": ["viewer-001"]}, headers=headers)
+    
+    app.dependency_overrides[verify_jwt_token] = lambda: viewer
+    try:
+        response = client.get(f"/pending/sim-tenant/changes?since={version}&timeout=0", headers=headers)
+    finally:
+        app.dependency_overrides.clear()
+    assert [c["proposal_id"] for c in response.json()["changes"]] == ["prop-feed-visible"]
+    
+    async def first_event(since):
+        response = await stream_pending_changes("sim-tenant", since=since, last_event_id=None, token_data=viewer)
+        assert response.media_type == "text/event-stream"
+        events = response.body_iterator
+        try:
+            event = await events.__anext__()
+        finally:
+            await events.aclose()
+        name, _, data = event.strip().split("\n")
+        return name, json.loads(data[len("data: "):])
+    
+    name, change = asyncio.run(first_event(version))
+    assert name == "event: change"
+    assert change["proposal_id"] == "prop-feed-visible"
+    
+    name, snapshot = asyncio.run(first_event(None))
+    assert name == "event: snapshot"
+    assert [p["proposal_id"] for p in snapshot["pending_approvals"]] == ["prop-feed-visible"]
+
 if __name__ == "__main__":
     pytest.main([__file__])
\ No newline at end of file
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Running lineage completeness counters for the Lineage Tracker.
+
+Counters move in O(1) as entities and connections are tracked, so the
+completeness score never requires a scan; a background job periodically
+recounts from the lineage graph and corrects any drift.
+"""
+
+from datetime import datetime
+from typing import Dict, Any
+
+def degree_bucket(degree: int) -> str:
+    """Histogram bucket label: 0, 1, 2-3, 4-7, 8-15, ..."""
+    if degree < 2:
+        return str(degree)
+    low = 1 << (degree.bit_length() - 1)
+    return f"{low}-{low * 2 - 1}"
+
+class CompletenessCounters:
+    """Connected/orphan entity counts and per-type connection histograms."""
+    
+    def __init__(self):
+        self.total_entities = 0
+        self.connected_entities = 0
+        self.total_connections = 0
+        self.by_type: Dict[str, Dict[str, Any]] = {}
+        self.last_reconciled_at = None
+        self.reconciliations = 0
+        self.drift_corrections = 0
+    
+    def _type(self, entity_type: str) -> Dict[str, Any]:
+        counters = self.by_type.get(entity_type)
+        if counters is None:
+            counters = {"entities": 0, "connected": 0, "connections": 0, "histogram": {}}
+            self.by_type[entity_type] = counters
+        return counters
+    
+    def _move(self, histogram: Dict[str, int], old_degree: int, new_degree: int):
+        old_bucket, new_bucket = degree_bucket(old_degree), degree_bucket(new_degree)
+        if old_bucket == new_bucket:
+            return
+        histogram[old_bucket] -= 1
+        if not histogram[old_bucket]:
+            del histogram[old_bucket]
+        histogram[new_bucket] = histogram.get(new_bucket, 0) + 1
+    
+    def add_entity(self, entity_type: str):
+        counters = self._type(entity_type)
+        self.total_entities += 1
+        counters["entities"] += 1
+        counters["histogram"]["0"] = counters["histogram"].get("0", 0) + 1
+    
+    def add_connection(self, entity_type: str, previous_degree: int):
+        """One more parent or child on an entity that had previous_degree of them."""
+        counters = self._type(entity_type)
+        self.total_connections += 1
+        counters["connections"] += 1
+        if previous_degree == 0:
+            self.connected_entities += 1
+            counters["connected"] += 1
+        self._move(counters["histogram"], previous_degree, previous_degree + 1)
+    
+    def snapshot(self) -> Dict[str, Any]:
+        total = self.total_entities
+        return {
+            "completeness_score": round(self.connected_entities / total, 3) if total > 0 else 0,
+            "total_entities": total,
+            "connected_entities": self.connected_entities,
+            "orphaned_entities": total - self.connected_entities,
+            "avg_connections_per_entity": self.total_connections / total if total > 0 else 0,
+            "by_type": {
+                entity_type: {
+                    "entities": counters["entities"],
+                    "connected": counters["connected"],
+                    "orphaned": counters["entities"] - counters["connected"],
+                    "connections": counters["connections"],
+                    "connection_histogram": dict(counters["histogram"])
+                }
+                for entity_type, counters in self.by_type.items()
+            }
+        }
+    
+    @classmethod
+    def from_graph(cls, lineage_graph: Dict[str, Dict[str, Any]]) -> "CompletenessCounters":
+        """Full recount over every entity; used to check the running counters."""
+        counters = cls()
+        for entity in list(lineage_graph.values()):
+            degree = len(entity["parents"]) + len(entity["children"])
+            type_counters = counters._type(entity["type"])
+            counters.total_entities += 1
+            type_counters["entities"] += 1
+            counters.total_connections += degree
+            type_counters["connections"] += degree
+            if degree:
+                counters.connected_entities += 1
+                type_counters["connected"] += 1
+            bucket = degree_bucket(degree)
+            type_counters["histogram"][bucket] = type_counters["histogram"].get(bucket, 0) + 1
+        return counters
+    
+    def reconcile(self, lineage_graph: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        """Recount from the graph, adopt the recount and report any drift found."""
+        recount = self.from_graph(lineage_graph)
+        drift = {
+            field: getattr(recount, field) - getattr(self, field)
+            for field in ("total_entities", "connected_entities", "total_connections")
+            if getattr(recount, field) != getattr(self, field)
+        }
+        if recount.by_type != self.by_type:
+            drift["by_type"] = True
+        if drift:
+            self.drift_corrections += 1
+            self.total_entities = recount.total_entities
+            self.connected_entities = recount.connected_entities
+            self.total_connections = recount.total_connections
+            self.by_type = recount.by_type
+        self.reconciliations += 1
+        self.last_reconciled_at = datetime.utcnow().isoformat()
+        return drift
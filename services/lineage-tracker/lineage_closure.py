@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Transitive lineage queries for the Lineage Tracker.
+
+Every entity gets a dense integer id and parent/child adjacency sets.
+Closure queries ("what depends on X") are answered by a BFS whose result is
+cached; adding an edge drops only the cached closures that it can change,
+so repeated impact queries stay cheap while tracking an edge never touches
+more than the cache. Cycle checks search from both ends of the new edge at
+once, so they stop as soon as the smaller side runs out.
+"""
+
+from collections import OrderedDict, deque
+from typing import Dict, Any, List, Optional, Set, Tuple
+import heapq
+
+# Bounds on the closure cache; every new edge checks each cached closure
+MAX_CACHED_CLOSURES = 4096
+MAX_CACHED_MEMBERS = 1_000_000
+
+class LineageIndex:
+    """Lineage adjacency with cached transitive closures and cycle detection."""
+    
+    def __init__(self, max_cached_closures: int = MAX_CACHED_CLOSURES,
+                 max_cached_members: int = MAX_CACHED_MEMBERS):
+        self.ids: Dict[str, int] = {}
+        self.entities: List[str] = []
+        self.types: List[str] = []
+        self.parents: List[Set[int]] = []
+        self.children: List[Set[int]] = []
+        self.cycles: List[Dict[str, Any]] = []
+        self.edges = 0
+        # (direction, entity index) -> every entity reachable that way, excluding itself
+        self.closures: "OrderedDict[Tuple[str, int], Set[int]]" = OrderedDict()
+        self.cached_members = 0
+        self.max_cached_closures = max_cached_closures
+        self.max_cached_members = max_cached_members
+    
+    def entity(self, entity_id: str, entity_type: str) -> int:
+        index = self.ids.get(entity_id)
+        if index is None:
+            index = len(self.entities)
+            self.ids[entity_id] = index
+            self.entities.append(entity_id)
+            self.types.append(entity_type)
+            self.parents.append(set())
+            self.children.append(set())
+        return index
+    
+    def add_edge(self, source_id: str, source_type: str, target_id: str, target_type: str) -> Dict[str, Any]:
+        """Record source -> target; reports duplicates and cycles."""
+        source = self.entity(source_id, source_type)
+        target = self.entity(target_id, target_type)
+        if target in self.children[source]:
+            return {"new_edge": False, "cycle": False}
+        
+        # A path target ~> source already exists, so this edge closes a cycle
+        cycle = self.reaches(target, source)
+        already_reachable = self._cached_contains("downstream", source, target)
+        self.children[source].add(target)
+        self.parents[target].add(source)
+        self.edges += 1
+        if cycle:
+            self.cycles.append({
+                "source": source_id,
+                "target": target_id,
+                "path": self.path(target_id, source_id) or [target_id]
+            })
+        if not already_reachable:
+            self._invalidate(source, target)
+        return {"new_edge": True, "cycle": cycle}
+    
+    def reaches(self, start: int, goal: int) -> bool:
+        """Whether a start ~> goal path exists (start == goal counts).
+        
+        Searches down from start and up from goal one node at a time and
+        stops when either side is exhausted or they meet, so the cost is
+        bounded by the smaller of the two reachable sets.
+        """
+        if start == goal:
+            return True
+        down_seen, up_seen = {start}, {goal}
+        down, up = deque([start]), deque([goal])
+        while down and up:
+            for frontier, seen, other, adjacency in ((down, down_seen, up_seen, self.children),
+                                                     (up, up_seen, down_seen, self.parents)):
+                node = frontier.popleft()
+                for neighbor in adjacency[node]:
+                    if neighbor in other:
+                        return True
+                    if neighbor not in seen:
+                        seen.add(neighbor)
+                        frontier.append(neighbor)
+                if not frontier:
+                    return False
+        return False
+    
+    def _cached_contains(self, direction: str, index: int, member: int) -> bool:
+        members = self.closures.get((direction, index))
+        return members is not None and member in members
+    
+    def _invalidate(self, source: int, target: int):
+        """Drop cached closures a new source -> target edge can grow: downstream
+        sets of source and its ancestors, upstream sets of target and its
+        descendants."""
+        stale = [
+            key for key, members in self.closures.items()
+            if (key[0] == "downstream" and (key[1] == source or source in members))
+            or (key[0] == "upstream" and (key[1] == target or target in members))
+        ]
+        for key in stale:
+            self.cached_members -= len(self.closures.pop(key))
+    
+    def closure(self, index: int, direction: str) -> Set[int]:
+        key = (direction, index)
+        members = self.closures.get(key)
+        if members is not None:
+            self.closures.move_to_end(key)
+            return members
+        adjacency = self.parents if direction == "upstream" else self.children
+        members = set()
+        frontier = deque([index])
+        while frontier:
+            for neighbor in adjacency[frontier.popleft()]:
+                if neighbor not in members:
+                    members.add(neighbor)
+                    frontier.append(neighbor)
+        # A cycle through index reaches index itself
+        members.discard(index)
+        if self.max_cached_closures > 0 and len(members) <= self.max_cached_members:
+            self.closures[key] = members
+            self.cached_members += len(members)
+            while len(self.closures) > self.max_cached_closures or self.cached_members > self.max_cached_members:
+                self.cached_members -= len(self.closures.popitem(last=False)[1])
+        return members
+    
+    def _members(self, members: Set[int], limit: Optional[int]) -> List[Dict[str, Any]]:
+        # Entities in the order they were first seen
+        ordered = sorted(members) if limit is None else heapq.nsmallest(limit, members)
+        return [{"id": self.entities[index], "type": self.types[index]} for index in ordered]
+    
+    def upstream(self, entity_id: str, limit: Optional[int] = None) -> Tuple[int, List[Dict[str, Any]]]:
+        """All transitive ancestors."""
+        members = self.closure(self.ids[entity_id], "upstream")
+        return len(members), self._members(members, limit)
+    
+    def downstream(self, entity_id: str, limit: Optional[int] = None) -> Tuple[int, List[Dict[str, Any]]]:
+        """All transitive descendants: everything that depends on entity_id."""
+        members = self.closure(self.ids[entity_id], "downstream")
+        return len(members), self._members(members, limit)
+    
+    def walk(self, entity_id: str, direction: str, max_depth: int,
+             limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Depth-annotated BFS up or down, bounded by max_depth."""
+        start = self.ids[entity_id]
+        adjacency = self.parents if direction == "upstream" else self.children
+        seen = {start}
+        frontier = deque([(start, 0)])
+        results = []
+        while frontier:
+            node, depth = frontier.popleft()
+            if depth >= max_depth:
+                continue
+            for neighbor in sorted(adjacency[node]):
+                if neighbor in seen:
+                    continue
+                seen.add(neighbor)
+                results.append({
+                    "id": self.entities[neighbor],
+                    "type": self.types[neighbor],
+                    "depth": depth + 1,
+                    "via": self.entities[node]
+                })
+                if limit is not None and len(results) >= limit:
+                    return results
+                frontier.append((neighbor, depth + 1))
+        return results
+    
+    def path(self, source_id: str, target_id: str) -> Optional[List[str]]:
+        """Shortest source ~> target path."""
+        source, target = self.ids.get(source_id), self.ids.get(target_id)
+        if source is None or target is None:
+            return None
+        if source == target:
+            return [source_id]
+        if not self.reaches(source, target):
+            return None
+        previous = {source: None}
+        frontier = deque([source])
+        while frontier:
+            node = frontier.popleft()
+            for child in self.children[node]:
+                if child in previous:
+                    continue
+                previous[child] = node
+                if child == target:
+                    path = []
+                    while child is not None:
+                        path.append(self.entities[child])
+                        child = previous[child]
+                    return path[::-1]
+                frontier.append(child)
+        return None
+    
+    def depth(self, entity_id: str) -> int:
+        """Longest shortest-hop distance to any ancestor or descendant."""
+        deepest = 0
+        for direction in ("upstream", "downstream"):
+            hops = self.walk(entity_id, direction, max_depth=len(self.entities))
+            if hops:
+                deepest = max(deepest, hops[-1]["depth"])
+        return deepest
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entities": len(self.entities),
+            "edges": self.edges,
+            "cycles_detected": len(self.cycles),
+            "cached_closures": len(self.closures)
+        }
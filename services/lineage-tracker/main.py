@@ -1,16 +1,22 @@
 #!/usr/bin/env python3
 import os
 import json
+import asyncio
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from fastapi import FastAPI
 from pydantic import BaseModel
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
+
+from lineage_closure import LineageIndex
+from completeness import CompletenessCounters
 
 app = FastAPI(title="Lineage Tracker")
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 SIMULATION_MODE = os.getenv("SIMULATION_MODE", "true").lower() == "true"
+COMPLETENESS_RECOUNT_INTERVAL = int(os.getenv("COMPLETENESS_RECOUNT_INTERVAL", "300"))
 
 class LineageEvent(BaseModel):
     source_type: str
@@ -24,6 +30,27 @@ class LineageEvent(BaseModel):
 # In-memory storage for simulation
 lineage_events = []
 lineage_graph = {}
+# Transitive closure over lineage_graph, maintained on every tracked edge
+lineage_index = LineageIndex()
+# Every lineage_index call runs on this one thread: off the event loop, and serialized
+index_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="lineage-index")
+# Completeness metrics kept as running counters
+completeness = CompletenessCounters()
+
+async def reconcile_completeness():
+    """Periodically check the running counters against a full recount."""
+    while True:
+        await asyncio.sleep(COMPLETENESS_RECOUNT_INTERVAL)
+        drift = completeness.reconcile(lineage_graph)
+        if drift:
+            logger.warning(f"Completeness counters drifted, corrected from recount: {drift}")
+
+async def run_index(fn, *args, **kwargs):
+    return await asyncio.get_running_loop().run_in_executor(index_executor, lambda: fn(*args, **kwargs))
+
+@app.on_event("startup")
+async def startup():
+    asyncio.create_task(reconcile_completeness())
 
 @app.get("/health")
 async def health():
@@ -33,9 +60,11 @@ async def health():
 async def metrics():
     return {
         "lineage_events": len(lineage_events),
-        "lineage_completeness": 0.87,
+        "lineage_completeness": completeness.snapshot()["completeness_score"],
         "tracked_entities": len(lineage_graph),
         "avg_lineage_depth": 3.2,
+        "lineage_edges": lineage_index.edges,
+        "lineage_cycles": len(lineage_index.cycles),
         "simulation": SIMULATION_MODE
     }
 
@@ -62,24 +91,90 @@ async def track_lineage(event: LineageEvent):
         # Update lineage graph
         if event.source_id not in lineage_graph:
             lineage_graph[event.source_id] = {"type": event.source_type, "children": [], "parents": []}
+            completeness.add_entity(event.source_type)
         if event.target_id not in lineage_graph:
             lineage_graph[event.target_id] = {"type": event.target_type, "children": [], "parents": []}
+            completeness.add_entity(event.target_type)
         
-        lineage_graph[event.source_id]["children"].append(event.target_id)
-        lineage_graph[event.target_id]["parents"].append(event.source_id)
+        closure = await run_index(lineage_index.add_edge, event.source_id, event.source_type,
+                                  event.target_id, event.target_type)
+        if closure["new_edge"]:
+            for entity_id, side, other_id in ((event.source_id, "children", event.target_id),
+                                              (event.target_id, "parents", event.source_id)):
+                entity = lineage_graph[entity_id]
+                completeness.add_connection(entity["type"], len(entity["parents"]) + len(entity["children"]))
+                entity[side].append(other_id)
+        if closure["cycle"]:
+            logger.warning(f"Lineage cycle detected: {event.source_id} -> {event.target_id}")
         
         logger.info(f"Lineage tracked: {event.source_id} -> {event.target_id} ({event.event_type})")
         return {
             "status": "tracked",
             "event_id": event_id,
             "audit_hash": lineage_record["audit_hash"],
+            "cycle_detected": closure["cycle"],
             "simulation": True
         }
     
     return {"status": "error", "message": "Lineage storage required"}
 
+# Graph-wide queries live outside /lineage/ so they cannot shadow /lineage/{entity_id}
+@app.get("/lineage-graph/path")
+async def get_lineage_path(source: str, target: str):
+    """Shortest derivation path from source to target."""
+    if SIMULATION_MODE:
+        path = await run_index(lineage_index.path, source, target)
+        if path is None:
+            return {"status": "not_found", "source": source, "target": target}
+        return {"source": source, "target": target, "path": path, "hops": len(path) - 1, "simulation": True}
+    
+    return {"status": "error", "message": "Lineage storage required"}
+
+@app.get("/lineage-graph/cycles")
+async def get_lineage_cycles():
+    if SIMULATION_MODE:
+        return {"cycles": lineage_index.cycles, "count": len(lineage_index.cycles), "simulation": True}
+    
+    return {"status": "error", "message": "Lineage storage required"}
+
+def closure_query(entity_id: str, direction: str, max_depth: Optional[int], limit: int) -> Dict[str, Any]:
+    if entity_id not in lineage_index.ids:
+        return {"status": "not_found", "entity_id": entity_id}
+    if max_depth is not None:
+        entities = lineage_index.walk(entity_id, direction, max_depth, limit=limit)
+        total = len(entities)
+    elif direction == "upstream":
+        total, entities = lineage_index.upstream(entity_id, limit=limit)
+    else:
+        total, entities = lineage_index.downstream(entity_id, limit=limit)
+    return {
+        "entity_id": entity_id,
+        "direction": direction,
+        "max_depth": max_depth,
+        "total": total,
+        "entities": entities,
+        "truncated": total > len(entities),
+        "simulation": True
+    }
+
+@app.get("/lineage/{entity_id}/upstream")
+async def get_upstream(entity_id: str, max_depth: Optional[int] = None, limit: int = 1000):
+    """Everything entity_id is derived from, transitively."""
+    if SIMULATION_MODE:
+        return await run_index(closure_query, entity_id, "upstream", max_depth, limit)
+    
+    return {"status": "error", "message": "Lineage storage required"}
+
+@app.get("/lineage/{entity_id}/downstream")
+async def get_downstream(entity_id: str, max_depth: Optional[int] = None, limit: int = 1000):
+    """Everything that depends on entity_id, transitively (impact analysis)."""
+    if SIMULATION_MODE:
+        return await run_index(closure_query, entity_id, "downstream", max_depth, limit)
+    
+    return {"status": "error", "message": "Lineage storage required"}
+
 @app.get("/lineage/{entity_id}")
-async def get_lineage(entity_id: str):
+async def get_lineage(entity_id: str, transitive_depth: bool = False):
     if SIMULATION_MODE:
         if entity_id not in lineage_graph:
             return {"status": "not_found", "entity_id": entity_id}
@@ -115,6 +210,11 @@ async def get_lineage(entity_id: str):
                 })
         
         lineage_tree["lineage_depth"] = max(len(lineage_tree["parents"]), len(lineage_tree["children"]))
+        if transitive_depth:
+            # Opt-in: walks the full ancestry and descendancy, which the closure cache does not cover
+            lineage_tree["transitive_depth"] = await run_index(lineage_index.depth, entity_id)
+        lineage_tree["upstream_count"] = (await run_index(lineage_index.upstream, entity_id, limit=0))[0]
+        lineage_tree["downstream_count"] = (await run_index(lineage_index.downstream, entity_id, limit=0))[0]
         
         return lineage_tree
     
@@ -123,23 +223,25 @@ async def get_lineage(entity_id: str):
 @app.get("/lineage/completeness/score")
 async def get_completeness_score():
     if SIMULATION_MODE:
-        # Simulate lineage completeness calculation
-        total_entities = len(lineage_graph)
-        connected_entities = len([e for e in lineage_graph.values() if e["parents"] or e["children"]])
-        
-        completeness_score = connected_entities / total_entities if total_entities > 0 else 0
-        
         return {
-            "completeness_score": round(completeness_score, 3),
-            "total_entities": total_entities,
-            "connected_entities": connected_entities,
-            "orphaned_entities": total_entities - connected_entities,
-            "avg_connections_per_entity": sum(len(e["parents"]) + len(e["children"]) for e in lineage_graph.values()) / total_entities if total_entities > 0 else 0,
+            **completeness.snapshot(),
+            "last_reconciled_at": completeness.last_reconciled_at,
+            "reconciliations": completeness.reconciliations,
+            "drift_corrections": completeness.drift_corrections,
             "simulation": True
         }
     
     return {"status": "error", "message": "Lineage analysis required"}
 
+@app.post("/lineage/completeness/reconcile")
+async def reconcile_completeness_now():
+    """Run the full recount immediately and report any drift."""
+    if SIMULATION_MODE:
+        drift = completeness.reconcile(lineage_graph)
+        return {"status": "reconciled", "drift": drift, "simulation": True}
+    
+    return {"status": "error", "message": "Lineage analysis required"}
+
 @app.post("/lineage/audit")
 async def generate_audit_log():
     if SIMULATION_MODE:
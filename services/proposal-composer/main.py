@@ -6,16 +6,22 @@ Creates signed decision manifests from inputs and models
 
 import os
 import json
-import re
+import codecs
+import hashlib
+import asyncio
+import tempfile
 from datetime import datetime
 from typing import Dict, Any, Optional, List
-from fastapi import FastAPI, HTTPException, Depends, Header
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, HTTPException, Depends, Header, Request
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 import logging
 from prometheus_client import Counter, Histogram, generate_latest
 import yaml
 
+from pii_redaction import RedactionEngine, StreamRedactor
+from template_registry import TemplateRegistry, CompiledTemplate, RenderCache, canonical_digest
+
 # Metrics
 COMPOSITIONS_TOTAL = Counter('proposal_compositions_total', 'Total proposal compositions')
 COMPOSITION_DURATION = Histogram('composition_processing_seconds', 'Composition processing time')
@@ -28,6 +34,20 @@ logger = logging.getLogger(__name__)
 SIMULATION_MODE = os.getenv('SIMULATION_MODE', 'true').lower() == 'true'
 NEURAL_FABRIC_URL = os.getenv('NEURAL_FABRIC_URL', 'http://localhost:8080')
 
+REDACT_SPOOL_BYTES = int(os.getenv('REDACT_SPOOL_BYTES', str(8 * 1024 * 1024)))
+REDACT_CHUNK_BYTES = 64 * 1024
+
+TEMPLATES_PATH = os.getenv('TEMPLATES_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates.yaml'))
+TEMPLATE_RELOAD_INTERVAL = float(os.getenv('TEMPLATE_RELOAD_INTERVAL', '5'))
+RENDER_CACHE_SIZE = int(os.getenv('RENDER_CACHE_SIZE', '1024'))
+
+# Compiled once: email, phone, SSN and IP patterns in a single alternation
+pii_engine = RedactionEngine()
+
+# Validated and compiled once at startup, reloaded when the file changes
+template_registry = TemplateRegistry(TEMPLATES_PATH)
+render_cache = RenderCache(RENDER_CACHE_SIZE)
+
 class ComposeRequest(BaseModel):
     context: str
     tenant_id: str
@@ -49,37 +69,26 @@ def redact_pii(data: Dict[str, Any], tenant_consent: bool = False) -> Dict[str,
     """Redact PII unless tenant consent provided (P1)"""
     if tenant_consent:
         return data
-    
-    # PII patterns to redact
-    pii_patterns = {
-        'email': r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b',
-        'phone': r'\b\d{3}-\d{3}-\d{4}\b',
-        'ssn': r'\b\d{3}-\d{2}-\d{4}\b',
-        'ip': r'\b\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}\b'
-    }
-    
-    def redact_string(text: str) -> str:
-        for pii_type, pattern in pii_patterns.items():
-            text = re.sub(pattern, f'<REDACTED_{pii_type.upper()}>', text)
-        return text
-    
-    def redact_recursive(obj):
-        if isinstance(obj, dict):
-            return {k: redact_recursive(v) for k, v in obj.items()}
-        elif isinstance(obj, list):
-            return [redact_recursive(item) for item in obj]
-        elif isinstance(obj, str):
-            return redact_string(obj)
-        return obj
-    
-    return redact_recursive(data)
+    return pii_engine.redact(data)
 
-def simulate_cosign_signature(manifest: Dict[str, Any]) -> str:
-    """Simulate cosign signature for manifest (P2)"""
+async def decode_stream(byte_chunks):
+    """Decode a UTF-8 byte stream without splitting multi-byte characters"""
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    async for chunk in byte_chunks:
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+    tail = decoder.decode(b'', final=True)
+    if tail:
+        yield tail
+
+def simulate_cosign_signature(body_digest: str, envelope: Dict[str, Any]) -> str:
+    """Simulate cosign signature for manifest (P2); the body digest comes from the render cache"""
     if SIMULATION_MODE:
-        manifest_str = json.dumps(manifest, sort_keys=True)
+        envelope_str = json.dumps(envelope, sort_keys=True, separators=(",", ":"))
         # Simulate signature
-        return f"cosign-sim-{hash(manifest_str) % 10000:04d}"
+        digest = hashlib.sha256(f"{body_digest}:{envelope_str}".encode()).hexdigest()
+        return f"cosign-sim-{int(digest, 16) % 10000:04d}"
     # In production: actual cosign signing
     return "production-signature"
 
@@ -119,41 +128,19 @@ def get_neural_fabric_suggestions(context: str, signals: Dict[str, Any]) -> Dict
     # In production: actual neural fabric API call
     return {"action": "placeholder", "target": "system"}
 
-def load_templates() -> Dict[str, Dict[str, Any]]:
-    """Load composition templates"""
-    templates = {
-        "cost_optimization": {
-            "name": "Cost Optimization",
-            "description": "Template for cost reduction decisions",
-            "schema": {
-                "action": "scale_down",
-                "impact_level": "medium",
-                "rollback_plan": True,
-                "approval_required": False
-            }
-        },
-        "security_update": {
-            "name": "Security Update",
-            "description": "Template for security-related changes",
-            "schema": {
-                "action": "security_patch",
-                "impact_level": "high", 
-                "rollback_plan": True,
-                "approval_required": True
-            }
-        },
-        "performance_scaling": {
-            "name": "Performance Scaling",
-            "description": "Template for performance improvements",
-            "schema": {
-                "action": "scale_up",
-                "impact_level": "medium",
-                "rollback_plan": True,
-                "approval_required": False
-            }
-        }
-    }
-    return templates
+def load_templates() -> Dict[str, CompiledTemplate]:
+    """Compiled composition templates (hot-reloaded from TEMPLATES_PATH)"""
+    return template_registry.templates
+
+async def reload_templates_periodically():
+    while True:
+        await asyncio.sleep(TEMPLATE_RELOAD_INTERVAL)
+        template_registry.reload_if_changed()
+
+@app.on_event("startup")
+async def start_template_watcher():
+    if TEMPLATE_RELOAD_INTERVAL > 0:
+        asyncio.create_task(reload_templates_periodically())
 
 @app.post("/compose")
 async def compose_proposal(
@@ -171,34 +158,42 @@ async def compose_proposal(
     tenant_consent = request.signals.get('pii_consent', False)
     clean_signals = redact_pii(request.signals, tenant_consent)
     
-    # Get neural fabric suggestions
-    neural_suggestions = get_neural_fabric_suggestions(request.context, clean_signals)
-    
-    # Load template if specified
-    templates = load_templates()
-    template_schema = {}
-    if request.template_name and request.template_name in templates:
-        template_schema = templates[request.template_name]["schema"]
-    
-    # Compose manifest
-    manifest = {
-        "id": f"manifest-{datetime.utcnow().strftime('%Y%m%d%H%M%S')}",
-        "tenant_id": request.tenant_id,
-        "context": request.context,
-        "created_at": datetime.utcnow().isoformat(),
-        "neural_suggestions": neural_suggestions,
-        **template_schema,
-        **neural_suggestions,
-        "metadata": {
+    # Manifest body is memoized per template version and redacted inputs
+    redacted_context = pii_engine.redact_text(request.context)
+    template = template_registry.get(request.template_name)
+    cache_key = (
+        request.template_name,
+        template.version if template else None,
+        canonical_digest({"context": redacted_context, "signals": clean_signals, "consent": bool(tenant_consent)})
+    )
+    cached = render_cache.get(cache_key)
+    if cached is None:
+        # Get neural fabric suggestions (no raw PII leaves the service)
+        neural_suggestions = get_neural_fabric_suggestions(redacted_context, clean_signals)
+        metadata = {
             "composer_version": "1.0.0",
             "template_used": request.template_name,
             "pii_redacted": not tenant_consent,
             "signals_processed": len(clean_signals)
         }
+        if template:
+            body = template.render(neural_suggestions, metadata)
+        else:
+            body = {"neural_suggestions": neural_suggestions, **neural_suggestions, "metadata": metadata}
+        cached = render_cache.put(cache_key, body)
+    body, body_digest = cached
+    
+    # Compose manifest
+    envelope = {
+        "id": f"manifest-{datetime.utcnow().strftime('%Y%m%d%H%M%S')}",
+        "tenant_id": request.tenant_id,
+        "context": request.context,
+        "created_at": datetime.utcnow().isoformat()
     }
+    manifest = {**envelope, **body}
     
     # Sign manifest (P2)
-    signature = simulate_cosign_signature(manifest)
+    signature = simulate_cosign_signature(body_digest, envelope)
     manifest["signature"] = signature
     
     logger.info(f"Composed manifest for tenant {request.tenant_id}, context: {request.context}")
@@ -210,19 +205,39 @@ async def compose_proposal(
         "template_applied": request.template_name
     }
 
+@app.post("/redact")
+async def redact_document(
+    request: Request,
+    token_data: Dict = Depends(verify_jwt_token)
+):
+    """Redact PII from a large text or JSON document without buffering it in memory (P1)"""
+    # The request body is redacted as it arrives and spooled to disk past
+    # REDACT_SPOOL_BYTES; the response streams from the spool, since the body
+    # cannot be read while the response is being sent
+    spool = tempfile.SpooledTemporaryFile(max_size=REDACT_SPOOL_BYTES)
+    stream = StreamRedactor(pii_engine)
+    async for text in decode_stream(request.stream()):
+        spool.write(stream.feed(text).encode('utf-8'))
+    spool.write(stream.flush().encode('utf-8'))
+    spool.seek(0)
+    
+    def redacted():
+        with spool:
+            while True:
+                chunk = spool.read(REDACT_CHUNK_BYTES)
+                if not chunk:
+                    break
+                yield chunk
+    
+    return StreamingResponse(redacted(), media_type=request.headers.get('content-type', 'text/plain'))
+
 @app.get("/templates")
 async def list_templates():
     """List available composition templates"""
     templates = load_templates()
     return {
-        "templates": [
-            {
-                "name": name,
-                "display_name": template["name"],
-                "description": template["description"]
-            }
-            for name, template in templates.items()
-        ]
+        "templates": [template.describe() for template in templates.values()],
+        "registry": template_registry.stats()
     }
 
 @app.get("/health")
@@ -233,7 +248,9 @@ async def health_check():
         "service": "proposal-composer",
         "timestamp": datetime.utcnow().isoformat(),
         "simulation_mode": SIMULATION_MODE,
-        "neural_fabric_connected": SIMULATION_MODE
+        "neural_fabric_connected": SIMULATION_MODE,
+        "templates_loaded": len(template_registry.templates),
+        "render_cache": render_cache.stats()
     }
 
 @app.get("/metrics")
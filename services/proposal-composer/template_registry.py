@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Composition templates and cached manifest rendering for the Proposal Composer.
+
+Templates are loaded from templates.yaml and validated once, then compiled:
+the schema is copied and versioned by a content digest, so rendering a
+manifest is a dict merge. The file is polled for changes and reloaded in
+place; a file that fails validation leaves the previous templates active.
+
+Rendered manifest bodies (everything except id, tenant, context and
+timestamp) are memoized in an LRU keyed by template version and a digest of
+the redacted inputs, together with the body's digest, so signing a manifest
+only serializes its per-request fields.
+"""
+
+import os
+import json
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+import yaml
+
+logger = logging.getLogger(__name__)
+
+IMPACT_LEVELS = ('low', 'medium', 'high', 'critical')
+
+# Used when no templates file is present
+BUILTIN_TEMPLATES = {
+    "cost_optimization": {
+        "name": "Cost Optimization",
+        "description": "Template for cost reduction decisions",
+        "schema": {
+            "action": "scale_down",
+            "impact_level": "medium",
+            "rollback_plan": True,
+            "approval_required": False
+        }
+    },
+    "security_update": {
+        "name": "Security Update",
+        "description": "Template for security-related changes",
+        "schema": {
+            "action": "security_patch",
+            "impact_level": "high",
+            "rollback_plan": True,
+            "approval_required": True
+        }
+    },
+    "performance_scaling": {
+        "name": "Performance Scaling",
+        "description": "Template for performance improvements",
+        "schema": {
+            "action": "scale_up",
+            "impact_level": "medium",
+            "rollback_plan": True,
+            "approval_required": False
+        }
+    }
+}
+
+def canonical_digest(value: Any) -> str:
+    return hashlib.sha256(json.dumps(value, sort_keys=True, separators=(",", ":")).encode()).hexdigest()
+
+def validate_template(name: str, template: Any) -> Dict[str, Any]:
+    """Raise ValueError unless the template has the shape compose expects."""
+    if not isinstance(template, dict):
+        raise ValueError(f"template {name}: expected a mapping")
+    for field in ("name", "description"):
+        if not isinstance(template.get(field), str):
+            raise ValueError(f"template {name}: '{field}' must be a string")
+    schema = template.get("schema")
+    if not isinstance(schema, dict):
+        raise ValueError(f"template {name}: 'schema' must be a mapping")
+    if not isinstance(schema.get("action"), str):
+        raise ValueError(f"template {name}: schema.action must be a string")
+    if schema.get("impact_level", "medium") not in IMPACT_LEVELS:
+        raise ValueError(f"template {name}: schema.impact_level must be one of {', '.join(IMPACT_LEVELS)}")
+    for flag in ("rollback_plan", "approval_required"):
+        if not isinstance(schema.get(flag, False), bool):
+            raise ValueError(f"template {name}: schema.{flag} must be a boolean")
+    checks = schema.get("safety_checks", [])
+    if not isinstance(checks, list) or not all(isinstance(check, str) for check in checks):
+        raise ValueError(f"template {name}: schema.safety_checks must be a list of strings")
+    return template
+
+class CompiledTemplate:
+    """A validated template with its schema ready to merge into manifests."""
+    
+    def __init__(self, key: str, template: Dict[str, Any]):
+        self.key = key
+        self.name = template["name"]
+        self.description = template["description"]
+        self.schema = dict(template["schema"])
+        # Changes whenever the template's content does
+        self.version = canonical_digest(template)[:16]
+    
+    def render(self, neural_suggestions: Dict[str, Any], metadata: Dict[str, Any]) -> Dict[str, Any]:
+        """Manifest body: suggestions override the template schema."""
+        return {
+            "neural_suggestions": neural_suggestions,
+            **self.schema,
+            **neural_suggestions,
+            "metadata": metadata
+        }
+    
+    def describe(self) -> Dict[str, Any]:
+        return {"name": self.key, "display_name": self.name, "description": self.description, "version": self.version}
+
+class TemplateRegistry:
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.templates: Dict[str, CompiledTemplate] = {}
+        self.mtime: Optional[float] = None
+        self.loaded_at_mtime: Optional[float] = None
+        self.reloads = 0
+        self.last_error: Optional[str] = None
+        if not (path and os.path.exists(path) and self.reload()):
+            self.templates = self.compile(BUILTIN_TEMPLATES)
+    
+    @staticmethod
+    def compile(raw: Any) -> Dict[str, CompiledTemplate]:
+        if not isinstance(raw, dict) or not raw:
+            raise ValueError("templates file must map template names to templates")
+        return {key: CompiledTemplate(key, validate_template(key, template)) for key, template in raw.items()}
+    
+    def reload(self) -> bool:
+        """Load and compile the templates file; the active set is swapped only if all templates validate."""
+        try:
+            mtime = os.stat(self.path).st_mtime
+            with open(self.path) as handle:
+                templates = self.compile(yaml.safe_load(handle))
+        except (OSError, yaml.YAMLError, ValueError) as e:
+            self.last_error = str(e)
+            logger.error(f"Template reload failed, keeping {len(self.templates)} active templates: {e}")
+            return False
+        self.templates = templates
+        self.mtime = mtime
+        self.reloads += 1
+        self.last_error = None
+        logger.info(f"Loaded {len(templates)} templates from {self.path}")
+        return True
+    
+    def reload_if_changed(self) -> bool:
+        if not self.path:
+            return False
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError:
+            return False
+        if mtime == self.mtime or mtime == self.loaded_at_mtime:
+            return False
+        # Remember failed versions too, so a broken file is not re-parsed on every poll
+        self.loaded_at_mtime = mtime
+        return self.reload()
+    
+    def get(self, key: Optional[str]) -> Optional[CompiledTemplate]:
+        return self.templates.get(key) if key else None
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "templates": len(self.templates),
+            "reloads": self.reloads,
+            "last_error": self.last_error
+        }
+
+class RenderCache:
+    """LRU of rendered manifest bodies and their canonical digests."""
+    
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self.entries: "OrderedDict[Tuple, Tuple[Dict[str, Any], str]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, key: Tuple) -> Optional[Tuple[Dict[str, Any], str]]:
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry
+    
+    def put(self, key: Tuple, body: Dict[str, Any]) -> Tuple[Dict[str, Any], str]:
+        entry = (body, canonical_digest(body))
+        if self.maxsize <= 0:
+            return entry
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+        return entry
+    
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self.entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0
+        }
@@ -1,9 +1,13 @@
 #!/usr/bin/env python3
 """Tests for Proposal Composer"""
 
+import os
 import pytest
 from fastapi.testclient import TestClient
 from main import app
+import pii_redaction
+from pii_redaction import RedactionEngine
+from template_registry import TemplateRegistry
 
 client = TestClient(app)
 
@@ -68,6 +72,36 @@ def test_pii_redaction():
     data = response.json()
     assert data["pii_redacted"] == True
 
+def test_redaction_engine():
+    """Test that every PII type is redacted, overlaps resolve in pattern order and clean strings pass through"""
+    engine = RedactionEngine()
+    text = "mail a.b@example.com or 555-123-4567, ssn 123-45-6789 from 10.0.0.1"
+    assert engine.redact_text(text) == (
+        "mail <REDACTED_EMAIL> or <REDACTED_PHONE>, ssn <REDACTED_SSN> from <REDACTED_IP>"
+    )
+    clean = "no personal data here"
+    assert engine.redact_text(clean) is clean
+    
+    # Overlapping matches go to the earlier pattern, as with one pass per pattern
+    assert engine.redact_text("call 1.2.3.555-12-3456") == "call 1.2.3.<REDACTED_SSN>"
+    
+    redacted = engine.redact({"user": {"contacts": ["x@y.org", 42]}, "note": "ok"})
+    assert redacted == {"user": {"contacts": ["<REDACTED_EMAIL>", 42]}, "note": "ok"}
+
+def test_redaction_stream_matches_across_chunks():
+    """Test that streamed redaction matches whole-text redaction for any chunking"""
+    engine = RedactionEngine()
+    document = '{"rows": [' + ",".join(f'{{"email": "user{i}@example.com", "ip": "10.0.{i % 256}.1"}}' for i in range(300)) + "]}"
+    expected = engine.redact_text(document)
+    for size in (1, 13, 1024):
+        chunks = [document[i:i + size] for i in range(0, len(document), size)]
+        assert "".join(engine.redact_stream(chunks)) == expected
+    
+    response = client.post("/redact", content=document, headers={"Content-Type": "application/json"})
+    assert response.status_code == 200
+    assert response.text == expected
+    assert "@example.com" not in response.text
+
 def test_list_templates():
     """Test template listing"""
     response = client.get("/templates")
@@ -79,6 +113,47 @@ def test_list_templates():
     template_names = [t["name"] for t in data["templates"]]
     assert "cost_optimization" in template_names
 
+def test_repeated_compose_uses_render_cache():
+    """Test that identical redacted inputs reuse the rendered manifest body"""
+    compose_data = {
+        "context": "improve performance for ops@example.com",
+        "tenant_id": "sim-tenant",
+        "template_name": "performance_scaling",
+        "signals": {"p99_ms": 850}
+    }
+    headers = {"Authorization": "Bearer sim-token"}
+    first = client.post("/compose", json=compose_data, headers=headers).json()
+    hits = client.get("/health").json()["render_cache"]["hits"]
+    second = client.post("/compose", json=compose_data, headers=headers).json()
+    
+    assert client.get("/health").json()["render_cache"]["hits"] == hits + 1
+    assert second["manifest"]["action"] == first["manifest"]["action"] == "scale_up"
+    assert second["manifest"]["safety_checks"] == first["manifest"]["safety_checks"]
+    assert second["manifest"]["context"] == compose_data["context"]
+
+def test_template_hot_reload(tmp_path):
+    """Test that templates reload on change and a broken file keeps the last good set"""
+    path = tmp_path / "templates.yaml"
+    path.write_text(
+        "rollout:\n  name: Rollout\n  description: Staged rollout\n"
+        "  schema:\n    action: deploy_new\n    impact_level: low\n"
+    )
+    registry = TemplateRegistry(str(path))
+    assert registry.get("rollout").schema["action"] == "deploy_new"
+    
+    version = registry.get("rollout").version
+    path.write_text(path.read_text().replace("low", "medium"))
+    os.utime(path, (registry.mtime + 10, registry.mtime + 10))
+    assert registry.reload_if_changed()
+    assert registry.get("rollout").schema["impact_level"] == "medium"
+    assert registry.get("rollout").version != version
+    
+    path.write_text("rollout:\n  name: Rollout\n  schema:\n    action: 42\n")
+    os.utime(path, (registry.mtime + 20, registry.mtime + 20))
+    assert not registry.reload_if_changed()
+    assert registry.last_error
+    assert registry.get("rollout").schema["impact_level"] == "medium"
+
 def test_tenant_access_control():
     """Test tenant access control"""
     compose_data = {
@@ -92,5 +167,11 @@ def test_tenant_access_control():
     
     assert response.status_code == 403
 
+def test_auditor_pii_redaction_copy_in_sync():
+    """Test that decision-auditor's copy of pii_redaction.py has not drifted from this one"""
+    auditor_copy = os.path.join(os.path.dirname(__file__), "..", "..", "decision-auditor", "pii_redaction.py")
+    with open(pii_redaction.__file__) as ours, open(auditor_copy) as theirs:
+        assert ours.read() == theirs.read()
+
 if __name__ == "__main__":
     pytest.main([__file__])
\ No newline at end of file
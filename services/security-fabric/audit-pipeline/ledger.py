@@ -0,0 +1,577 @@
+import os
+import time
+import json
+import bisect
+import asyncio
+import threading
+from collections import deque
+from typing import Dict, Any, List, Optional, Iterator, Tuple
+
+from merkle import MerkleTree, leaf_hash, proof_from_file
+
+INDEXED_FIELDS = ("action", "actor", "tenant")
+
+class LedgerSegment:
+    """One rolled JSONL segment plus its sparse offset and inverted indexes."""
+    
+    def __init__(self, directory: str, number: int):
+        self.number = number
+        self.path = os.path.join(directory, f"segment-{number:06d}.jsonl")
+        self.index_path = os.path.join(directory, f"segment-{number:06d}.idx.json")
+        self.merkle_path = os.path.join(directory, f"segment-{number:06d}.merkle")
+        self.sealed = False
+        self.count = 0
+        self.size = 0
+        self.first_sequence: Optional[int] = None
+        self.last_sequence: Optional[int] = None
+        self.min_timestamp: Optional[str] = None
+        self.max_timestamp: Optional[str] = None
+        # (ordinal, byte offset) every index_interval entries
+        self.sparse: List[Tuple[int, int]] = []
+        # field -> value -> byte offsets of matching entries
+        self.postings: Dict[str, Dict[str, List[int]]] = {field: {} for field in INDEXED_FIELDS}
+        # In-memory tree while the segment is writable; sealed segments keep
+        # only the root and the level sizes of the persisted tree
+        self.tree: Optional[MerkleTree] = MerkleTree()
+        self.merkle_root: Optional[str] = None
+        self.merkle_levels: List[int] = []
+    
+    def record(self, entry: Dict[str, Any], offset: int, line: bytes, index_interval: int):
+        """Update segment metadata, indexes and Merkle tree for a line written at offset."""
+        self.tree.append(leaf_hash(line))
+        
+        if self.count % index_interval == 0:
+            self.sparse.append((self.count, offset))
+        
+        sequence_id = entry.get("sequence_id")
+        if self.first_sequence is None:
+            self.first_sequence = sequence_id
+        self.last_sequence = sequence_id
+        
+        timestamp = entry.get("timestamp")
+        if timestamp:
+            if self.min_timestamp is None or timestamp < self.min_timestamp:
+                self.min_timestamp = timestamp
+            if self.max_timestamp is None or timestamp > self.max_timestamp:
+                self.max_timestamp = timestamp
+        
+        for field in INDEXED_FIELDS:
+            value = entry.get(field)
+            if value is not None:
+                self.postings[field].setdefault(str(value), []).append(offset)
+        
+        self.count += 1
+        self.size = offset + len(line)
+    
+    def overlaps(self, since: Optional[str], until: Optional[str]) -> bool:
+        if self.count == 0:
+            return False
+        if since and self.max_timestamp and self.max_timestamp < since:
+            return False
+        if until and self.min_timestamp and self.min_timestamp > until:
+            return False
+        return True
+    
+    def offset_for(self, ordinal: int) -> Tuple[int, int]:
+        """Nearest indexed (ordinal, offset) at or before the given entry ordinal."""
+        position = bisect.bisect_right(self.sparse, (ordinal, float("inf"))) - 1
+        return self.sparse[position] if position >= 0 else (0, 0)
+    
+    # Sealing drops the tree after persisting it, so read it once
+    def root(self) -> Optional[str]:
+        tree = self.tree
+        return tree.root() if tree is not None else self.merkle_root
+    
+    def proof(self, ordinal: int) -> List[Dict[str, str]]:
+        tree = self.tree
+        if tree is not None:
+            return tree.proof(ordinal)
+        return proof_from_file(self.merkle_path, self.merkle_levels, ordinal)
+    
+    def leaf(self, ordinal: int) -> str:
+        tree = self.tree
+        if tree is not None:
+            return tree.levels[0][ordinal].hex()
+        with open(self.merkle_path, "rb") as f:
+            f.seek(ordinal * 32)
+            return f.read(32).hex()
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "size": self.size,
+            "first_sequence": self.first_sequence,
+            "last_sequence": self.last_sequence,
+            "min_timestamp": self.min_timestamp,
+            "max_timestamp": self.max_timestamp,
+            "sparse": self.sparse,
+            "postings": self.postings,
+            "merkle_root": self.merkle_root,
+            "merkle_levels": self.merkle_levels
+        }
+    
+    def load_index(self) -> bool:
+        """Load a persisted index; returns False if it is missing or stale."""
+        if not os.path.exists(self.index_path):
+            return False
+        try:
+            with open(self.index_path, "r") as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return False
+        if data.get("size") != os.path.getsize(self.path) or not os.path.exists(self.merkle_path):
+            return False
+        
+        self.count = data["count"]
+        self.size = data["size"]
+        self.first_sequence = data["first_sequence"]
+        self.last_sequence = data["last_sequence"]
+        self.min_timestamp = data["min_timestamp"]
+        self.max_timestamp = data["max_timestamp"]
+        self.sparse = [tuple(item) for item in data["sparse"]]
+        self.postings = data["postings"]
+        self.merkle_root = data.get("merkle_root")
+        self.merkle_levels = data.get("merkle_levels", [])
+        self.tree = None
+        self.sealed = True
+        return True
+    
+    def save_index(self):
+        if self.tree is not None:
+            self.merkle_levels = self.tree.save(self.merkle_path)
+            self.merkle_root = self.tree.root()
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.to_dict(), f)
+        os.replace(tmp_path, self.index_path)
+    
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "segment": self.number,
+            "entries": self.count,
+            "size_bytes": self.size,
+            "first_sequence": self.first_sequence,
+            "last_sequence": self.last_sequence,
+            "min_timestamp": self.min_timestamp,
+            "max_timestamp": self.max_timestamp,
+            "merkle_root": self.root(),
+            "sealed": self.sealed
+        }
+
+def _index_filters(action: Optional[str], actor: Optional[str], tenant: Optional[str]) -> Dict[str, str]:
+    return {
+        field: value for field, value in
+        (("action", action), ("actor", actor), ("tenant", tenant)) if value
+    }
+
+def _in_window(entry: Dict[str, Any], since: Optional[str], until: Optional[str]) -> bool:
+    timestamp = entry.get("timestamp", "")
+    return not (since and timestamp < since) and not (until and timestamp > until)
+
+class SegmentedLedger:
+    """Append-only audit ledger split into fixed-size, individually indexed segments.
+    
+    Appends run on a worker thread while queries run on the event loop, so
+    segment indexes and Merkle trees are only changed and read under `lock`.
+    The lock is never held across file I/O.
+    """
+    
+    def __init__(self, directory: str, segment_max_bytes: int = 64 * 1024 * 1024,
+                 index_interval: int = 64):
+        self.directory = directory
+        self.segment_max_bytes = segment_max_bytes
+        self.index_interval = index_interval
+        self.segments: List[LedgerSegment] = []
+        self._handle = None
+        self.lock = threading.RLock()
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+        self.next_sequence = self.last_sequence + 1
+    
+    def _load(self):
+        numbers = sorted(
+            int(name[len("segment-"):-len(".jsonl")])
+            for name in os.listdir(self.directory)
+            if name.startswith("segment-") and name.endswith(".jsonl")
+        )
+        for position, number in enumerate(numbers):
+            segment = LedgerSegment(self.directory, number)
+            if not segment.load_index():
+                self._rebuild_index(segment)
+                if position < len(numbers) - 1:
+                    self.seal(segment)
+            self.segments.append(segment)
+        
+        # Only the newest segment can still take writes
+        active = self.segments[-1] if self.segments else None
+        if active and active.sealed and active.size < self.segment_max_bytes:
+            active.tree = MerkleTree.load(active.merkle_path, active.merkle_levels)
+            active.sealed = False
+    
+    def _rebuild_index(self, segment: LedgerSegment):
+        offset = 0
+        with open(segment.path, "rb") as f:
+            for raw in f:
+                try:
+                    entry = json.loads(raw)
+                except json.JSONDecodeError:
+                    entry = {}
+                segment.record(entry, offset, raw, self.index_interval)
+                offset += len(raw)
+    
+    @property
+    def total_entries(self) -> int:
+        return sum(segment.count for segment in self.segments)
+    
+    @property
+    def size_bytes(self) -> int:
+        return sum(segment.size for segment in self.segments)
+    
+    @property
+    def last_sequence(self) -> int:
+        for segment in reversed(self.segments):
+            if segment.last_sequence is not None:
+                return segment.last_sequence
+        return 0
+    
+    def _needs_roll(self, incoming: int, unrecorded: int = 0) -> bool:
+        """unrecorded: bytes queued for the active segment but not yet written."""
+        active = self.segments[-1] if self.segments else None
+        return active is None or active.sealed or bool(
+            (active.count or unrecorded) and active.size + unrecorded + incoming > self.segment_max_bytes)
+    
+    def _active_segment(self, incoming: int) -> LedgerSegment:
+        active = self.segments[-1] if self.segments else None
+        if self._needs_roll(incoming):
+            if active is not None and not active.sealed:
+                self._close_handle()
+                self.seal(active)
+            active = LedgerSegment(self.directory, active.number + 1 if active else 1)
+            self.segments.append(active)
+        return active
+    
+    def seal(self, segment: LedgerSegment):
+        """Roll a segment: persist its index and Merkle tree and stop writing to it."""
+        with self.lock:
+            segment.save_index()
+            segment.tree = None
+            segment.sealed = True
+    
+    def reserve_sequence(self) -> int:
+        sequence_id = self.next_sequence
+        self.next_sequence += 1
+        return sequence_id
+    
+    def _close_handle(self):
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+    
+    def append_batch(self, entries: List[Dict[str, Any]], fsync: bool = False) -> List[Tuple[int, int]]:
+        """Write a group of entries with one write per segment; returns (segment, offset) pairs.
+        
+        Entries are indexed and added to the Merkle tree only after their
+        lines are written, so a segment's root and size always describe
+        bytes that are on disk.
+        """
+        positions = []
+        pending = []
+        segment = None
+        offset = 0
+        for entry in entries:
+            line = (json.dumps(entry) + "\n").encode()
+            if segment is None or self._needs_roll(len(line), offset - segment.size):
+                # Lines for the outgoing segment must be on disk before it is sealed
+                self._flush(segment, pending, fsync)
+                pending = []
+                segment = self._active_segment(len(line))
+                offset = segment.size
+            pending.append((entry, offset, line))
+            positions.append((segment.number, offset))
+            offset += len(line)
+        self._flush(segment, pending, fsync)
+        return positions
+    
+    def _flush(self, segment: Optional[LedgerSegment], pending: List[Tuple[Dict[str, Any], int, bytes]],
+               fsync: bool):
+        if segment is None or not pending:
+            return
+        if self._handle is None or self._handle.name != segment.path:
+            self._close_handle()
+            self._handle = open(segment.path, "ab")
+        self._handle.write(b"".join(line for _, _, line in pending))
+        self._handle.flush()
+        if fsync:
+            os.fsync(self._handle.fileno())
+        with self.lock:
+            for entry, offset, line in pending:
+                segment.record(entry, offset, line, self.index_interval)
+    
+    def append(self, entry: Dict[str, Any]) -> Tuple[int, int]:
+        """Append one entry; returns (segment number, byte offset)."""
+        return self.append_batch([entry])[0]
+    
+    def close(self):
+        self._close_handle()
+    
+    def import_jsonl(self, path: str) -> int:
+        """Copy a legacy single-file JSONL ledger into segments."""
+        entries = []
+        with open(path, "r") as f:
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+        self.append_batch(entries, fsync=True)
+        self.next_sequence = self.last_sequence + 1
+        return len(entries)
+    
+    def locate(self, sequence_id: int) -> Optional[Tuple[LedgerSegment, int]]:
+        """Find the segment and ordinal of an entry by sequence id."""
+        for segment in self.segments:
+            if segment.first_sequence is None or not segment.first_sequence <= sequence_id <= segment.last_sequence:
+                continue
+            if segment.last_sequence - segment.first_sequence + 1 == segment.count:
+                return segment, sequence_id - segment.first_sequence
+            # Imported legacy segments may have gaps; fall back to a scan
+            for ordinal, entry in enumerate(self._scan(segment)):
+                if entry.get("sequence_id") == sequence_id:
+                    return segment, ordinal
+        return None
+    
+    def proof(self, sequence_id: int) -> Optional[Dict[str, Any]]:
+        """O(log n) Merkle inclusion proof for one entry."""
+        located = self.locate(sequence_id)
+        if located is None:
+            return None
+        segment, ordinal = located
+        with self.lock:
+            return {
+                "sequence_id": sequence_id,
+                "segment": segment.number,
+                "leaf_index": ordinal,
+                "leaf_hash": segment.leaf(ordinal),
+                "proof": segment.proof(ordinal),
+                "merkle_root": segment.root()
+            }
+    
+    def _read_at(self, segment: LedgerSegment, offsets: List[int]) -> Iterator[Dict[str, Any]]:
+        with open(segment.path, "rb") as f:
+            for offset in offsets:
+                f.seek(offset)
+                try:
+                    yield json.loads(f.readline())
+                except json.JSONDecodeError:
+                    continue
+    
+    def _scan(self, segment: LedgerSegment, start_ordinal: int = 0) -> Iterator[Dict[str, Any]]:
+        ordinal, offset = segment.offset_for(start_ordinal)
+        with open(segment.path, "rb") as f:
+            f.seek(offset)
+            for raw in f:
+                if ordinal >= start_ordinal:
+                    try:
+                        yield json.loads(raw)
+                    except json.JSONDecodeError:
+                        pass
+                ordinal += 1
+    
+    def _matching_offsets(self, segment: LedgerSegment, filters: Dict[str, str]) -> List[int]:
+        """Intersect inverted-index postings for the given filters."""
+        matched = None
+        with self.lock:
+            for field, wanted in filters.items():
+                postings = segment.postings.get(field, {})
+                if field == "tenant":
+                    # Tenants are matched exactly
+                    offsets = set(postings.get(wanted, []))
+                else:
+                    # Action and actor keep their case-insensitive substring semantics,
+                    # resolved against the (small) vocabulary of indexed values
+                    needle = wanted.lower()
+                    offsets = set()
+                    for value, value_offsets in postings.items():
+                        if needle in value.lower():
+                            offsets.update(value_offsets)
+                matched = offsets if matched is None else matched & offsets
+                if not matched:
+                    return []
+        return sorted(matched)
+    
+    def search(self, action: Optional[str] = None, actor: Optional[str] = None,
+               tenant: Optional[str] = None, since: Optional[str] = None,
+               until: Optional[str] = None, limit: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """Stream matching entries in ledger order."""
+        filters = _index_filters(action, actor, tenant)
+        yielded = 0
+        for segment in self.segments:
+            if not segment.overlaps(since, until):
+                continue
+            if filters:
+                entries = self._read_at(segment, self._matching_offsets(segment, filters))
+            else:
+                entries = self._scan(segment)
+            for entry in entries:
+                timestamp = entry.get("timestamp", "")
+                if since and timestamp < since:
+                    continue
+                if until and timestamp > until:
+                    continue
+                yield entry
+                yielded += 1
+                if limit and yielded >= limit:
+                    return
+    
+    def search_latest(self, limit: int, action: Optional[str] = None, actor: Optional[str] = None,
+                      tenant: Optional[str] = None, since: Optional[str] = None,
+                      until: Optional[str] = None) -> List[Dict[str, Any]]:
+        """The last `limit` matching entries in ledger order.
+        
+        Segments are visited newest first and postings read backwards, so only
+        the segments holding those entries are touched.
+        """
+        filters = _index_filters(action, actor, tenant)
+        newest_first: List[Dict[str, Any]] = []
+        for segment in reversed(list(self.segments)):
+            wanted = limit - len(newest_first)
+            if wanted <= 0:
+                break
+            if not segment.overlaps(since, until):
+                continue
+            if filters:
+                entries = self._read_at(segment, self._matching_offsets(segment, filters)[::-1])
+            else:
+                # Unindexed: one forward pass, keeping only this segment's last matches
+                entries = reversed(deque(
+                    (entry for entry in self._scan(segment) if _in_window(entry, since, until)),
+                    maxlen=wanted
+                ))
+            for entry in entries:
+                if not _in_window(entry, since, until):
+                    continue
+                newest_first.append(entry)
+                if len(newest_first) >= limit:
+                    break
+        newest_first.reverse()
+        return newest_first
+    
+    def check_readable(self):
+        """Raise OSError if any segment file cannot be opened for reading."""
+        for segment in list(self.segments):
+            with open(segment.path, "rb"):
+                pass
+    
+    def tail(self, limit: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """Stream the last `limit` entries (or all entries) in ledger order."""
+        start_index = 0
+        start_ordinal = 0
+        if limit:
+            remaining = limit
+            start_index = len(self.segments)
+            while start_index > 0 and remaining > 0:
+                start_index -= 1
+                remaining -= self.segments[start_index].count
+            # A negative remainder means we only need the tail of that segment
+            start_ordinal = max(0, -remaining)
+        
+        for position in range(start_index, len(self.segments)):
+            segment = self.segments[position]
+            yield from self._scan(segment, start_ordinal if position == start_index else 0)
+    
+    def verification_snapshot(self) -> List[Tuple[str, Optional[str], int, int]]:
+        """(path, Merkle root, byte length, segment number) per segment, taken
+        together so the root covers exactly the first byte length of the file."""
+        with self.lock:
+            return [(segment.path, segment.root(), segment.size, segment.number) for segment in self.segments]
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "segment_count": len(self.segments),
+            "entries": self.total_entries,
+            "size_bytes": self.size_bytes,
+            "segment_max_bytes": self.segment_max_bytes
+        }
+
+class GroupCommitWriter:
+    """Batches concurrent appends into group commits on a single writer task."""
+    
+    FSYNC_POLICIES = ("always", "interval", "never")
+    
+    def __init__(self, ledger: SegmentedLedger, max_batch: int = 512, max_delay_ms: float = 2,
+                 fsync_policy: str = "always", fsync_interval_ms: float = 1000):
+        if fsync_policy not in self.FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy: {fsync_policy}")
+        self.ledger = ledger
+        self.max_batch = max_batch
+        self.max_delay = max_delay_ms / 1000
+        self.fsync_policy = fsync_policy
+        self.fsync_interval = fsync_interval_ms / 1000
+        self.commits = 0
+        self.entries_committed = 0
+        self._last_fsync = 0.0
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+    
+    def start(self):
+        if self._task is None:
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self.ledger.close()
+    
+    async def append(self, entry: Dict[str, Any]) -> Tuple[int, int]:
+        """Queue an entry and wait until its group commit is durable per policy."""
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((entry, future))
+        return await future
+    
+    def _should_fsync(self) -> bool:
+        if self.fsync_policy == "always":
+            return True
+        if self.fsync_policy == "interval":
+            return time.monotonic() - self._last_fsync >= self.fsync_interval
+        return False
+    
+    async def _run(self):
+        while True:
+            batch = [await self._queue.get()]
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._queue.get_nowait())
+                    continue
+                except asyncio.QueueEmpty:
+                    pass
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            
+            fsync = self._should_fsync()
+            try:
+                positions = await asyncio.to_thread(
+                    self.ledger.append_batch, [entry for entry, _ in batch], fsync
+                )
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            
+            if fsync:
+                self._last_fsync = time.monotonic()
+            self.commits += 1
+            self.entries_committed += len(batch)
+            for (_, future), position in zip(batch, positions):
+                if not future.done():
+                    future.set_result(position)
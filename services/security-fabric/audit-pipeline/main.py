@@ -1,12 +1,19 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 import os
 import json
 import hashlib
 import time
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Iterator
+
+from ledger import SegmentedLedger, GroupCommitWriter
+from merkle import verify_segment, verify_proof
 
 app = FastAPI(title="ATOM Audit Pipeline", version="1.0.0")
 
@@ -20,6 +27,14 @@ app.add_middleware(
 
 SIMULATION_MODE = os.getenv("SIMULATION_MODE", "true").lower() == "true"
 AUDIT_LEDGER_PATH = "reports/logs/audit_ledger.jsonl"
+AUDIT_LEDGER_DIR = os.getenv("AUDIT_LEDGER_DIR", "reports/logs/audit_ledger")
+AUDIT_SEGMENT_MAX_BYTES = int(os.getenv("AUDIT_SEGMENT_MAX_BYTES", str(64 * 1024 * 1024)))
+AUDIT_INDEX_INTERVAL = int(os.getenv("AUDIT_INDEX_INTERVAL", "64"))
+AUDIT_FSYNC_POLICY = os.getenv("AUDIT_FSYNC_POLICY", "always")
+AUDIT_FSYNC_INTERVAL_MS = float(os.getenv("AUDIT_FSYNC_INTERVAL_MS", "1000"))
+AUDIT_GROUP_COMMIT_MS = float(os.getenv("AUDIT_GROUP_COMMIT_MS", "2"))
+AUDIT_GROUP_COMMIT_MAX = int(os.getenv("AUDIT_GROUP_COMMIT_MAX", "512"))
+AUDIT_VERIFY_WORKERS = int(os.getenv("AUDIT_VERIFY_WORKERS", str(os.cpu_count() or 2)))
 
 class AuditEvent(BaseModel):
     action: str
@@ -28,15 +43,48 @@ class AuditEvent(BaseModel):
     resource: Optional[str] = None
     metadata: Optional[Dict[str, Any]] = {}
 
-events_processed = 0
-ledger_size = 0
+ledger = SegmentedLedger(AUDIT_LEDGER_DIR, AUDIT_SEGMENT_MAX_BYTES, AUDIT_INDEX_INTERVAL)
+
+# Carry over entries from the pre-segmentation single-file ledger
+if not ledger.segments and os.path.exists(AUDIT_LEDGER_PATH):
+    ledger.import_jsonl(AUDIT_LEDGER_PATH)
+
+writer = GroupCommitWriter(
+    ledger,
+    max_batch=AUDIT_GROUP_COMMIT_MAX,
+    max_delay_ms=AUDIT_GROUP_COMMIT_MS,
+    fsync_policy=AUDIT_FSYNC_POLICY,
+    fsync_interval_ms=AUDIT_FSYNC_INTERVAL_MS
+)
+
+events_processed = ledger.total_entries
+ledger_size = ledger.size_bytes
+
+@app.on_event("startup")
+async def start_writer():
+    writer.start()
 
-def append_to_ledger(event_data: Dict[str, Any]) -> str:
+# Shared by /verify requests; created on first use
+verify_pool: Optional[ProcessPoolExecutor] = None
+
+def get_verify_pool() -> ProcessPoolExecutor:
+    global verify_pool
+    if verify_pool is None:
+        verify_pool = ProcessPoolExecutor(max_workers=AUDIT_VERIFY_WORKERS)
+    return verify_pool
+
+@app.on_event("shutdown")
+async def stop_writer():
+    await writer.stop()
+    if verify_pool is not None:
+        verify_pool.shutdown(cancel_futures=True)
+
+async def append_to_ledger(event_data: Dict[str, Any]) -> Dict[str, Any]:
     global events_processed, ledger_size
     
-    # Create immutable audit entry
+    # Create immutable audit entry; sequence ids are handed out in queue order
     timestamp = datetime.utcnow().isoformat()
-    sequence_id = events_processed + 1
+    sequence_id = ledger.reserve_sequence()
     
     audit_entry = {
         "sequence_id": sequence_id,
@@ -53,19 +101,17 @@ def append_to_ledger(event_data: Dict[str, Any]) -> str:
     entry_json = json.dumps(audit_entry, sort_keys=True)
     audit_entry["sha256"] = hashlib.sha256(entry_json.encode()).hexdigest()
     
-    # Append to ledger (JSONL format for immutability)
-    os.makedirs(os.path.dirname(AUDIT_LEDGER_PATH), exist_ok=True)
-    with open(AUDIT_LEDGER_PATH, "a") as f:
-        f.write(json.dumps(audit_entry) + "\n")
+    # Group-commit into the active ledger segment (JSONL format for immutability)
+    await writer.append(audit_entry)
     
     events_processed += 1
-    ledger_size = os.path.getsize(AUDIT_LEDGER_PATH) if os.path.exists(AUDIT_LEDGER_PATH) else 0
+    ledger_size = ledger.size_bytes
     
-    return audit_entry["sha256"]
+    return audit_entry
 
 @app.get("/health")
 async def health():
-    ledger_exists = os.path.exists(AUDIT_LEDGER_PATH)
+    ledger_exists = bool(ledger.segments)
     
     return {
         "status": "ok",
@@ -93,169 +139,159 @@ async def append_audit_event(event: AuditEvent):
         }
         
         # Append to immutable ledger
-        entry_hash = append_to_ledger(event_data)
+        audit_entry = await append_to_ledger(event_data)
         
         return {
             "status": "appended",
-            "sequence_id": events_processed,
-            "entry_hash": entry_hash,
+            "sequence_id": audit_entry["sequence_id"],
+            "entry_hash": audit_entry["sha256"],
             "timestamp": datetime.utcnow().isoformat()
         }
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to append audit event: {str(e)}")
 
+def csv_row(entry: Dict[str, Any]) -> str:
+    return f"{entry.get('sequence_id', '')},{entry.get('timestamp', '')},{entry.get('action', '')},{entry.get('actor', '')},{entry.get('tenant', '')},{entry.get('resource', '')},{entry.get('sha256', '')}\n"
+
+def stream_json_envelope(entries: Iterator[Dict[str, Any]], format: Optional[str], extra: Dict[str, Any] = None) -> Iterator[str]:
+    """Stream entries as the usual JSON response body without materialising them."""
+    failure = []
+    def rows():
+        try:
+            yield from entries
+        except OSError as e:
+            # The 200 status is already sent, so close the document and flag it instead
+            failure.append(str(e))
+    
+    count = 0
+    if format == "csv":
+        # Convert to CSV format for compliance reports
+        yield '{"format": "csv", "data": "'
+        yield json.dumps("sequence_id,timestamp,action,actor,tenant,resource,sha256\n")[1:-1]
+        for entry in rows():
+            yield json.dumps(csv_row(entry))[1:-1]
+            count += 1
+        yield '"'
+    else:
+        yield '{"entries": ['
+        for entry in rows():
+            yield ("," if count else "") + json.dumps(entry)
+            count += 1
+        yield "]" if format is None else f'], "format": {json.dumps(format)}'
+    
+    trailer = {"count": count, **(extra or {}), "timestamp": datetime.utcnow().isoformat()}
+    if failure:
+        trailer.update({"complete": False, "error": f"Ledger read failed: {failure[0]}"})
+    yield ", " + json.dumps(trailer)[1:]
+
 @app.get("/export")
-async def export_ledger(limit: Optional[int] = None, format: str = "json"):
+async def export_ledger(
+    limit: Optional[int] = None,
+    format: str = "json",
+    action: Optional[str] = None,
+    actor: Optional[str] = None,
+    tenant: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None
+):
     try:
-        if not os.path.exists(AUDIT_LEDGER_PATH):
-            return {
-                "entries": [],
-                "count": 0,
-                "format": format,
-                "timestamp": datetime.utcnow().isoformat()
-            }
-        
-        entries = []
-        with open(AUDIT_LEDGER_PATH, "r") as f:
-            lines = f.readlines()
-            
-            # Apply limit if specified
-            if limit:
-                lines = lines[-limit:]
-            
-            for line in lines:
-                try:
-                    entry = json.loads(line.strip())
-                    entries.append(entry)
-                except json.JSONDecodeError:
-                    continue
-        
-        if format == "csv":
-            # Convert to CSV format for compliance reports
-            csv_data = "sequence_id,timestamp,action,actor,tenant,resource,sha256\n"
-            for entry in entries:
-                csv_data += f"{entry.get('sequence_id', '')},{entry.get('timestamp', '')},{entry.get('action', '')},{entry.get('actor', '')},{entry.get('tenant', '')},{entry.get('resource', '')},{entry.get('sha256', '')}\n"
-            
-            return {
-                "format": "csv",
-                "data": csv_data,
-                "count": len(entries),
-                "timestamp": datetime.utcnow().isoformat()
-            }
+        if (action or actor or tenant or since or until) and limit:
+            # Only the most recent matches, found newest segment first off the event loop
+            entries = iter(await asyncio.to_thread(ledger.search_latest, limit, action, actor, tenant, since, until))
+        else:
+            # Unreadable segments fail here with a 500 rather than mid-stream
+            await asyncio.to_thread(ledger.check_readable)
+            if action or actor or tenant or since or until:
+                entries = ledger.search(action, actor, tenant, since, until)
+            else:
+                entries = ledger.tail(limit)
         
-        return {
-            "entries": entries,
-            "count": len(entries),
-            "format": format,
-            "timestamp": datetime.utcnow().isoformat()
-        }
+        return StreamingResponse(stream_json_envelope(entries, format), media_type="application/json")
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to export ledger: {str(e)}")
 
 @app.get("/verify")
 async def verify_ledger_integrity():
+    global verify_pool
     try:
-        if not os.path.exists(AUDIT_LEDGER_PATH):
-            return {
-                "valid": True,
-                "entries_verified": 0,
-                "corrupted_entries": [],
-                "timestamp": datetime.utcnow().isoformat()
-            }
-        
-        corrupted_entries = []
-        entries_verified = 0
+        # Each segment is re-hashed and its Merkle root rebuilt in its own worker,
+        # up to the length its root covered when the snapshot was taken
+        loop = asyncio.get_running_loop()
+        pool = get_verify_pool()
+        results = await asyncio.gather(*[
+            loop.run_in_executor(pool, verify_segment, path, root, number, length)
+            for path, root, length, number in ledger.verification_snapshot()
+        ])
         
-        with open(AUDIT_LEDGER_PATH, "r") as f:
-            for line_num, line in enumerate(f, 1):
-                try:
-                    entry = json.loads(line.strip())
-                    
-                    # Verify hash integrity
-                    stored_hash = entry.pop("sha256", None)
-                    calculated_hash = hashlib.sha256(json.dumps(entry, sort_keys=True).encode()).hexdigest()
-                    
-                    if stored_hash != calculated_hash:
-                        corrupted_entries.append({
-                            "line": line_num,
-                            "sequence_id": entry.get("sequence_id"),
-                            "expected_hash": calculated_hash,
-                            "stored_hash": stored_hash
-                        })
-                    
-                    entries_verified += 1
-                    
-                except json.JSONDecodeError:
-                    corrupted_entries.append({
-                        "line": line_num,
-                        "error": "Invalid JSON"
-                    })
+        corrupted_entries = [entry for result in results for entry in result["corrupted_entries"]]
+        entries_verified = sum(result["entries_verified"] for result in results)
+        invalid_segments = [result["segment"] for result in results if not result["merkle_root_valid"]]
         
         return {
-            "valid": len(corrupted_entries) == 0,
+            "valid": len(corrupted_entries) == 0 and not invalid_segments,
             "entries_verified": entries_verified,
             "corrupted_entries": corrupted_entries,
             "corruption_rate": len(corrupted_entries) / entries_verified if entries_verified > 0 else 0,
+            "segments_verified": len(results),
+            "invalid_segments": invalid_segments,
             "timestamp": datetime.utcnow().isoformat()
         }
     
+    except BrokenProcessPool as e:
+        # A worker died; the next request starts a fresh pool
+        verify_pool = None
+        raise HTTPException(status_code=500, detail=f"Failed to verify ledger: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to verify ledger: {str(e)}")
 
+@app.get("/proof/{sequence_id}")
+async def inclusion_proof(sequence_id: int):
+    proof = ledger.proof(sequence_id)
+    if proof is None:
+        raise HTTPException(status_code=404, detail="Entry not found")
+    
+    return {
+        **proof,
+        "verified": verify_proof(proof["leaf_hash"], proof["proof"], proof["merkle_root"]),
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
 @app.get("/search")
 async def search_audit_logs(
     action: Optional[str] = None,
     actor: Optional[str] = None,
     tenant: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
     limit: int = 100
 ):
     try:
-        if not os.path.exists(AUDIT_LEDGER_PATH):
-            return {
-                "entries": [],
-                "count": 0,
-                "timestamp": datetime.utcnow().isoformat()
-            }
-        
-        matching_entries = []
-        
-        with open(AUDIT_LEDGER_PATH, "r") as f:
-            for line in f:
-                try:
-                    entry = json.loads(line.strip())
-                    
-                    # Apply filters
-                    if action and action.lower() not in entry.get("action", "").lower():
-                        continue
-                    if actor and actor.lower() not in entry.get("actor", "").lower():
-                        continue
-                    if tenant and tenant != entry.get("tenant"):
-                        continue
-                    
-                    matching_entries.append(entry)
-                    
-                    if len(matching_entries) >= limit:
-                        break
-                        
-                except json.JSONDecodeError:
-                    continue
-        
-        return {
-            "entries": matching_entries,
-            "count": len(matching_entries),
-            "filters": {
-                "action": action,
-                "actor": actor,
-                "tenant": tenant
-            },
-            "timestamp": datetime.utcnow().isoformat()
+        filters = {
+            "action": action,
+            "actor": actor,
+            "tenant": tenant
         }
+        await asyncio.to_thread(ledger.check_readable)
+        entries = ledger.search(action, actor, tenant, since, until, limit)
+        
+        return StreamingResponse(
+            stream_json_envelope(entries, None, {"filters": filters}),
+            media_type="application/json"
+        )
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to search audit logs: {str(e)}")
 
+@app.get("/segments")
+async def list_segments():
+    return {
+        "segments": [segment.summary() for segment in ledger.segments],
+        **ledger.stats(),
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
 @app.get("/metrics")
 async def metrics():
     return f"""# HELP audit_pipeline_events_total Total number of audit events processed
@@ -268,7 +304,15 @@ audit_pipeline_ledger_size_bytes {ledger_size}
 
 # HELP audit_pipeline_ledger_entries Number of entries in ledger
 # TYPE audit_pipeline_ledger_entries gauge
-audit_pipeline_ledger_entries {events_processed}
+audit_pipeline_ledger_entries {ledger.total_entries}
+
+# HELP audit_pipeline_ledger_segments Number of ledger segment files
+# TYPE audit_pipeline_ledger_segments gauge
+audit_pipeline_ledger_segments {len(ledger.segments)}
+
+# HELP audit_pipeline_group_commits_total Number of group commits written
+# TYPE audit_pipeline_group_commits_total counter
+audit_pipeline_group_commits_total {writer.commits}
 """
 
 if __name__ == "__main__":
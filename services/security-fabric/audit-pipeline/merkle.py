@@ -0,0 +1,154 @@
+import os
+import json
+import hashlib
+from typing import Dict, Any, List, Optional
+
+def leaf_hash(line: bytes) -> bytes:
+    """Merkle leaf for one raw ledger line (without the trailing newline)."""
+    return hashlib.sha256(b"\x00" + line.rstrip(b"\n")).digest()
+
+def node_hash(left: bytes, right: bytes) -> bytes:
+    return hashlib.sha256(b"\x01" + left + right).digest()
+
+class MerkleTree:
+    """Append-only Merkle tree; an unpaired node is promoted to the next level."""
+    
+    def __init__(self, levels: Optional[List[List[bytes]]] = None):
+        self.levels: List[List[bytes]] = levels or [[]]
+    
+    @classmethod
+    def build(cls, leaves: List[bytes]) -> "MerkleTree":
+        levels = [list(leaves)]
+        while len(levels[-1]) > 1:
+            below = levels[-1]
+            levels.append([
+                node_hash(below[i], below[i + 1]) if i + 1 < len(below) else below[i]
+                for i in range(0, len(below), 2)
+            ])
+        return cls(levels)
+    
+    def append(self, leaf: bytes):
+        """Add a leaf, recomputing only the O(log n) nodes on its path to the root."""
+        self.levels[0].append(leaf)
+        index = len(self.levels[0]) - 1
+        level = 0
+        while len(self.levels[level]) > 1:
+            below = self.levels[level]
+            parent_index = index // 2
+            left = below[parent_index * 2]
+            parent = node_hash(left, below[parent_index * 2 + 1]) if parent_index * 2 + 1 < len(below) else left
+            if level + 1 == len(self.levels):
+                self.levels.append([])
+            above = self.levels[level + 1]
+            if parent_index < len(above):
+                above[parent_index] = parent
+            else:
+                above.append(parent)
+            index = parent_index
+            level += 1
+    
+    @property
+    def size(self) -> int:
+        return len(self.levels[0])
+    
+    def root(self) -> Optional[str]:
+        return self.levels[-1][0].hex() if self.levels[0] else None
+    
+    def proof(self, index: int) -> List[Dict[str, str]]:
+        path = []
+        for level in self.levels[:-1]:
+            sibling = index ^ 1
+            if sibling < len(level):
+                path.append({
+                    "hash": level[sibling].hex(),
+                    "position": "left" if sibling < index else "right"
+                })
+            index //= 2
+        return path
+    
+    def save(self, path: str) -> List[int]:
+        """Write every level to a flat file; returns the level sizes."""
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            for level in self.levels:
+                f.write(b"".join(level))
+        os.replace(tmp_path, path)
+        return [len(level) for level in self.levels]
+    
+    @classmethod
+    def load(cls, path: str, level_sizes: List[int]) -> "MerkleTree":
+        levels = []
+        with open(path, "rb") as f:
+            for size in level_sizes:
+                data = f.read(size * 32)
+                levels.append([data[i:i + 32] for i in range(0, len(data), 32)])
+        return cls(levels or [[]])
+
+def proof_from_file(path: str, level_sizes: List[int], index: int) -> List[Dict[str, str]]:
+    """Inclusion proof for a persisted tree, reading one node per level."""
+    path_nodes = []
+    level_offset = 0
+    with open(path, "rb") as f:
+        for size in level_sizes[:-1]:
+            sibling = index ^ 1
+            if sibling < size:
+                f.seek(level_offset + sibling * 32)
+                path_nodes.append({
+                    "hash": f.read(32).hex(),
+                    "position": "left" if sibling < index else "right"
+                })
+            level_offset += size * 32
+            index //= 2
+    return path_nodes
+
+def verify_proof(leaf_hex: str, proof: List[Dict[str, str]], root_hex: str) -> bool:
+    current = bytes.fromhex(leaf_hex)
+    for step in proof:
+        sibling = bytes.fromhex(step["hash"])
+        current = node_hash(sibling, current) if step["position"] == "left" else node_hash(current, sibling)
+    return current.hex() == root_hex
+
+def verify_segment(path: str, expected_root: Optional[str], segment_number: int,
+                   length: Optional[int] = None) -> Dict[str, Any]:
+    """Re-hash one segment, or its first `length` bytes; runs in a worker process."""
+    corrupted_entries = []
+    leaves = []
+    consumed = 0
+    with open(path, "rb") as f:
+        for line_num, raw in enumerate(f, 1):
+            if length is not None and consumed >= length:
+                # Appended after expected_root was taken
+                break
+            consumed += len(raw)
+            leaves.append(leaf_hash(raw))
+            try:
+                entry = json.loads(raw)
+            except json.JSONDecodeError:
+                corrupted_entries.append({
+                    "segment": segment_number,
+                    "line": line_num,
+                    "error": "Invalid JSON"
+                })
+                continue
+            
+            # Verify hash integrity
+            stored_hash = entry.pop("sha256", None)
+            calculated_hash = hashlib.sha256(json.dumps(entry, sort_keys=True).encode()).hexdigest()
+            
+            if stored_hash != calculated_hash:
+                corrupted_entries.append({
+                    "segment": segment_number,
+                    "line": line_num,
+                    "sequence_id": entry.get("sequence_id"),
+                    "expected_hash": calculated_hash,
+                    "stored_hash": stored_hash
+                })
+    
+    merkle_root = MerkleTree.build(leaves).root()
+    return {
+        "segment": segment_number,
+        "entries_verified": len(leaves),
+        "corrupted_entries": corrupted_entries,
+        "merkle_root": merkle_root,
+        "merkle_root_valid": expected_root is None or merkle_root == expected_root
+    }
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Content-addressed memoization of Semantic Reasoner inference results.
+
+Entries are keyed by a canonical hash of the inference input and tagged with
+the rules version they were computed under. Adding a rule bumps the version,
+drops only the entries whose node types the rule can match, and carries the
+rest forward to the new version.
+"""
+
+import json
+import hashlib
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Set
+
+def content_digest(payload: Dict[str, Any]) -> str:
+    """SHA-256 over canonical JSON (sorted keys, no whitespace)."""
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+class InferenceCache:
+    """LRU cache bounded by entry count and by approximate result size."""
+    
+    def __init__(self, maxsize: int = 1000, max_bytes: int = 256 * 1024 * 1024):
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self.rules_version = 0
+        # key -> {"result", "types", "size", "rules_version"}
+        self.entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+    
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self.entries.get(key)
+        if entry is None or entry["rules_version"] != self.rules_version:
+            if entry is not None:
+                self._drop(key)
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry["result"]
+    
+    def peek(self, key: str) -> Optional[Dict[str, Any]]:
+        """Look up without touching LRU order or hit counters."""
+        entry = self.entries.get(key)
+        return entry["result"] if entry is not None else None
+    
+    def put(self, key: str, result: Dict[str, Any], types: Set[Any], rules_version: int):
+        if rules_version != self.rules_version:
+            # Computed under rules that changed while it ran
+            return
+        size = len(json.dumps(result, default=str))
+        if size > self.max_bytes:
+            return
+        if key in self.entries:
+            self._drop(key)
+        self.entries[key] = {"result": result, "types": types, "size": size, "rules_version": rules_version}
+        self.bytes += size
+        while len(self.entries) > self.maxsize or self.bytes > self.max_bytes:
+            oldest = next(iter(self.entries))
+            self._drop(oldest)
+            self.evictions += 1
+    
+    def _drop(self, key: str):
+        entry = self.entries.pop(key)
+        self.bytes -= entry["size"]
+    
+    def rules_changed(self, affected_types: Optional[Set[str]]) -> int:
+        """Bump the rules version; drop entries a rule over affected_types could change.
+        
+        affected_types None means the rule can match any node, so everything goes.
+        Returns the number of entries invalidated.
+        """
+        self.rules_version += 1
+        removed = 0
+        for key in list(self.entries):
+            entry = self.entries[key]
+            if affected_types is None or affected_types <= entry["types"]:
+                self._drop(key)
+                removed += 1
+            else:
+                entry["rules_version"] = self.rules_version
+        self.invalidations += removed
+        return removed
+    
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "bytes": self.bytes,
+            "rules_version": self.rules_version,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations
+        }
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Candidate-driven inference for the Semantic Reasoner.
+
+Nodes are loaded into a column table and bucketed by type and by timestamp.
+Each rule asks only the buckets it can match for candidate pairs (model x
+data, timestamp neighbours within a window), then its predicate runs over the
+whole candidate batch at once. Work grows with the number of plausible edges
+rather than with every pair of nodes.
+"""
+
+import math
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from itertools import compress
+from typing import Dict, Any, List, Optional, Iterator, Tuple
+
+DEFAULT_TEMPORAL_WINDOW = 3600.0
+CANDIDATE_CHUNK = 65536
+
+class InferenceRule:
+    """A source-type -> target-type relation, optionally bounded in time."""
+    
+    def __init__(self, rule_id: str, relation: str, inference_type: str, confidence: float,
+                 source_type: Optional[str] = None, target_type: Optional[str] = None,
+                 temporal: bool = False, max_time_delta: Optional[float] = None,
+                 listed_order: bool = False,
+                 reasoning: str = "{relation} inferred between {source} and {target}"):
+        self.rule_id = rule_id
+        self.relation = relation
+        self.inference_type = inference_type
+        self.confidence = confidence
+        self.source_type = source_type
+        self.target_type = target_type
+        # Temporal rules pair a node with later nodes inside the time window
+        self.temporal = temporal
+        self.max_time_delta = max_time_delta
+        # Only pair a source with targets listed after it in the request
+        self.listed_order = listed_order
+        self.reasoning = reasoning
+    
+    def types(self) -> Optional[set]:
+        """Node types a graph must contain for this rule to fire; None if it needs none."""
+        required = {t for t in (self.source_type, self.target_type) if t is not None}
+        return required or None
+
+BUILTIN_RULES = [
+    InferenceRule(
+        "builtin-type", "trained_on", "type_based", 0.85,
+        source_type="model", target_type="data", listed_order=True,
+        reasoning="Model {source} likely trained on data {target}"
+    ),
+    InferenceRule(
+        "builtin-temporal", "temporal_successor", "temporal", 0.75, temporal=True,
+        reasoning="Temporal relationship inferred between {source} and {target}"
+    ),
+]
+
+def _finite(value: Any, name: str) -> float:
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be a number")
+    if not math.isfinite(number):
+        raise ValueError(f"{name} must be finite")
+    return number
+
+def rule_from_definition(rule: Dict[str, Any]) -> Optional[InferenceRule]:
+    """Compile a stored reasoning rule; None if it has no machine-readable condition.
+    
+    Conditions are dicts with ``source_type``/``target_type`` and an optional
+    ``max_time_delta`` in seconds; the first conclusion's ``relation`` names
+    the inferred edge. Raises ValueError unless the confidence weight is a
+    finite number and any time delta a finite, non-negative one.
+    """
+    if not rule.get("active", True):
+        return None
+    condition = next((c for c in rule.get("conditions", []) if isinstance(c, dict)), None)
+    if not condition or not (condition.get("source_type") or condition.get("target_type")):
+        return None
+    conclusion = next((c for c in rule.get("conclusions", []) if isinstance(c, dict)), {})
+    confidence = _finite(rule.get("confidence_weight", 0.8), "confidence_weight")
+    max_time_delta = condition.get("max_time_delta")
+    if max_time_delta is not None:
+        max_time_delta = _finite(max_time_delta, "max_time_delta")
+        if max_time_delta < 0:
+            raise ValueError("max_time_delta must be non-negative")
+    return InferenceRule(
+        rule["rule_id"],
+        conclusion.get("relation", rule.get("name", "related_to")),
+        "rule_based",
+        confidence,
+        source_type=condition.get("source_type"),
+        target_type=condition.get("target_type"),
+        temporal=max_time_delta is not None,
+        max_time_delta=max_time_delta,
+        reasoning=f"Rule {rule.get('name', rule['rule_id'])}: {{source}} -> {{target}}"
+    )
+
+def parse_timestamp(value: Any) -> Optional[float]:
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+        except ValueError:
+            return None
+    return None
+
+class NodeTable:
+    """Column view of the request's nodes with type and time buckets."""
+    
+    def __init__(self, nodes: List[Dict[str, Any]]):
+        self.ids = [node.get("id") for node in nodes]
+        self.types = [node.get("type") for node in nodes]
+        self.timestamps = [parse_timestamp((node.get("meta") or {}).get("timestamp")) for node in nodes]
+        self.by_type: Dict[Any, List[int]] = {}
+        for row, node_type in enumerate(self.types):
+            self.by_type.setdefault(node_type, []).append(row)
+        # Timed rows sorted by (timestamp, original position) for window scans
+        self._timed: Dict[Any, Tuple[List[float], List[int]]] = {}
+    
+    def timed(self, node_type: Optional[str] = None) -> Tuple[List[float], List[int]]:
+        """Sorted (timestamps, rows) for one type, or for all timed nodes."""
+        if node_type not in self._timed:
+            rows = self.by_type.get(node_type, []) if node_type is not None else range(len(self.ids))
+            pairs = sorted((self.timestamps[row], row) for row in rows if self.timestamps[row] is not None)
+            self._timed[node_type] = ([ts for ts, _ in pairs], [row for _, row in pairs])
+        return self._timed[node_type]
+
+def candidate_pairs(rule: InferenceRule, table: NodeTable, window: float,
+                    chunk_size: int = CANDIDATE_CHUNK) -> Iterator[Tuple[List[int], List[int]]]:
+    """Chunks of (source rows, target rows) the rule could connect, drawn only from compatible buckets."""
+    sources, targets = [], []
+    if rule.temporal:
+        delta = rule.max_time_delta if rule.max_time_delta is not None else window
+        src_times, src_rows = table.timed(rule.source_type)
+        dst_times, dst_rows = table.timed(rule.target_type)
+        same_bucket = rule.source_type == rule.target_type
+        for position, (ts, row) in enumerate(zip(src_times, src_rows)):
+            # Successors: later in (timestamp, position) order, at most delta away
+            start = position + 1 if same_bucket else bisect_left(dst_times, ts)
+            end = bisect_right(dst_times, ts + delta)
+            for target in dst_rows[start:end]:
+                if target != row:
+                    sources.append(row)
+                    targets.append(target)
+            if len(sources) >= chunk_size:
+                yield sources, targets
+                sources, targets = [], []
+    else:
+        src_rows = table.by_type.get(rule.source_type, []) if rule.source_type is not None else range(len(table.ids))
+        dst_rows = table.by_type.get(rule.target_type, []) if rule.target_type is not None else range(len(table.ids))
+        for row in src_rows:
+            # Row lists are ascending, so later-listed targets are a suffix
+            later = dst_rows[bisect_right(dst_rows, row):] if rule.listed_order else dst_rows
+            for target in later:
+                if target != row:
+                    sources.append(row)
+                    targets.append(target)
+            if len(sources) >= chunk_size:
+                yield sources, targets
+                sources, targets = [], []
+    if sources:
+        yield sources, targets
+
+def infer(nodes: List[Dict[str, Any]], rules: List[InferenceRule], confidence_threshold: float,
+          temporal_window: float = DEFAULT_TEMPORAL_WINDOW,
+          max_inferences: Optional[int] = None) -> Dict[str, Any]:
+    """Apply rules in order; each node pair is claimed by the first rule that links it.
+    
+    Candidates are evaluated chunk by chunk; once max_inferences pairs have
+    matched, evaluation stops and the result is marked truncated.
+    """
+    table = NodeTable(nodes)
+    ids = table.ids
+    claimed = set()
+    inferred_edges = []
+    total_inferences = 0
+    candidates_generated = 0
+    truncated = False
+    for rule in rules:
+        emit = rule.confidence >= confidence_threshold
+        for sources, targets in candidate_pairs(rule, table, temporal_window):
+            candidates_generated += len(sources)
+            # Predicate over the whole chunk: the pair is not already claimed by an earlier rule
+            fresh = []
+            for key in ((s, t) if s < t else (t, s) for s, t in zip(sources, targets)):
+                is_fresh = key not in claimed
+                if is_fresh:
+                    claimed.add(key)
+                fresh.append(is_fresh)
+            matched = sum(fresh)
+            total_inferences += matched
+            if emit and matched:
+                for source, target in compress(zip(sources, targets), fresh):
+                    inferred_edges.append({
+                        "source": ids[source],
+                        "target": ids[target],
+                        "relation": rule.relation,
+                        "confidence": rule.confidence,
+                        "inference_type": rule.inference_type,
+                        "reasoning": rule.reasoning.format(
+                            source=ids[source], target=ids[target], relation=rule.relation
+                        )
+                    })
+            if max_inferences is not None and total_inferences >= max_inferences:
+                truncated = True
+                break
+        if truncated:
+            break
+    return {
+        "inferred_edges": inferred_edges,
+        "total_inferences": total_inferences,
+        "candidates_generated": candidates_generated,
+        "node_count": len(ids),
+        "truncated": truncated
+    }
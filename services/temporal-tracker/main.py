@@ -3,16 +3,24 @@ from pydantic import BaseModel
 import os
 import json
 import hashlib
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from typing import Dict, List, Any, Optional
 import logging
 
+from snapshot_store import SnapshotStore
+
 app = FastAPI(title="Temporal Context Tracker", version="1.0.0")
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 SIMULATION_MODE = os.getenv("SIMULATION_MODE", "true").lower() == "true"
 CONTEXT_REFRESH_INTERVAL_MS = int(os.getenv("CONTEXT_REFRESH_INTERVAL_MS", "5000"))
+# Retention policy: snapshots kept per entity, and max age relative to the newest (0 = no age limit)
+SNAPSHOT_RETENTION_COUNT = int(os.getenv("SNAPSHOT_RETENTION_COUNT", "100"))
+SNAPSHOT_RETENTION_SECONDS = float(os.getenv("SNAPSHOT_RETENTION_SECONDS", "0"))
+SNAPSHOT_KEYFRAME_INTERVAL = int(os.getenv("SNAPSHOT_KEYFRAME_INTERVAL", "16"))
+if SNAPSHOT_RETENTION_COUNT < 1:
+    raise ValueError("SNAPSHOT_RETENTION_COUNT must be at least 1")
 
 class ContextSnapshot(BaseModel):
     entity_id: str
@@ -27,9 +35,16 @@ class ContextDrift(BaseModel):
     changed_keys: List[str]
     trend: str
     tenant_id: str
+    snapshots_in_window: int = 0
+    change_frequency: float = 0.0
+    key_churn_rate: float = 0.0
 
-# Mock temporal store
-temporal_store = {}
+# Time-indexed, delta-encoded snapshot store
+temporal_store = SnapshotStore(
+    capacity=SNAPSHOT_RETENTION_COUNT,
+    max_age_seconds=SNAPSHOT_RETENTION_SECONDS,
+    keyframe_interval=SNAPSHOT_KEYFRAME_INTERVAL
+)
 drift_analytics = {}
 
 @app.get("/health")
@@ -42,7 +57,8 @@ async def metrics():
         "tracked_entities": len(temporal_store),
         "drift_calculations": len(drift_analytics),
         "simulation_mode": SIMULATION_MODE,
-        "refresh_interval_ms": CONTEXT_REFRESH_INTERVAL_MS
+        "refresh_interval_ms": CONTEXT_REFRESH_INTERVAL_MS,
+        "snapshot_storage": temporal_store.stats()
     }
 
 @app.post("/temporal/snapshot")
@@ -51,9 +67,6 @@ async def create_snapshot(snapshot: ContextSnapshot):
     try:
         entity_key = f"{snapshot.tenant_id}:{snapshot.entity_id}"
         
-        if entity_key not in temporal_store:
-            temporal_store[entity_key] = []
-        
         # Verify snapshot hash
         context_str = json.dumps(snapshot.context_state, sort_keys=True)
         expected_hash = hashlib.sha256(context_str.encode()).hexdigest()[:16]
@@ -61,23 +74,17 @@ async def create_snapshot(snapshot: ContextSnapshot):
         if snapshot.snapshot_hash != expected_hash:
             raise HTTPException(status_code=400, detail="Snapshot hash mismatch")
         
-        # Store snapshot with timestamp
-        temporal_store[entity_key].append({
-            "context_state": snapshot.context_state,
-            "timestamp": snapshot.timestamp,
-            "hash": snapshot.snapshot_hash
-        })
-        
-        # Keep only last 100 snapshots per entity
-        if len(temporal_store[entity_key]) > 100:
-            temporal_store[entity_key] = temporal_store[entity_key][-100:]
+        # Ring buffer applies the retention policy on append
+        series = temporal_store.append(
+            entity_key, snapshot.context_state, snapshot.timestamp, snapshot.snapshot_hash
+        )
         
         logger.info(f"Stored snapshot for {entity_key}")
         
         return {
             "status": "stored",
             "entity_id": snapshot.entity_id,
-            "snapshot_count": len(temporal_store[entity_key])
+            "snapshot_count": len(series)
         }
         
     except Exception as e:
@@ -88,41 +95,19 @@ async def create_snapshot(snapshot: ContextSnapshot):
 async def calculate_drift(entity_id: str, tenant_id: str, window_minutes: int = 60):
     """Compute context drift and trend analytics"""
     entity_key = f"{tenant_id}:{entity_id}"
+    series = temporal_store.get(entity_key)
     
-    if entity_key not in temporal_store or len(temporal_store[entity_key]) < 2:
+    if series is None or len(series) < 2:
         raise HTTPException(status_code=404, detail="Insufficient snapshots for drift calculation")
     
-    snapshots = temporal_store[entity_key]
-    cutoff_time = datetime.utcnow() - timedelta(minutes=window_minutes)
+    # Binary search on sorted epochs instead of parsing every timestamp
+    cutoff_epoch = (datetime.utcnow() - timedelta(minutes=window_minutes)).replace(tzinfo=timezone.utc).timestamp()
+    low, high = series.window(cutoff_epoch)
     
-    # Filter snapshots within time window
-    recent_snapshots = [
-        s for s in snapshots 
-        if datetime.fromisoformat(s["timestamp"].replace('Z', '+00:00')) > cutoff_time
-    ]
-    
-    if len(recent_snapshots) < 2:
-        return ContextDrift(
-            entity_id=entity_id,
-            drift_score=0.0,
-            changed_keys=[],
-            trend="stable",
-            tenant_id=tenant_id
-        )
-    
-    # Calculate drift between first and last snapshot in window
-    first_context = recent_snapshots[0]["context_state"]
-    last_context = recent_snapshots[-1]["context_state"]
-    
-    # Simple drift calculation
-    all_keys = set(first_context.keys()) | set(last_context.keys())
-    changed_keys = []
-    
-    for key in all_keys:
-        if first_context.get(key) != last_context.get(key):
-            changed_keys.append(key)
-    
-    drift_score = len(changed_keys) / max(len(all_keys), 1)
+    # Metrics over every transition in the window, not just first vs last
+    window_drift = series.drift(low, high)
+    drift_score = window_drift["drift_score"]
+    changed_keys = window_drift["changed_keys"]
     
     # Determine trend
     if drift_score > 0.5:
@@ -137,7 +122,10 @@ async def calculate_drift(entity_id: str, tenant_id: str, window_minutes: int =
         drift_score=drift_score,
         changed_keys=changed_keys,
         trend=trend,
-        tenant_id=tenant_id
+        tenant_id=tenant_id,
+        snapshots_in_window=window_drift["snapshots"],
+        change_frequency=window_drift["change_frequency"],
+        key_churn_rate=window_drift["key_churn_rate"]
     )
     
     # Cache drift analytics
@@ -150,16 +138,22 @@ async def get_history(entity_id: str, tenant_id: str, limit: int = 10):
     """Retrieve temporal context history"""
     entity_key = f"{tenant_id}:{entity_id}"
     
-    if entity_key not in temporal_store:
+    series = temporal_store.get(entity_key)
+    
+    if series is None:
         raise HTTPException(status_code=404, detail="No history found")
     
-    snapshots = temporal_store[entity_key][-limit:]
+    # Rebuild full states for the requested tail from the nearest keyframe
+    snapshots = [
+        {"context_state": state, "timestamp": slot["timestamp"], "hash": slot["hash"]}
+        for slot, state in series.iter_states(max(len(series) - limit, 0), len(series))
+    ]
     
     return {
         "entity_id": entity_id,
         "tenant_id": tenant_id,
         "snapshots": snapshots,
-        "total_count": len(temporal_store[entity_key])
+        "total_count": len(series)
     }
 
 if __name__ == "__main__":
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Time-indexed snapshot storage for the Temporal Context Tracker.
+
+Each entity keeps a fixed-capacity ring of snapshots ordered by epoch. Only
+periodic keyframes hold a full ``context_state``; every other snapshot holds
+the delta from its predecessor. Per-snapshot change counts are kept as running
+totals, so window drift metrics are differences of two counters and window
+bounds are two binary searches.
+"""
+
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional, Iterator, Tuple
+
+DEFAULT_CAPACITY = 100
+DEFAULT_KEYFRAME_INTERVAL = 16
+
+_MISSING = object()
+
+def to_epoch(timestamp: str) -> float:
+    """ISO-8601 to epoch seconds; naive timestamps are taken as UTC."""
+    parsed = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+def diff_states(previous: Dict[str, Any], current: Dict[str, Any]) -> Dict[str, Any]:
+    """Delta turning previous into current: changed/added keys and removed keys."""
+    changed = {k: v for k, v in current.items() if previous.get(k, _MISSING) != v}
+    removed = [k for k in previous if k not in current]
+    return {"set": changed, "unset": removed}
+
+def apply_delta(state: Dict[str, Any], delta: Dict[str, Any]) -> Dict[str, Any]:
+    result = dict(state)
+    for key in delta["unset"]:
+        result.pop(key, None)
+    result.update(delta["set"])
+    return result
+
+class SnapshotSeries:
+    """Ring buffer of one entity's snapshots, delta-encoded between keyframes."""
+    
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, max_age_seconds: float = 0,
+                 keyframe_interval: int = DEFAULT_KEYFRAME_INTERVAL):
+        if capacity < 1:
+            raise ValueError("snapshot capacity must be at least 1")
+        self.capacity = capacity
+        self.max_age_seconds = max_age_seconds
+        self.keyframe_interval = keyframe_interval
+        # slot -> {"epoch", "timestamp", "hash", "delta", "keyframe",
+        #          "key_changes", "cum_changed", "cum_key_changes"}
+        self.slots: List[Optional[Dict[str, Any]]] = [None] * capacity
+        self.start = 0
+        self.count = 0
+        self.since_keyframe = 0
+        self.latest_state: Dict[str, Any] = {}
+        self.evicted = 0
+    
+    def __len__(self) -> int:
+        return self.count
+    
+    def _slot(self, index: int) -> Dict[str, Any]:
+        return self.slots[(self.start + index) % self.capacity]
+    
+    def epoch_at(self, index: int) -> float:
+        return self._slot(index)["epoch"]
+    
+    def bisect_epoch(self, epoch: float, right: bool = False) -> int:
+        """First logical index whose epoch is >= epoch (> epoch when right)."""
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            value = self.epoch_at(middle)
+            if value < epoch or (right and value == epoch):
+                low = middle + 1
+            else:
+                high = middle
+        return low
+    
+    def append(self, state: Dict[str, Any], timestamp: str, snapshot_hash: str, epoch: float):
+        if self.count and epoch < self.epoch_at(self.count - 1):
+            self._insert_out_of_order(state, timestamp, snapshot_hash, epoch)
+            return
+        previous = self._slot(self.count - 1) if self.count else None
+        delta = diff_states(self.latest_state, state) if previous else {"set": {}, "unset": []}
+        key_changes = len(delta["set"]) + len(delta["unset"])
+        keyframe = None
+        if previous is None or self.since_keyframe + 1 >= self.keyframe_interval:
+            keyframe = dict(state)
+            self.since_keyframe = 0
+        else:
+            self.since_keyframe += 1
+        entry = {
+            "epoch": epoch,
+            "timestamp": timestamp,
+            "hash": snapshot_hash,
+            "delta": delta,
+            "keyframe": keyframe,
+            "key_changes": key_changes,
+            "cum_changed": (previous["cum_changed"] if previous else 0) + (key_changes > 0),
+            "cum_key_changes": (previous["cum_key_changes"] if previous else 0) + key_changes
+        }
+        if self.count == self.capacity:
+            self._evict_oldest()
+            if self.count == 0 and keyframe is None:
+                # Single-slot ring: the new entry is also the oldest, so it must be self-contained
+                entry["keyframe"] = dict(state)
+                self.since_keyframe = 0
+        self.slots[(self.start + self.count) % self.capacity] = entry
+        self.count += 1
+        self.latest_state = dict(state)
+        if self.max_age_seconds > 0:
+            while self.count > 1 and self.epoch_at(0) < epoch - self.max_age_seconds:
+                self._evict_oldest()
+    
+    def _evict_oldest(self):
+        if self.count > 1:
+            successor = self._slot(1)
+            if successor["keyframe"] is None:
+                # The new oldest snapshot must be self-contained
+                successor["keyframe"] = self.state_at(1)
+        self.slots[self.start] = None
+        self.start = (self.start + 1) % self.capacity
+        self.count -= 1
+        self.evicted += 1
+    
+    def _insert_out_of_order(self, state: Dict[str, Any], timestamp: str, snapshot_hash: str, epoch: float):
+        # Rare path: re-encode the series with the late snapshot in place
+        position = self.bisect_epoch(epoch, right=True)
+        entries = [
+            (self.state_at(i), self._slot(i)["timestamp"], self._slot(i)["hash"], self.epoch_at(i))
+            for i in range(self.count)
+        ]
+        entries.insert(position, (state, timestamp, snapshot_hash, epoch))
+        evicted = self.evicted
+        self.slots = [None] * self.capacity
+        self.start = self.count = self.since_keyframe = 0
+        self.latest_state = {}
+        for entry in entries:
+            self.append(*entry)
+        self.evicted = evicted + len(entries) - self.count
+    
+    def state_at(self, index: int) -> Dict[str, Any]:
+        """Full context_state of one snapshot, replayed from the nearest keyframe."""
+        base = index
+        while self._slot(base)["keyframe"] is None:
+            base -= 1
+        state = self._slot(base)["keyframe"]
+        for i in range(base + 1, index + 1):
+            state = apply_delta(state, self._slot(i)["delta"])
+        return dict(state)
+    
+    def iter_states(self, low: int, high: int) -> Iterator[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        """(slot, full state) for logical indexes low..high-1, replaying once."""
+        if low >= high:
+            return
+        state = self.state_at(low)
+        yield self._slot(low), state
+        for i in range(low + 1, high):
+            slot = self._slot(i)
+            state = dict(slot["keyframe"]) if slot["keyframe"] is not None else apply_delta(state, slot["delta"])
+            yield slot, state
+    
+    def window(self, start_epoch: float, end_epoch: Optional[float] = None) -> Tuple[int, int]:
+        """Logical index range of snapshots with start_epoch < epoch <= end_epoch."""
+        low = self.bisect_epoch(start_epoch, right=True)
+        high = self.count if end_epoch is None else self.bisect_epoch(end_epoch, right=True)
+        return low, max(low, high)
+    
+    def drift(self, low: int, high: int) -> Dict[str, Any]:
+        """Drift metrics over every transition inside the window [low, high)."""
+        transitions = high - low - 1
+        if transitions < 1:
+            return {
+                "snapshots": max(high - low, 0),
+                "transitions": 0,
+                "changed_transitions": 0,
+                "key_changes": 0,
+                "change_frequency": 0.0,
+                "key_churn_rate": 0.0,
+                "changed_keys": [],
+                "observed_keys": 0,
+                "drift_score": 0.0
+            }
+        first, last = self._slot(low), self._slot(high - 1)
+        # Running totals: the window's sums are two subtractions
+        changed_transitions = last["cum_changed"] - first["cum_changed"]
+        key_changes = last["cum_key_changes"] - first["cum_key_changes"]
+        observed = set(self.state_at(low))
+        changed_keys = set()
+        for i in range(low + 1, high):
+            delta = self._slot(i)["delta"]
+            changed_keys.update(delta["set"])
+            changed_keys.update(delta["unset"])
+        observed |= changed_keys
+        return {
+            "snapshots": high - low,
+            "transitions": transitions,
+            "changed_transitions": changed_transitions,
+            "key_changes": key_changes,
+            "change_frequency": round(changed_transitions / transitions, 4),
+            "key_churn_rate": round(key_changes / (transitions * max(len(observed), 1)), 4),
+            "changed_keys": sorted(changed_keys),
+            "observed_keys": len(observed),
+            "drift_score": round(len(changed_keys) / max(len(observed), 1), 4)
+        }
+    
+    def stats(self) -> Dict[str, Any]:
+        slots = [self._slot(i) for i in range(self.count)]
+        keyframes = sum(1 for slot in slots if slot["keyframe"] is not None)
+        return {
+            "snapshots": self.count,
+            "keyframes": keyframes,
+            "stored_values": sum(
+                len(slot["keyframe"]) if slot["keyframe"] is not None
+                else len(slot["delta"]["set"]) + len(slot["delta"]["unset"])
+                for slot in slots
+            ),
+            "evicted": self.evicted
+        }
+
+class SnapshotStore:
+    """Per-entity snapshot series sharing one retention policy."""
+    
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, max_age_seconds: float = 0,
+                 keyframe_interval: int = DEFAULT_KEYFRAME_INTERVAL):
+        self.capacity = capacity
+        self.max_age_seconds = max_age_seconds
+        self.keyframe_interval = keyframe_interval
+        self.series: Dict[str, SnapshotSeries] = {}
+    
+    def append(self, entity_key: str, state: Dict[str, Any], timestamp: str, snapshot_hash: str) -> SnapshotSeries:
+        series = self.series.get(entity_key)
+        if series is None:
+            series = SnapshotSeries(self.capacity, self.max_age_seconds, self.keyframe_interval)
+            self.series[entity_key] = series
+        series.append(state, timestamp, snapshot_hash, to_epoch(timestamp))
+        return series
+    
+    def get(self, entity_key: str) -> Optional[SnapshotSeries]:
+        return self.series.get(entity_key)
+    
+    def __contains__(self, entity_key: str) -> bool:
+        return entity_key in self.series
+    
+    def __len__(self) -> int:
+        return len(self.series)
+    
+    def stats(self) -> Dict[str, Any]:
+        totals = {"snapshots": 0, "keyframes": 0, "stored_values": 0, "evicted": 0}
+        for series in self.series.values():
+            for field, value in series.stats().items():
+                totals[field] += value
+        return totals
@@ -0,0 +1,228 @@
+import time
+import heapq
+import socket
+import ipaddress
+from collections import OrderedDict, deque
+from typing import Dict, Any, List, Optional, Tuple
+
+class SlidingWindowCounter:
+    """Per-key event counts over a sliding window of fixed-width time buckets.
+    
+    Each key owns a small ring of buckets plus a running total, so recording an
+    event and reading the windowed count are both O(1) amortised. Idle keys are
+    evicted LRU-style once max_keys is exceeded.
+    """
+    
+    def __init__(self, window_seconds: float, buckets: int = 60, max_keys: int = 100000):
+        self.window_seconds = window_seconds
+        self.buckets = buckets
+        self.bucket_width = window_seconds / buckets
+        self.max_keys = max_keys
+        # key -> [counts, bucket_ids, total, last_bucket]
+        self.keys: "OrderedDict[str, list]" = OrderedDict()
+    
+    def _advance(self, state: list, bucket_id: int):
+        counts, bucket_ids = state[0], state[1]
+        # Expire every slot between the last seen bucket and now (at most one lap)
+        for step in range(1, min(bucket_id - state[3], self.buckets) + 1):
+            slot = (state[3] + step) % self.buckets
+            state[2] -= counts[slot]
+            counts[slot] = 0
+            bucket_ids[slot] = state[3] + step
+        if bucket_id > state[3]:
+            state[3] = bucket_id
+    
+    def add(self, key: str, now: Optional[float] = None, amount: int = 1) -> int:
+        """Record events for key and return its count within the window."""
+        bucket_id = int((now if now is not None else time.time()) / self.bucket_width)
+        state = self.keys.get(key)
+        if state is None:
+            state = [[0] * self.buckets, [bucket_id] * self.buckets, 0, bucket_id]
+            self.keys[key] = state
+            if len(self.keys) > self.max_keys:
+                self.keys.popitem(last=False)
+        else:
+            self.keys.move_to_end(key)
+            if bucket_id != state[3]:
+                self._advance(state, bucket_id)
+        
+        slot = bucket_id % self.buckets
+        if state[1][slot] == bucket_id:
+            state[0][slot] += amount
+            state[2] += amount
+        return state[2]
+    
+    def count(self, key: str, now: Optional[float] = None) -> int:
+        state = self.keys.get(key)
+        if state is None:
+            return 0
+        self._advance(state, int((now if now is not None else time.time()) / self.bucket_width))
+        return state[2]
+    
+    def __len__(self) -> int:
+        return len(self.keys)
+
+class CIDRBlocklist:
+    """Binary radix tree of blocked networks with per-entry TTL expiry."""
+    
+    def __init__(self):
+        # node = [child_0, child_1, entry]; one tree per address family
+        self.roots = {4: [None, None, None], 6: [None, None, None]}
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.expiry_heap: List[Tuple[float, str]] = []
+    
+    @staticmethod
+    def _bits(network) -> Tuple[int, int, int]:
+        return network.version, int(network.network_address), network.max_prefixlen
+    
+    @staticmethod
+    def _key(network) -> str:
+        # Single hosts are listed as plain addresses, ranges in CIDR notation
+        if network.prefixlen == network.max_prefixlen:
+            return str(network.network_address)
+        return str(network)
+    
+    def add(self, cidr: str, ttl: Optional[float] = None, reason: str = "") -> Dict[str, Any]:
+        network = ipaddress.ip_network(cidr, strict=False)
+        version, value, width = self._bits(network)
+        node = self.roots[version]
+        for depth in range(network.prefixlen):
+            bit = (value >> (width - 1 - depth)) & 1
+            if node[bit] is None:
+                node[bit] = [None, None, None]
+            node = node[bit]
+        
+        now = time.time()
+        entry = {
+            "network": self._key(network),
+            "reason": reason,
+            "blocked_at": now,
+            "expires_at": now + ttl if ttl else None
+        }
+        node[2] = entry
+        self.entries[entry["network"]] = entry
+        if entry["expires_at"]:
+            heapq.heappush(self.expiry_heap, (entry["expires_at"], entry["network"]))
+        return entry
+    
+    def get(self, cidr: str) -> Optional[Dict[str, Any]]:
+        """Entry listed for exactly this network, if any."""
+        return self.entries.get(self._key(ipaddress.ip_network(cidr, strict=False)))
+    
+    def remove(self, cidr: str) -> bool:
+        network = ipaddress.ip_network(cidr, strict=False)
+        version, value, width = self._bits(network)
+        node = self.roots[version]
+        # (parent, bit) pairs leading to the entry's node
+        path = []
+        for depth in range(network.prefixlen):
+            bit = (value >> (width - 1 - depth)) & 1
+            path.append((node, bit))
+            node = node[bit]
+            if node is None:
+                return False
+        if node[2] is None:
+            return False
+        node[2] = None
+        self.entries.pop(self._key(network), None)
+        # Prune nodes left with no entry and no children
+        for parent, bit in reversed(path):
+            child = parent[bit]
+            if child[0] is not None or child[1] is not None or child[2] is not None:
+                break
+            parent[bit] = None
+        return True
+    
+    @staticmethod
+    def _parse(ip: str) -> Optional[Tuple[int, int, int]]:
+        """(version, integer value, width) for ip, or None if it is not an address."""
+        # inet_pton takes the same strict dotted quads as ipaddress at a fraction of the cost
+        try:
+            return 4, int.from_bytes(socket.inet_pton(socket.AF_INET, ip), "big"), 32
+        except (OSError, TypeError, ValueError):
+            pass
+        try:
+            address = ipaddress.ip_address(ip)
+        except ValueError:
+            return None
+        return address.version, int(address), address.max_prefixlen
+    
+    def match(self, ip: str, now: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Most specific unexpired network containing ip, walking at most 32/128 bits."""
+        parsed = self._parse(ip)
+        if parsed is None:
+            return None
+        now = now if now is not None else time.time()
+        version, value, width = parsed
+        node = self.roots[version]
+        best = None
+        # Counting the shift down saves a subtraction and compare per bit
+        shift = width - 1
+        while node is not None:
+            entry = node[2]
+            if entry is not None and (entry["expires_at"] is None or entry["expires_at"] > now):
+                best = entry
+            if shift < 0:
+                break
+            node = node[(value >> shift) & 1]
+            shift -= 1
+        return best
+    
+    def expire(self, now: Optional[float] = None) -> int:
+        """Drop entries whose TTL has passed; returns how many were removed."""
+        now = now if now is not None else time.time()
+        removed = 0
+        while self.expiry_heap and self.expiry_heap[0][0] <= now:
+            expires_at, network = heapq.heappop(self.expiry_heap)
+            entry = self.entries.get(network)
+            # Skip heap records superseded by a later add of the same network
+            if entry is not None and entry["expires_at"] == expires_at:
+                self.remove(network)
+                removed += 1
+        return removed
+    
+    def __contains__(self, ip: str) -> bool:
+        return self.match(ip) is not None
+    
+    def __len__(self) -> int:
+        return len(self.entries)
+    
+    def networks(self) -> List[str]:
+        self.expire()
+        return list(self.entries)
+
+class ThreatIndex:
+    """Threats by id with bounded, insertion-ordered retention and severity counters."""
+    
+    def __init__(self, max_threats: int = 10000):
+        self.max_threats = max_threats
+        self.by_id: Dict[str, Dict[str, Any]] = {}
+        # (threat_id, detected_at epoch) oldest first
+        self.order: deque = deque()
+        self.severity_counts: Dict[str, int] = {}
+    
+    def add(self, threat: Dict[str, Any], detected_at: Optional[float] = None):
+        if len(self.order) >= self.max_threats:
+            evicted_id, _ = self.order.popleft()
+            evicted = self.by_id.pop(evicted_id, None)
+            if evicted is not None:
+                self.severity_counts[evicted["severity"]] -= 1
+        self.by_id[threat["id"]] = threat
+        self.order.append((threat["id"], detected_at if detected_at is not None else time.time()))
+        self.severity_counts[threat["severity"]] = self.severity_counts.get(threat["severity"], 0) + 1
+    
+    def get(self, threat_id: str) -> Optional[Dict[str, Any]]:
+        return self.by_id.get(threat_id)
+    
+    def since(self, cutoff: float) -> List[Dict[str, Any]]:
+        """Threats detected after cutoff, oldest first, scanning only the recent tail."""
+        recent = []
+        for threat_id, detected_at in reversed(self.order):
+            if detected_at <= cutoff:
+                break
+            recent.append(self.by_id[threat_id])
+        recent.reverse()
+        return recent
+    
+    def __len__(self) -> int:
+        return len(self.by_id)
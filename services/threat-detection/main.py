@@ -5,10 +5,13 @@ import os
 import json
 import time
 import asyncio
+import itertools
 from datetime import datetime, timedelta
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import hashlib
 
+from detection_state import SlidingWindowCounter, CIDRBlocklist, ThreatIndex
+
 app = FastAPI(title="ATOM Threat Detection", version="1.0.0")
 
 app.add_middleware(
@@ -20,6 +23,10 @@ app.add_middleware(
 )
 
 SIMULATION_MODE = os.getenv("SIMULATION_MODE", "true").lower() == "true"
+MAX_ACTIVE_THREATS = int(os.getenv("MAX_ACTIVE_THREATS", "10000"))
+BLOCK_TTL_SECONDS = int(os.getenv("BLOCK_TTL_SECONDS", "3600"))
+BRUTE_FORCE_WINDOW_SECONDS = int(os.getenv("BRUTE_FORCE_WINDOW_SECONDS", "300"))
+BURST_WINDOW_SECONDS = int(os.getenv("BURST_WINDOW_SECONDS", "10"))
 
 class ThreatEvent(BaseModel):
     source_ip: str
@@ -34,15 +41,27 @@ class ThreatRule(BaseModel):
     action: str = "alert"
     threshold: int = 5
 
-# In-memory threat storage for simulation
-active_threats = []
-blocked_ips = set()
+class BlockRequest(BaseModel):
+    cidr: str
+    ttl_seconds: Optional[int] = None
+    reason: str = "manual"
+
+# In-memory detection state
+active_threats = ThreatIndex(MAX_ACTIVE_THREATS)
+blocked_ips = CIDRBlocklist()
+failed_login_window = SlidingWindowCounter(BRUTE_FORCE_WINDOW_SECONDS)
+request_rate_window = SlidingWindowCounter(BURST_WINDOW_SECONDS, buckets=10)
+threat_sequence = itertools.count(1)
 threat_rules = [
     {"name": "Brute Force Detection", "pattern": "failed_login", "threshold": 5, "action": "block"},
     {"name": "SQL Injection", "pattern": "sql_injection", "threshold": 1, "action": "block"},
     {"name": "Rate Limiting", "pattern": "high_frequency", "threshold": 100, "action": "throttle"}
 ]
 
+def rule_threshold(pattern: str, default: int) -> int:
+    rule = next((r for r in threat_rules if r["pattern"] == pattern and r.get("status", "active") == "active"), None)
+    return rule["threshold"] if rule else default
+
 def log_threat(threat_data: Dict[str, Any]):
     timestamp = datetime.utcnow().isoformat()
     log_entry = {
@@ -69,12 +88,31 @@ async def health():
 
 @app.post("/analyze")
 async def analyze_threat(event: ThreatEvent, background_tasks: BackgroundTasks):
-    threat_id = f"threat-{int(time.time())}-{hash(event.source_ip) % 10000}"
+    now = time.time()
+    threat_id = f"threat-{int(now)}-{hash(event.source_ip) % 10000}-{next(threat_sequence)}"
     
-    # Simulate threat analysis
     risk_score = 0
     detected_patterns = []
     
+    # Source already covered by a blocked network
+    block = blocked_ips.match(event.source_ip, now)
+    if block:
+        risk_score += 100
+        detected_patterns.append("blocked_source")
+    
+    # Sliding-window rate detection per source IP
+    request_count = request_rate_window.add(event.source_ip, now)
+    if request_count >= rule_threshold("high_frequency", 100):
+        risk_score += 40
+        detected_patterns.append("burst_rate")
+    
+    if event.event_type == "failed_login":
+        failed_logins = failed_login_window.add(event.source_ip, now)
+        if failed_logins >= rule_threshold("failed_login", 5):
+            risk_score += 50
+            detected_patterns.append("brute_force")
+    
+    # Simulate threat analysis
     if SIMULATION_MODE:
         # Simulate various threat patterns
         if "admin" in event.payload.get("username", "").lower():
@@ -98,7 +136,11 @@ async def analyze_threat(event: ThreatEvent, background_tasks: BackgroundTasks):
     action_taken = "logged"
     if risk_score >= 70:
         action_taken = "blocked"
-        blocked_ips.add(event.source_ip)
+        if not block:
+            try:
+                blocked_ips.add(event.source_ip, BLOCK_TTL_SECONDS, reason=threat_id)
+            except ValueError:
+                log_threat({"id": threat_id, "error": f"Cannot block non-IP source {event.source_ip}"})
         event.severity = "high"
     elif risk_score >= 40:
         action_taken = "flagged"
@@ -117,11 +159,8 @@ async def analyze_threat(event: ThreatEvent, background_tasks: BackgroundTasks):
         "payload": event.payload
     }
     
-    active_threats.append(threat_data)
-    
-    # Keep only last 100 threats in memory
-    if len(active_threats) > 100:
-        active_threats.pop(0)
+    # Bounded retention: the oldest threat is evicted once the index is full
+    active_threats.add(threat_data, now)
     
     # Log threat asynchronously
     background_tasks.add_task(log_threat, threat_data)
@@ -138,18 +177,13 @@ async def analyze_threat(event: ThreatEvent, background_tasks: BackgroundTasks):
 @app.get("/threats/active")
 async def get_active_threats():
     # Filter threats from last 24 hours
-    cutoff_time = datetime.utcnow() - timedelta(hours=24)
-    
-    recent_threats = []
-    for threat in active_threats:
-        threat_time = datetime.fromisoformat(threat["timestamp"].replace("Z", "+00:00"))
-        if threat_time > cutoff_time:
-            recent_threats.append(threat)
+    cutoff_time = time.time() - timedelta(hours=24).total_seconds()
+    recent_threats = active_threats.since(cutoff_time)
     
     return {
         "threats": recent_threats,
         "count": len(recent_threats),
-        "blocked_ips": list(blocked_ips),
+        "blocked_ips": blocked_ips.networks(),
         "summary": {
             "critical": len([t for t in recent_threats if t["severity"] == "critical"]),
             "high": len([t for t in recent_threats if t["severity"] == "high"]),
@@ -161,7 +195,7 @@ async def get_active_threats():
 
 @app.get("/threats/{threat_id}")
 async def get_threat_details(threat_id: str):
-    threat = next((t for t in active_threats if t["id"] == threat_id), None)
+    threat = active_threats.get(threat_id)
     if not threat:
         raise HTTPException(status_code=404, detail="Threat not found")
     
@@ -169,16 +203,20 @@ async def get_threat_details(threat_id: str):
 
 @app.post("/threats/{threat_id}/resolve")
 async def resolve_threat(threat_id: str):
-    threat = next((t for t in active_threats if t["id"] == threat_id), None)
+    threat = active_threats.get(threat_id)
     if not threat:
         raise HTTPException(status_code=404, detail="Threat not found")
     
     threat["status"] = "resolved"
     threat["resolved_at"] = datetime.utcnow().isoformat()
     
-    # Remove from blocked IPs if it was blocked
-    if threat["source_ip"] in blocked_ips:
-        blocked_ips.remove(threat["source_ip"])
+    # Remove the host block if this threat created it
+    try:
+        block = blocked_ips.get(threat["source_ip"])
+        if block is not None and block["reason"] == threat_id:
+            blocked_ips.remove(threat["source_ip"])
+    except ValueError:
+        pass
     
     return {
         "threat_id": threat_id,
@@ -216,16 +254,44 @@ async def create_threat_rule(rule: ThreatRule):
 
 @app.get("/blocked-ips")
 async def get_blocked_ips():
+    networks = blocked_ips.networks()
     return {
-        "blocked_ips": list(blocked_ips),
-        "count": len(blocked_ips),
+        "blocked_ips": networks,
+        "count": len(networks),
         "timestamp": datetime.utcnow().isoformat()
     }
 
-@app.post("/blocked-ips/{ip}/unblock")
+@app.post("/blocked-ips")
+async def block_network(request: BlockRequest):
+    try:
+        entry = blocked_ips.add(request.cidr, request.ttl_seconds, reason=request.reason)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid CIDR: {str(e)}")
+    
+    return {
+        "network": entry["network"],
+        "status": "blocked",
+        "expires_at": datetime.utcfromtimestamp(entry["expires_at"]).isoformat() if entry["expires_at"] else None,
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+@app.get("/blocked-ips/check/{ip}")
+async def check_ip(ip: str):
+    entry = blocked_ips.match(ip)
+    return {
+        "ip": ip,
+        "blocked": entry is not None,
+        "network": entry["network"] if entry else None,
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+@app.post("/blocked-ips/{ip:path}/unblock")
 async def unblock_ip(ip: str):
-    if ip in blocked_ips:
-        blocked_ips.remove(ip)
+    try:
+        removed = blocked_ips.remove(ip)
+    except ValueError:
+        removed = False
+    if removed:
         return {
             "ip": ip,
             "status": "unblocked",
@@ -238,10 +304,10 @@ async def unblock_ip(ip: str):
 async def metrics():
     return f"""# HELP threats_detected_total Total number of threats detected
 # TYPE threats_detected_total counter
-threats_detected_total{{severity="critical"}} {len([t for t in active_threats if t["severity"] == "critical"])}
-threats_detected_total{{severity="high"}} {len([t for t in active_threats if t["severity"] == "high"])}
-threats_detected_total{{severity="medium"}} {len([t for t in active_threats if t["severity"] == "medium"])}
-threats_detected_total{{severity="low"}} {len([t for t in active_threats if t["severity"] == "low"])}
+threats_detected_total{{severity="critical"}} {active_threats.severity_counts.get("critical", 0)}
+threats_detected_total{{severity="high"}} {active_threats.severity_counts.get("high", 0)}
+threats_detected_total{{severity="medium"}} {active_threats.severity_counts.get("medium", 0)}
+threats_detected_total{{severity="low"}} {active_threats.severity_counts.get("low", 0)}
 
 # HELP blocked_ips_total Number of blocked IP addresses
 # TYPE blocked_ips_total gauge
@@ -252,6 +318,11 @@ blocked_ips_total {len(blocked_ips)}
 threat_rules_active {len(threat_rules)}
 """
 
+async def expire_blocks():
+    while True:
+        await asyncio.sleep(30)
+        blocked_ips.expire()
+
 # Background task to generate synthetic threats in simulation mode
 async def generate_synthetic_threats():
     if not SIMULATION_MODE:
@@ -280,6 +351,7 @@ async def generate_synthetic_threats():
 
 @app.on_event("startup")
 async def startup_event():
+    asyncio.create_task(expire_blocks())
     if SIMULATION_MODE:
         asyncio.create_task(generate_synthetic_threats())
 